@@ -0,0 +1,125 @@
+"""
+Query count and latency budgets for the pages editors and visitors use most.
+
+Each URL is requested against each of its budget's seeded dataset sizes, by
+default a small and a large one. The request must stay within its query and
+time budget for every size, and must not issue more queries for the largest
+dataset than for the smallest: a count that grows with the data is an N+1 query
+which gets worse with every page added in production.
+
+URLs are format strings filled in from the seeded ``Dataset``, for example
+``{home_page.pk}`` or ``{pages[0].pk}``.
+"""
+
+from django.apps import apps
+
+# Default number of pages, documents and form submissions seeded for each
+# dataset size, smallest first. A budget can set its own with ``sizes``.
+SMALL = {"pages": 3, "documents": 3, "submissions": 3}
+LARGE = {"pages": 40, "documents": 40, "submissions": 40}
+
+
+class Budget:
+    def __init__(
+        self, name, url, max_queries, max_seconds, admin=False, sizes=(SMALL, LARGE)
+    ):
+        self.name = name
+        self.url = url
+        self.max_queries = max_queries
+        self.max_seconds = max_seconds
+        self.admin = admin
+        self.sizes = sizes
+
+    def get_url(self, dataset):
+        return self.url.format(
+            home_page=dataset.home_page,
+            pages=dataset.pages,
+            documents=dataset.documents,
+            form_page=dataset.form_page,
+        )
+
+
+BUDGETS = [
+    # Front end
+    Budget("home", "/", max_queries=6, max_seconds=1),
+    Budget("child_page", "/seeded-page-0/", max_queries=8, max_seconds=1),
+    Budget("search", "/search/?query=report", max_queries=5, max_seconds=2),
+    Budget("document", "{documents[0].url}", max_queries=6, max_seconds=1),
+    # Admin pages for the home page, which has every seeded page as a child
+    Budget("admin_dashboard", "/admin/", max_queries=20, max_seconds=2, admin=True),
+    Budget(
+        "admin_explorer",
+        "/admin/pages/{home_page.pk}/",
+        max_queries=30,
+        max_seconds=2,
+        admin=True,
+    ),
+    Budget(
+        "admin_edit",
+        "/admin/pages/{home_page.pk}/edit/",
+        max_queries=30,
+        max_seconds=2,
+        admin=True,
+    ),
+    Budget(
+        "admin_delete",
+        "/admin/pages/{home_page.pk}/delete/",
+        max_queries=20,
+        max_seconds=2,
+        admin=True,
+    ),
+    Budget(
+        "admin_copy",
+        "/admin/pages/{home_page.pk}/copy/",
+        max_queries=15,
+        max_seconds=2,
+        admin=True,
+    ),
+    Budget(
+        "admin_move",
+        "/admin/pages/{home_page.pk}/move/",
+        max_queries=12,
+        max_seconds=2,
+        admin=True,
+    ),
+    Budget(
+        "admin_history",
+        "/admin/pages/{home_page.pk}/history/",
+        max_queries=15,
+        max_seconds=2,
+        admin=True,
+    ),
+    Budget(
+        "admin_child_edit",
+        "/admin/pages/{pages[0].pk}/edit/",
+        max_queries=30,
+        max_seconds=2,
+        admin=True,
+    ),
+    Budget(
+        "admin_documents",
+        "/admin/documents/",
+        max_queries=14,
+        max_seconds=2,
+        admin=True,
+    ),
+    Budget(
+        "admin_search",
+        "/admin/pages/search/?q=report",
+        max_queries=12,
+        max_seconds=2,
+        admin=True,
+    ),
+]
+
+if apps.is_installed("app.forms"):
+    BUDGETS += [
+        Budget("form_page", "/seeded-form-0/", max_queries=8, max_seconds=1),
+        Budget(
+            "admin_form_submissions",
+            "/admin/forms/submissions/{form_page.pk}/",
+            max_queries=15,
+            max_seconds=2,
+            admin=True,
+        ),
+    ]
@@ -0,0 +1,222 @@
+import statistics
+import time
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from taggit.models import Tag, TaggedItem
+from wagtail.documents.models import Document
+from wagtail.images.models import Image
+from wagtail.models import Collection
+from wagtail.search.backends import get_search_backend
+
+from app.benchmarks.seed import WORDS
+from app.images.indexes import get_indexes
+
+
+class Rollback(Exception):
+    pass
+
+
+# Admin views to time, with the dataset's first collection and tag filled in
+VIEWS = [
+    ("images", "/admin/images/"),
+    ("images_collection", "/admin/images/?collection_id={collection.pk}"),
+    ("images_by_title", "/admin/images/?ordering=title"),
+    ("images_by_size", "/admin/images/?ordering=-file_size"),
+    ("images_tag", "/admin/images/?tag={tag.name}"),
+    ("images_search", "/admin/images/?q=report"),
+    ("image_chooser", "/admin/images/chooser/"),
+    ("image_chooser_search", "/admin/images/chooser/results/?q=report"),
+    ("documents", "/admin/documents/"),
+    ("documents_collection", "/admin/documents/?collection_id={collection.pk}"),
+    ("documents_by_newest", "/admin/documents/?ordering=-created_at"),
+    ("documents_search", "/admin/documents/?q=report"),
+    ("document_chooser", "/admin/documents/chooser/"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds large image and document libraries, then times the admin "
+        "listings, choosers and search with and without the project's indexes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=100_000,
+            help="Number of images to create (default: 100000)",
+        )
+        parser.add_argument(
+            "--documents",
+            type=int,
+            default=100_000,
+            help="Number of documents to create (default: 100000)",
+        )
+        parser.add_argument(
+            "--collections",
+            type=int,
+            default=20,
+            help="Number of collections to spread them across (default: 20)",
+        )
+        parser.add_argument(
+            "--search-indexed",
+            type=int,
+            default=2_000,
+            help="Number of images and documents to add to the search index, "
+            "which takes a few ms each (default: 2000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Times to request each view, reporting the median (default: 5)",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the generated images and documents instead of rolling them back",
+        )
+
+    def handle(self, *args, **options):
+        if not connection.features.can_rollback_ddl:
+            raise CommandError(
+                f"{connection.vendor} can't drop indexes inside a transaction, "
+                "so the comparison can't be rolled back"
+            )
+
+        try:
+            with transaction.atomic():
+                self.run_benchmark(options)
+                if not options["keep"]:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write("Rolled back the generated images and documents.")
+
+    def run_benchmark(self, options):
+        collection, tag = self.seed(options)
+        user = get_user_model().objects.create_superuser(
+            "benchmark-media-library", "benchmark@example.com", None
+        )
+        client = Client()
+        client.force_login(user)
+        urls = {name: url.format(collection=collection, tag=tag) for name, url in VIEWS}
+
+        # Drop the indexes in a savepoint, so they're restored afterwards. The
+        # schema editor can't be used inside a transaction on SQLite.
+        savepoint = transaction.savepoint()
+        with connection.cursor() as cursor:
+            for _, index in get_indexes(apps, connection):
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+        self.stdout.write("Timing without indexes...")
+        before = {name: self.time(client, url, options) for name, url in urls.items()}
+        transaction.savepoint_rollback(savepoint)
+
+        self.stdout.write("Timing with indexes...")
+        after = {name: self.time(client, url, options) for name, url in urls.items()}
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'View':<24} {'Without indexes':>22} {'With indexes':>22} {'Speedup':>8}"
+        )
+        self.stdout.write(f"{'':<24} {'ms (SQL ms)':>22} {'ms (SQL ms)':>22}")
+        for name in urls:
+            (total_before, sql_before), (total_after, sql_after) = (
+                before[name],
+                after[name],
+            )
+            self.stdout.write(
+                f"{name:<24} "
+                f"{f'{total_before:.1f} ({sql_before:.1f})':>22} "
+                f"{f'{total_after:.1f} ({sql_after:.1f})':>22} "
+                f"{total_before / total_after:>7.1f}x"
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    def seed(self, options):
+        """Create the images, documents, collections and tags."""
+        start = time.perf_counter()
+        root = Collection.get_first_root_node()
+        collections = [
+            root.add_child(name=f"Benchmark {i}")
+            for i in range(max(options["collections"], 1))
+        ]
+        tags = Tag.objects.bulk_create(
+            [Tag(name=f"benchmark-{word}", slug=f"benchmark-{word}") for word in WORDS]
+        )
+
+        def title(i, kind):
+            return f"{WORDS[i % len(WORDS)].title()} {kind} {i} report"
+
+        self.stdout.write(
+            f"Creating {options['images']} images and {options['documents']} "
+            "documents..."
+        )
+        images = Image.objects.bulk_create(
+            (
+                Image(
+                    title=title(i, "image"),
+                    file=f"original_images/benchmark-{i}.jpg",
+                    width=800,
+                    height=600,
+                    file_size=10_000 + i,
+                    collection=collections[i % len(collections)],
+                )
+                for i in range(options["images"])
+            ),
+            batch_size=5000,
+        )
+        documents = Document.objects.bulk_create(
+            (
+                Document(
+                    title=title(i, "document"),
+                    file=f"documents/benchmark-{i}.pdf",
+                    file_size=10_000 + i,
+                    collection=collections[i % len(collections)],
+                )
+                for i in range(options["documents"])
+            ),
+            batch_size=5000,
+        )
+
+        content_type = ContentType.objects.get_for_model(Image)
+        TaggedItem.objects.bulk_create(
+            (
+                TaggedItem(
+                    tag=tags[i % len(tags)],
+                    content_type=content_type,
+                    object_id=image.pk,
+                )
+                for i, image in enumerate(images)
+            ),
+            batch_size=5000,
+        )
+
+        backend = get_search_backend()
+        for model, objects in ((Image, images), (Document, documents)):
+            backend.add_bulk(model, objects[: options["search_indexed"]])
+
+        self.stdout.write(f"  Created in {time.perf_counter() - start:.2f}s")
+        return collections[0], tags[0]
+
+    def time(self, client, url, options):
+        """Return the median request and SQL time of a view in milliseconds."""
+        # Warm up caches before timing
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+
+        totals, sql = [], []
+        for _ in range(options["repeat"]):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                client.get(url)
+                totals.append((time.perf_counter() - start) * 1000)
+            sql.append(sum(float(query["time"]) for query in queries) * 1000)
+        return statistics.median(totals), statistics.median(sql)
@@ -0,0 +1,248 @@
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer,
+    WSGIRequestHandler,
+    get_internal_wsgi_application,
+)
+from django.db import connection
+from django.test import Client, override_settings
+
+from app.benchmarks.seed import seed_dataset
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "benchmark-baseline.json")
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway database, then load tests the home page, search, "
+        "document downloads and the admin page editor against a local server"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Requests per endpoint (default: 200)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Number of concurrent clients (default: 4)",
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=50,
+            help="Number of pages to seed (default: 50)",
+        )
+        parser.add_argument(
+            "--documents",
+            type=int,
+            default=20,
+            help="Number of documents to seed (default: 20)",
+        )
+        parser.add_argument(
+            "--baseline",
+            default=DEFAULT_BASELINE,
+            help=f"Baseline JSON file to compare against (default: {DEFAULT_BASELINE})",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Save the results as the new baseline",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=20,
+            help="Percentage slower than the baseline allowed (default: 20)",
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error if any endpoint regressed",
+        )
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        old_database_name = connection.settings_dict["NAME"]
+
+        if connection.vendor == "sqlite":
+            # An on disk database, so the server threads share it without
+            # in-memory shared cache table locks
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                media_root, "benchmark.sqlite3"
+            )
+
+        self.stdout.write("Creating the benchmark database...")
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root, ALLOWED_HOSTS=["127.0.0.1"], DEBUG=False
+            ):
+                results = self.run_benchmarks(options)
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self.report(results, options)
+
+    def run_benchmarks(self, options):
+        self.stdout.write(
+            f"Seeding {options['pages']} pages and {options['documents']} documents..."
+        )
+        dataset = seed_dataset(pages=options["pages"], documents=options["documents"])
+
+        # Log in with the test client to get a session cookie for the admin
+        client = Client()
+        client.force_login(dataset.user)
+        session_cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        document = dataset.documents[0]
+        endpoints = {
+            "home": ("/", {}),
+            "search": ("/search/?query=report", {}),
+            "document": (document.url, {}),
+            "admin_page_editor": (
+                f"/admin/pages/{dataset.pages[0].pk}/edit/",
+                {"Cookie": f"{settings.SESSION_COOKIE_NAME}={session_cookie}"},
+            ),
+        }
+
+        server = ThreadedWSGIServer(
+            ("127.0.0.1", 0), QuietRequestHandler, allow_reuse_address=False
+        )
+        server.set_app(get_internal_wsgi_application())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        port = server.server_address[1]
+
+        results = {}
+        try:
+            for name, (path, headers) in endpoints.items():
+                self.stdout.write(f"Benchmarking {name} ({path})...")
+                results[name] = self.benchmark(
+                    port, path, headers, options["requests"], options["concurrency"]
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+        return results
+
+    def benchmark(self, port, path, headers, count, concurrency):
+        def fetch(_):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            finally:
+                conn.close()
+            if response.status != 200:
+                raise CommandError(f"GET {path} returned {response.status}")
+            return time.perf_counter() - start
+
+        # Warm up caches and connections before timing
+        for i in range(min(5, count)):
+            fetch(i)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = sorted(executor.map(fetch, range(count)))
+        elapsed = time.perf_counter() - start
+
+        return {
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "requests_per_second": round(count / elapsed, 1),
+        }
+
+    def report(self, results, options):
+        baseline = {}
+        if os.path.exists(options["baseline"]):
+            with open(options["baseline"]) as fh:
+                baseline = json.load(fh).get("results", {})
+
+        tolerance = options["tolerance"] / 100
+        regressions = []
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'Endpoint':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<20} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+                f"{result['p99_ms']:>9} {result['requests_per_second']:>9}"
+            )
+
+            previous = baseline.get(name)
+            if not previous:
+                continue
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                if result[key] > previous[key] * (1 + tolerance):
+                    regressions.append(
+                        f"{name} {key}: {previous[key]} -> {result[key]}"
+                    )
+            throughput = "requests_per_second"
+            if result[throughput] < previous[throughput] * (1 - tolerance):
+                regressions.append(
+                    f"{name} {throughput}: {previous[throughput]} -> {result[throughput]}"
+                )
+
+        self.stdout.write("")
+        if options["save_baseline"]:
+            with open(options["baseline"], "w") as fh:
+                json.dump(
+                    {
+                        "settings": {
+                            key: options[key]
+                            for key in ("requests", "concurrency", "pages", "documents")
+                        },
+                        "results": results,
+                    },
+                    fh,
+                    indent=2,
+                )
+                fh.write("\n")
+            self.stdout.write(f"Saved baseline to {options['baseline']}")
+
+        if not baseline:
+            self.stdout.write("No baseline to compare against.")
+        elif regressions:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Slower than the baseline by more than {options['tolerance']}%:"
+                )
+            )
+            for regression in regressions:
+                self.stdout.write(f"  {regression}")
+            if options["fail_on_regression"]:
+                raise CommandError("Performance regressed against the baseline")
+        else:
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, round(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
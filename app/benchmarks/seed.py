@@ -0,0 +1,121 @@
+"""
+Reproducible datasets for the benchmarks and query budget tests.
+
+The same ``seed`` always creates the same titles and content, so timings taken
+on different branches or Wagtail versions are comparable.
+"""
+
+import random
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from wagtail.documents.models import Document
+
+from app.home.models import HomePage
+
+WORDS = [
+    "annual",
+    "archive",
+    "budget",
+    "campaign",
+    "community",
+    "design",
+    "events",
+    "guide",
+    "history",
+    "innovation",
+    "library",
+    "network",
+    "policy",
+    "project",
+    "report",
+    "research",
+    "security",
+    "strategy",
+    "technology",
+    "training",
+]
+
+
+class Dataset:
+    """The objects created by ``seed_dataset``."""
+
+    def __init__(self, home_page, pages, documents, user, form_page=None):
+        self.home_page = home_page
+        self.pages = pages
+        self.documents = documents
+        self.user = user
+        self.form_page = form_page
+
+
+def make_title(rng, number):
+    return " ".join(rng.choice(WORDS).title() for _ in range(3)) + f" {number}"
+
+
+def seed_dataset(pages=50, documents=20, submissions=20, seed=1, start=0):
+    """
+    Create ``pages`` child pages of the home page, ``documents`` text documents,
+    a form page with ``submissions`` submissions and a superuser for admin
+    requests. Use ``start`` to add more objects to an existing dataset without
+    clashing slugs.
+    """
+    rng = random.Random(seed + start)
+    home_page = HomePage.objects.first()
+
+    created_pages = []
+    for i in range(start, start + pages):
+        page = HomePage(title=make_title(rng, i), slug=f"seeded-page-{i}")
+        home_page.add_child(instance=page)
+        created_pages.append(page)
+
+    created_documents = []
+    for i in range(start, start + documents):
+        title = make_title(rng, i)
+        content = " ".join(rng.choice(WORDS) for _ in range(200))
+        created_documents.append(
+            Document.objects.create(
+                title=title,
+                file=ContentFile(content.encode(), name=f"seeded-document-{i}.txt"),
+            )
+        )
+
+    form_page = None
+    # Form pages are left out along with wagtail.contrib.forms
+    if apps.is_installed("app.forms"):
+        form_page = seed_form_page(rng, home_page, submissions, start)
+
+    user, _ = get_user_model().objects.get_or_create(
+        username="seeded-admin",
+        defaults={"is_staff": True, "is_superuser": True},
+    )
+
+    return Dataset(home_page, created_pages, created_documents, user, form_page)
+
+
+def seed_form_page(rng, home_page, submissions, start):
+    from wagtail.contrib.forms.models import FormSubmission
+
+    from app.forms.models import FormField, FormPage
+
+    form_page = home_page.add_child(
+        instance=FormPage(
+            title=f"Seeded form {start}",
+            slug=f"seeded-form-{start}",
+            form_fields=[
+                FormField(label="Name", field_type="singleline"),
+                FormField(label="Message", field_type="multiline"),
+            ],
+        )
+    )
+    FormSubmission.objects.bulk_create(
+        FormSubmission(
+            page=form_page,
+            form_data={
+                "name": make_title(rng, i),
+                "message": " ".join(rng.choice(WORDS) for _ in range(50)),
+            },
+        )
+        for i in range(submissions)
+    )
+    return form_page
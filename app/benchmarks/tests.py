@@ -0,0 +1,116 @@
+import time
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from wagtail.images.models import Image
+
+from app.benchmarks.budgets import BUDGETS
+from app.benchmarks.management.commands.run_benchmarks import percentile
+from app.benchmarks.seed import seed_dataset
+from app.tests_utils import TemporaryMediaMixin
+
+
+class SeedDatasetTestCase(TemporaryMediaMixin, TestCase):
+    """Tests for the benchmark dataset."""
+
+    def test_seed_is_reproducible(self):
+        """Test that the same seed creates the same titles."""
+        first = seed_dataset(pages=3, documents=2, seed=7)
+        titles = [page.title for page in first.pages]
+        # There's no form page when the forms app is disabled
+        for page in filter(None, [*first.pages, first.form_page]):
+            page.delete()
+        second = seed_dataset(pages=3, documents=2, seed=7)
+        self.assertEqual(titles, [page.title for page in second.pages])
+        self.assertTrue(second.user.is_superuser)
+
+
+class PercentileTestCase(SimpleTestCase):
+    """Tests for the benchmark percentile calculation."""
+
+    def test_nearest_rank_percentiles(self):
+        """Test percentiles of a known list of values."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 99), 3)
+
+
+class QueryBudgetTestCase(TemporaryMediaMixin, TestCase):
+    """Tests that key URLs stay within their query and time budgets."""
+
+    def measure(self, sizes, budgets):
+        """Seed a dataset and return the queries and time taken for each URL."""
+        sid = transaction.savepoint()
+        try:
+            cache.clear()
+            dataset = seed_dataset(**sizes)
+            self.client.force_login(dataset.user)
+            results = {}
+            for budget in budgets:
+                url = budget.get_url(dataset)
+                client = self.client if budget.admin else Client()
+                # Budgets are for a warm process, so fill caches first
+                self.assertEqual(client.get(url).status_code, 200, url)
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    client.get(url)
+                    elapsed = time.perf_counter() - start
+                results[budget.name] = (len(queries), elapsed)
+            return results
+        finally:
+            transaction.savepoint_rollback(sid)
+
+    def test_budgets(self):
+        """Test each URL's budget against each of its dataset sizes."""
+        # Seed each distinct size once for all the budgets that use it
+        budgets_by_size = {}
+        for budget in BUDGETS:
+            for sizes in budget.sizes:
+                key = tuple(sorted(sizes.items()))
+                budgets_by_size.setdefault(key, []).append(budget)
+        measured = {
+            key: self.measure(dict(key), budgets)
+            for key, budgets in budgets_by_size.items()
+        }
+
+        for budget in BUDGETS:
+            with self.subTest(budget.name):
+                results = [
+                    measured[tuple(sorted(sizes.items()))][budget.name]
+                    for sizes in budget.sizes
+                ]
+                for queries, elapsed in results:
+                    self.assertLessEqual(queries, budget.max_queries)
+                    self.assertLessEqual(elapsed, budget.max_seconds)
+                self.assertLessEqual(
+                    results[-1][0],
+                    results[0][0],
+                    "Query count grows with the number of pages and documents",
+                )
+
+
+class BenchmarkMediaLibraryTestCase(TestCase):
+    """Tests for the media library benchmark command."""
+
+    def test_command(self):
+        """Test that the benchmark times each view and rolls back its data."""
+        stdout = StringIO()
+        call_command(
+            "benchmark_media_library",
+            images=20,
+            documents=20,
+            collections=2,
+            search_indexed=5,
+            repeat=1,
+            stdout=stdout,
+        )
+
+        self.assertIn("images_by_size", stdout.getvalue())
+        self.assertIn("Benchmark complete", stdout.getvalue())
+        self.assertFalse(Image.objects.filter(title__endswith=" report").exists())
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class DocumentsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "app.documents"
+
+    def ready(self):
+        from app.documents.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
@@ -0,0 +1,237 @@
+"""
+Text extraction from documents, for the search index.
+
+Plain text, CSV and ZIP files are read with the standard library. Word (docx),
+PowerPoint (pptx), Excel (xlsx) and OpenDocument text (odt) files are ZIP
+archives of XML, which is parsed as it's decompressed. Text is collected until
+DOCUMENT_TEXT_MAX_BYTES (UTF-8 encoded) have been extracted, and the rest of
+the file is never read.
+
+Extraction doesn't touch the database, so it can run in another process. The
+caller saves the result with ``save_extracted_text``.
+"""
+
+import codecs
+import csv
+import io
+import logging
+import re
+import zipfile
+import zlib
+from dataclasses import dataclass
+
+from defusedxml.ElementTree import iterparse
+from django.conf import settings
+from wagtail.documents import get_document_model
+from wagtail.utils.file import hash_filelike
+
+from app.documents.models import DocumentText
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+S = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class BufferFull(Exception):
+    pass
+
+
+class TextBuffer:
+    """Collects extracted text, raising BufferFull once the limit is reached."""
+
+    def __init__(self, max_bytes):
+        self.parts = []
+        self.size = 0
+        self.max_bytes = max_bytes
+        self.truncated = False
+
+    def add(self, text):
+        encoded = text.encode()
+        if self.size + len(encoded) > self.max_bytes:
+            # Cut at the limit, dropping any partial character
+            remaining = encoded[: self.max_bytes - self.size]
+            self.parts.append(remaining.decode(errors="ignore"))
+            self.truncated = True
+            raise BufferFull
+        self.parts.append(text)
+        self.size += len(encoded)
+
+    def getvalue(self):
+        return "".join(self.parts)
+
+
+def extract_plain_text(fh, buffer):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    while chunk := fh.read(CHUNK_SIZE):
+        buffer.add(decoder.decode(chunk))
+    buffer.add(decoder.decode(b"", final=True))
+
+
+def extract_csv(fh, buffer):
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        for row in csv.reader(text):
+            buffer.add(" ".join(row) + "\n")
+    finally:
+        # Leave the underlying file open for the caller
+        text.detach()
+
+
+def extract_zip(fh, buffer):
+    with zipfile.ZipFile(fh) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            buffer.add(info.filename + "\n")
+            extractor = EXTRACTORS.get(get_extension(info.filename))
+            # Archives inside archives aren't opened
+            if extractor is None or extractor is extract_zip:
+                continue
+            with archive.open(info) as member:
+                extractor(member, buffer)
+
+
+def extract_xml(fh, block_tags, buffer):
+    """Add the text of each block element, such as a paragraph, in order."""
+    for _, element in iterparse(fh):
+        if element.tag in block_tags:
+            buffer.add("".join(element.itertext()) + "\n")
+            # Free the parsed block, the rest of the file is still to come
+            element.clear()
+
+
+def office_extractor(get_members, block_tags):
+    def extract(fh, buffer):
+        with zipfile.ZipFile(fh) as archive:
+            for name in get_members(archive.namelist()):
+                with archive.open(name) as member:
+                    extract_xml(member, block_tags, buffer)
+
+    return extract
+
+
+def get_slides(names):
+    slides = []
+    for name in names:
+        match = re.fullmatch(r"ppt/slides/slide(\d+)\.xml", name)
+        if match:
+            slides.append((int(match.group(1)), name))
+    return [name for _, name in sorted(slides)]
+
+
+EXTRACTORS = {
+    "txt": extract_plain_text,
+    "csv": extract_csv,
+    "zip": extract_zip,
+    "docx": office_extractor(lambda names: ["word/document.xml"], {f"{W}p"}),
+    "pptx": office_extractor(get_slides, {f"{A}p"}),
+    # Cell text is kept in the shared strings table, numbers are left out
+    "xlsx": office_extractor(
+        lambda names: [name for name in names if name == "xl/sharedStrings.xml"],
+        {f"{S}si"},
+    ),
+    "odt": office_extractor(lambda names: ["content.xml"], {f"{TEXT}p", f"{TEXT}h"}),
+}
+
+
+def get_extension(name):
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def extract(fh, extension, max_bytes):
+    """
+    Return the text of a file and whether it was cut short at ``max_bytes``.
+    Unsupported file types have no text.
+    """
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        return "", False
+
+    buffer = TextBuffer(max_bytes)
+    try:
+        extractor(fh, buffer)
+    except BufferFull:
+        pass
+    except (
+        zipfile.BadZipFile,
+        zlib.error,
+        EOFError,
+        NotImplementedError,
+        csv.Error,
+        SyntaxError,
+        ValueError,
+        KeyError,
+    ) as e:
+        # A damaged or unusual file. XML ParseError is a SyntaxError, defusedxml
+        # errors are ValueErrors, and KeyError is a missing ZIP member.
+        raise ExtractionError(f"Couldn't read the {extension} file: {e!r}")
+    return buffer.getvalue(), buffer.truncated
+
+
+@dataclass
+class ExtractedText:
+    file_hash: str
+    text: str
+    truncated: bool
+
+
+def extract_document(document, max_bytes=None):
+    """Extract a document's text, hashing the file if Wagtail hasn't."""
+    max_bytes = max_bytes or settings.DOCUMENT_TEXT_MAX_BYTES
+    with document.open_file() as fh:
+        file_hash = document.file_hash
+        if not file_hash:
+            file_hash = hash_filelike(fh)
+            fh.seek(0)
+        try:
+            text, truncated = extract(fh, document.file_extension.lower(), max_bytes)
+        except ExtractionError as e:
+            # Save no text, so the file isn't tried again until it changes
+            logger.warning(
+                "Extracting text from document %s failed: %s", document.pk, e
+            )
+            text, truncated = "", False
+    return ExtractedText(file_hash, text, truncated)
+
+
+def needs_extraction(document):
+    """Return whether the document is new or its file has changed."""
+    try:
+        extracted = document.extracted_text
+    except DocumentText.DoesNotExist:
+        return True
+    return not document.file_hash or extracted.file_hash != document.file_hash
+
+
+def save_extracted_text(document, result):
+    if not document.file_hash:
+        # Record the hash without sending post_save, which would extract again
+        document.file_hash = result.file_hash
+        get_document_model().objects.filter(pk=document.pk).update(
+            file_hash=result.file_hash
+        )
+    DocumentText.objects.update_or_create(
+        document=document,
+        defaults={
+            "text": result.text,
+            "file_hash": result.file_hash,
+            "truncated": result.truncated,
+        },
+    )
+
+
+def update_document_text(document, force=False):
+    """Extract and save the document's text, unless its file is unchanged."""
+    if not force and not needs_extraction(document):
+        return False
+    save_extracted_text(document, extract_document(document))
+    return True
@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from wagtail.documents import get_document_model
+
+from app.documents.extract import (
+    extract_document,
+    needs_extraction,
+    save_extracted_text,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Extracts the text of new and changed documents for the search index, "
+        "in a pool of worker processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of worker processes (default: 4)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Extract every document again, even if its file hasn't changed",
+        )
+
+    def handle(self, *args, **options):
+        # Documents are read as they're needed, rather than all at once
+        documents = (
+            document
+            for document in get_document_model()
+            .objects.select_related("extracted_text")
+            .defer("extracted_text__text")
+            .order_by("pk")
+            .iterator(chunk_size=500)
+            if options["force"] or needs_extraction(document)
+        )
+
+        start = time.perf_counter()
+        extracted = failed = 0
+        workers = options["workers"]
+        # Forked processes mustn't share the parent's database connections
+        connections.close_all()
+        # Workers only read files, the text is saved from this process
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=django.setup
+        ) as executor:
+            pending = {}
+            while True:
+                for document in documents:
+                    pending[executor.submit(extract_document, document)] = document
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    document = pending.pop(future)
+                    try:
+                        save_extracted_text(document, future.result())
+                    except Exception as e:
+                        self.stderr.write(f"Couldn't extract {document}: {e}")
+                        failed += 1
+                        continue
+                    extracted += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Extracted {extracted} documents in "
+                f"{time.perf_counter() - start:.1f}s, {failed} failed"
+            )
+        )
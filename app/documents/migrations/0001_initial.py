@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:57
+
+import django.db.models.deletion
+import modelsearch.index
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.WAGTAILDOCS_DOCUMENT_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentText",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("text", models.TextField(blank=True)),
+                ("file_hash", models.CharField(blank=True, max_length=40)),
+                ("truncated", models.BooleanField(default=False)),
+                ("extracted_at", models.DateTimeField(auto_now=True)),
+                (
+                    "document",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="extracted_text",
+                        to=settings.WAGTAILDOCS_DOCUMENT_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "document text",
+            },
+            bases=(modelsearch.index.Indexed, models.Model),
+        ),
+    ]
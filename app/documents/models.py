@@ -0,0 +1,26 @@
+from django.db import models
+from wagtail.documents import get_document_model_string
+from wagtail.search import index
+
+
+class DocumentText(index.Indexed, models.Model):
+    """The text extracted from a document's file, indexed for search."""
+
+    document = models.OneToOneField(
+        get_document_model_string(),
+        on_delete=models.CASCADE,
+        related_name="extracted_text",
+    )
+    text = models.TextField(blank=True)
+    # The SHA-1 of the file the text was extracted from
+    file_hash = models.CharField(max_length=40, blank=True)
+    truncated = models.BooleanField(default=False)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    search_fields = [index.SearchField("text")]
+
+    class Meta:
+        verbose_name = "document text"
+
+    def __str__(self):
+        return f"Text of {self.document}"
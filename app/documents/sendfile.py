@@ -0,0 +1,57 @@
+"""
+Sendfile backend for Wagtail's document serve view.
+
+Wagtail hands local document files to the module named in ``SENDFILE_BACKEND``.
+This backend picks how the file is delivered based on ``DOCUMENTS_SENDFILE_MODE``:
+
+- ``nginx``: respond with an ``X-Accel-Redirect`` header pointing at the internal
+  location configured in ``DOCUMENTS_SENDFILE_URL``, nginx then sends the file.
+- ``apache``: respond with an ``X-Sendfile`` header (mod_xsendfile).
+- ``streaming``: stream the file from Python. Range requests are handled by
+  ``app.documents.views.serve``.
+"""
+
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+SENDFILE_MODES = ("nginx", "apache", "streaming")
+
+
+def sendfile(request, filename, **kwargs):
+    mode = getattr(settings, "DOCUMENTS_SENDFILE_MODE", "streaming")
+
+    if mode == "nginx":
+        response = HttpResponse()
+        response["X-Accel-Redirect"] = get_internal_url(filename)
+    elif mode == "apache":
+        response = HttpResponse()
+        response["X-Sendfile"] = filename
+    elif mode == "streaming":
+        mtime = os.stat(filename).st_mtime
+        if not was_modified_since(request.headers.get("if-modified-since"), mtime):
+            return HttpResponseNotModified()
+        response = FileResponse(open(filename, "rb"))
+        response["Last-Modified"] = http_date(mtime)
+    else:
+        raise ImproperlyConfigured(
+            f"DOCUMENTS_SENDFILE_MODE must be one of {', '.join(SENDFILE_MODES)}, "
+            f"not {mode!r}"
+        )
+
+    return response
+
+
+def get_internal_url(filename):
+    """Map a file below MEDIA_ROOT to the internal nginx location serving it."""
+    relative_path = os.path.relpath(filename, settings.MEDIA_ROOT)
+    if relative_path.startswith(os.pardir):
+        raise ValueError(f"{filename} is not inside MEDIA_ROOT")
+
+    prefix = settings.DOCUMENTS_SENDFILE_URL.rstrip("/")
+    return f"{prefix}/{quote(relative_path.replace(os.sep, '/'))}"
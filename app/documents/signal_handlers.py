@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from wagtail.documents import get_document_model
+
+from app.documents.tasks import extract_document_text
+
+
+def enqueue_text_extraction(instance, raw=False, **kwargs):
+    # The task skips documents whose file hasn't changed
+    if not raw:
+        extract_document_text.enqueue(instance.pk)
+
+
+def register_signal_handlers():
+    post_save.connect(enqueue_text_extraction, sender=get_document_model())
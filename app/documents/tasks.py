@@ -0,0 +1,19 @@
+from django_tasks import task
+from wagtail.documents import get_document_model
+
+from app.documents.extract import update_document_text
+
+
+@task()
+def extract_document_text(document_id):
+    """Extract the text of a new or changed document for the search index."""
+    document = (
+        get_document_model()
+        .objects.select_related("extracted_text")
+        .defer("extracted_text__text")
+        .filter(pk=document_id)
+        .first()
+    )
+    # The document may have been deleted before the task ran
+    if document is not None:
+        update_document_text(document)
@@ -0,0 +1,247 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from wagtail.documents.models import Document
+
+from app.documents import extract
+from app.documents.models import DocumentText
+from app.tests_utils import TemporaryMediaMixin
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = b"0123456789" * 100
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, DOCUMENTS_SENDFILE_MODE="streaming")
+class DocumentServeTestCase(TestCase):
+    """Tests for serving documents with range and conditional requests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a document to serve."""
+        with override_settings(MEDIA_ROOT=MEDIA_ROOT):
+            cls.document = Document.objects.create(
+                title="Sample", file=ContentFile(CONTENT, name="sample.txt")
+            )
+        cls.url = cls.document.url
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def _content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_download_advertises_ranges(self):
+        """Test that a plain request returns the whole file."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("Last-Modified", response)
+        self.assertEqual(self._content(response), CONTENT)
+
+    def test_range_request_returns_partial_content(self):
+        """Test that a byte range returns 206 with only those bytes."""
+        response = self.client.get(self.url, headers={"range": "bytes=10-19"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(CONTENT)}")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(self._content(response), CONTENT[10:20])
+
+    def test_suffix_and_open_ended_ranges(self):
+        """Test suffix ("-N") and open ended ("N-") ranges."""
+        response = self.client.get(self.url, headers={"range": "bytes=-5"})
+        self.assertEqual(self._content(response), CONTENT[-5:])
+
+        response = self.client.get(self.url, headers={"range": "bytes=995-"})
+        self.assertEqual(self._content(response), CONTENT[995:])
+
+    def test_unsatisfiable_range_returns_416(self):
+        """Test that a range beyond the end of the file returns 416."""
+        response = self.client.get(self.url, headers={"range": "bytes=5000-"})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(CONTENT)}")
+
+    def test_stale_if_range_returns_whole_file(self):
+        """Test that a non matching If-Range validator ignores the range."""
+        response = self.client.get(
+            self.url,
+            headers={"range": "bytes=0-9", "if-range": '"not-the-etag"'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._content(response), CONTENT)
+
+    def test_if_modified_since_returns_304(self):
+        """Test that a conditional request for an unchanged file returns 304."""
+        last_modified = self.client.get(self.url)["Last-Modified"]
+        response = self.client.get(
+            self.url, headers={"if-modified-since": last_modified}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(
+        DOCUMENTS_SENDFILE_MODE="nginx", DOCUMENTS_SENDFILE_URL="/protected-media/"
+    )
+    def test_nginx_mode_sets_accel_redirect(self):
+        """Test that nginx mode hands the file over with X-Accel-Redirect."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-media/{self.document.file.name}"
+        )
+        self.assertEqual(response.content, b"")
+
+    @override_settings(DOCUMENTS_SENDFILE_MODE="apache")
+    def test_apache_mode_sets_x_sendfile(self):
+        """Test that apache mode hands the file over with X-Sendfile."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Sendfile"], self.document.file.path)
+
+
+def make_zip(members):
+    """Return the bytes of a ZIP archive of {name: content}."""
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return output.getvalue()
+
+
+DOCX = make_zip(
+    {
+        "word/document.xml": (
+            f'<w:document xmlns:w="{extract.W[1:-1]}"><w:body>'
+            "<w:p><w:r><w:t>Annual </w:t></w:r><w:r><w:t>report</w:t></w:r></w:p>"
+            "<w:p><w:r><w:t>Second paragraph</w:t></w:r></w:p>"
+            "</w:body></w:document>"
+        )
+    }
+)
+
+
+class ExtractTestCase(SimpleTestCase):
+    """Tests for extracting text from document files."""
+
+    def extract(self, content, extension, max_bytes=1000):
+        return extract.extract(io.BytesIO(content), extension, max_bytes)
+
+    def test_plain_text_and_csv(self):
+        """Test that text and CSV files are decoded."""
+        self.assertEqual(self.extract(b"caf\xc3\xa9", "txt"), ("café", False))
+        self.assertEqual(
+            self.extract(b'name,notes\r\nokapi,"shy, striped"\r\n', "csv"),
+            ("name notes\nokapi shy, striped\n", False),
+        )
+
+    def test_office_documents(self):
+        """Test that paragraphs, slides, cells and headings are extracted."""
+        xlsx = make_zip(
+            {
+                "xl/sharedStrings.xml": (
+                    f'<sst xmlns="{extract.S[1:-1]}">'
+                    "<si><t>Region</t></si><si><r><t>North</t></r><r><t>east</t></r></si>"
+                    "</sst>"
+                )
+            }
+        )
+        pptx = make_zip(
+            {
+                f"ppt/slides/slide{number}.xml": (
+                    f'<p:sld xmlns:p="urn:p" xmlns:a="{extract.A[1:-1]}">'
+                    f"<a:p><a:r><a:t>Slide {number}</a:t></a:r></a:p></p:sld>"
+                )
+                for number in (10, 2)
+            }
+        )
+        odt = make_zip(
+            {
+                "content.xml": (
+                    f'<office:document-content xmlns:office="urn:o" xmlns:text="{extract.TEXT[1:-1]}">'
+                    "<text:h>Agenda</text:h><text:p>Item <text:span>one</text:span></text:p>"
+                    "</office:document-content>"
+                )
+            }
+        )
+
+        self.assertEqual(
+            self.extract(DOCX, "docx"), ("Annual report\nSecond paragraph\n", False)
+        )
+        self.assertEqual(self.extract(xlsx, "xlsx"), ("Region\nNortheast\n", False))
+        self.assertEqual(self.extract(pptx, "pptx"), ("Slide 2\nSlide 10\n", False))
+        self.assertEqual(self.extract(odt, "odt"), ("Agenda\nItem one\n", False))
+
+    def test_zip_members(self):
+        """Test that supported files in a ZIP archive are extracted."""
+        archive = make_zip(
+            {"readme.txt": "Read me", "report.docx": DOCX, "photo.jpg": b"\xff"}
+        )
+        text, _ = self.extract(archive, "zip")
+        self.assertEqual(
+            text,
+            "readme.txt\nRead me"
+            "report.docx\nAnnual report\nSecond paragraph\n"
+            "photo.jpg\n",
+        )
+
+    def test_max_bytes(self):
+        """Test that extraction stops at the byte limit, between characters."""
+        text, truncated = self.extract("é".encode() * 100, "txt", max_bytes=5)
+        self.assertEqual(text, "éé")
+        self.assertTrue(truncated)
+
+    def test_damaged_and_unsupported_files(self):
+        """Test that damaged files raise ExtractionError and others have no text."""
+        with self.assertRaises(extract.ExtractionError):
+            self.extract(b"not a zip", "docx")
+        with self.assertRaises(extract.ExtractionError):
+            self.extract(make_zip({"word/document.xml": "<w:p>"}), "docx")
+        self.assertEqual(self.extract(b"%PDF", "pdf"), ("", False))
+
+
+class DocumentTextTestCase(TemporaryMediaMixin, TestCase):
+    """Tests for saving extracted document text."""
+
+    def test_extracted_when_saved(self):
+        """Test that text is extracted when a document is saved, once per file."""
+        with self.captureOnCommitCallbacks(execute=True):
+            document = Document.objects.create(
+                title="Notes", file=ContentFile(b"Okapi sightings", name="notes.txt")
+            )
+        document.refresh_from_db()
+        self.assertEqual(document.extracted_text.text, "Okapi sightings")
+        self.assertEqual(document.extracted_text.file_hash, document.file_hash)
+        self.assertTrue(document.file_hash)
+
+        with mock.patch("app.documents.extract.extract") as extract_file:
+            with self.captureOnCommitCallbacks(execute=True):
+                document.title = "Renamed"
+                document.save()
+        extract_file.assert_not_called()
+
+    def test_command(self):
+        """Test that the command extracts new and changed documents."""
+        document = Document.objects.create(
+            title="Notes", file=ContentFile(b"Okapi sightings", name="notes.txt")
+        )
+        stdout = StringIO()
+        # Closing the connection would end the test's transaction
+        with mock.patch(
+            "app.documents.management.commands.extract_document_text.connections"
+        ) as connections:
+            call_command("extract_document_text", workers=1, stdout=stdout)
+            connections.close_all.assert_called_once()
+            self.assertIn("Extracted 1 documents", stdout.getvalue())
+            self.assertEqual(
+                DocumentText.objects.get(document=document).text, "Okapi sightings"
+            )
+
+            call_command("extract_document_text", workers=1, stdout=stdout)
+            self.assertIn("Extracted 0 documents", stdout.getvalue())
@@ -0,0 +1,107 @@
+import re
+
+from django.http import FileResponse, HttpResponse
+from django.utils.http import parse_http_date_safe
+from wagtail.documents.views.serve import serve as wagtail_serve
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def serve(request, document_id, document_filename):
+    """
+    Serve a document with Wagtail's view, adding single byte-range support to
+    responses streamed from Python. Responses handed over to the web server
+    with X-Accel-Redirect / X-Sendfile are left untouched, the server handles
+    ranges for those itself.
+    """
+    response = wagtail_serve(request, document_id, document_filename)
+
+    if not isinstance(response, FileResponse) or response.status_code != 200:
+        return response
+
+    response["Accept-Ranges"] = "bytes"
+
+    range_header = request.headers.get("range")
+    if not range_header or request.method not in ("GET", "HEAD"):
+        return response
+
+    if not if_range_matches(request.headers.get("if-range"), response):
+        return response
+
+    size = int(response["Content-Length"])
+    byte_range = parse_range(range_header, size)
+
+    if byte_range is None:
+        # Malformed or multi-part ranges are ignored and the whole file is sent
+        return response
+
+    if byte_range is False:
+        response.close()
+        not_satisfiable = HttpResponse(status=416)
+        not_satisfiable["Content-Range"] = f"bytes */{size}"
+        return not_satisfiable
+
+    start, end = byte_range
+    response.status_code = 206
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = end - start + 1
+    response.streaming_content = read_range(response.file_to_stream, start, end)
+    return response
+
+
+def parse_range(header, size):
+    """
+    Parse a Range header for a file of ``size`` bytes.
+
+    Returns a ``(start, end)`` tuple of inclusive offsets, ``None`` if the header
+    should be ignored, or ``False`` if the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range, e.g. "bytes=-500" for the final 500 bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    if start >= size:
+        return False
+    end = int(last) if last else size - 1
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def if_range_matches(if_range, response):
+    """An If-Range validator must match exactly for the range to be honoured."""
+    if not if_range:
+        return True
+
+    if if_range.startswith(('"', 'W/"')):
+        etag = response.get("ETag")
+        return not if_range.startswith("W/") and etag == if_range
+
+    last_modified = response.get("Last-Modified")
+    if not last_modified:
+        return False
+    return parse_http_date_safe(if_range) == parse_http_date_safe(last_modified)
+
+
+def read_range(file, start, end):
+    file.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = file.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
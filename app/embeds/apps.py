@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class EmbedsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "app.embeds"
+
+    def ready(self):
+        from app.embeds.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
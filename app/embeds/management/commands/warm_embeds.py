@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from wagtail.models import Page
+
+from app.embeds.warm import find_page_embeds, get_missing, warm_embeds
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetches the embeds in live pages which haven't been fetched yet, so "
+        "they're stored before the pages are visited"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.EMBED_WARMING_WORKERS,
+            help="Number of embeds to fetch at once "
+            f"(default: {settings.EMBED_WARMING_WORKERS})",
+        )
+
+    def handle(self, *args, **options):
+        embeds = set()
+        pages = 0
+        for page in Page.objects.live().specific().iterator(chunk_size=500):
+            found = find_page_embeds(page)
+            embeds.update(found)
+            pages += bool(found)
+        missing = get_missing(embeds)
+        self.stdout.write(
+            f"Found {len(embeds)} embeds in {pages} pages, " f"{len(missing)} to fetch"
+        )
+
+        start = time.perf_counter()
+        fetched, failed = warm_embeds(missing, workers=options["workers"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fetched {fetched} embeds in {time.perf_counter() - start:.1f}s, "
+                f"{failed} failed"
+            )
+        )
+        if failed:
+            self.stdout.write("See the log for why each failed.")
@@ -0,0 +1,11 @@
+from wagtail.signals import page_published
+
+from app.embeds.tasks import warm_page_embeds
+
+
+def enqueue_embed_warming(instance, **kwargs):
+    warm_page_embeds.enqueue(instance.pk)
+
+
+def register_signal_handlers():
+    page_published.connect(enqueue_embed_warming)
@@ -0,0 +1,13 @@
+from django_tasks import task
+from wagtail.models import Page
+
+from app.embeds.warm import find_page_embeds, warm_embeds
+
+
+@task()
+def warm_page_embeds(page_id):
+    """Fetch the embeds in a published page, before it's first visited."""
+    page = Page.objects.filter(pk=page_id).first()
+    # The page may have been deleted before the task ran
+    if page is not None:
+        warm_embeds(find_page_embeds(page.specific))
@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from wagtail import blocks
+from wagtail.embeds.blocks import EmbedBlock
+from wagtail.embeds.finders import get_finders
+from wagtail.embeds.models import Embed
+
+from app.embeds.warm import EmbedRequest, find_block_embeds, warm_embeds
+from app.home.models import HomePage
+
+
+class OEmbedHandler(BaseHTTPRequestHandler):
+    """A stand-in oEmbed provider, which answers slowly."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.running += 1
+            server.most_running = max(server.most_running, server.running)
+        time.sleep(0.1)
+        with server.lock:
+            server.running -= 1
+
+        url = parse_qs(urlparse(self.path).query)["url"][0]
+        if "missing" in url:
+            self.send_error(404)
+            return
+        body = json.dumps(
+            {
+                "type": "video",
+                "title": url.rsplit("/", 1)[-1],
+                "html": f'<iframe src="{url}"></iframe>',
+                "width": "640",
+                "height": 360,
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class WarmEmbedsTestCase(TestCase):
+    """Tests for fetching embeds ahead of time."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the stand-in oEmbed provider."""
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), OEmbedHandler)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+        # Send video.example.com URLs to the stand-in provider
+        finders = [
+            {
+                "class": "wagtail.embeds.finders.oembed",
+                "providers": [
+                    {
+                        "endpoint": f"http://127.0.0.1:{cls.server.server_port}/oembed",
+                        "urls": [r"^https://video\.example\.com/.+$"],
+                    }
+                ],
+            }
+        ]
+        settings = override_settings(WAGTAILEMBEDS_FINDERS=finders)
+        settings.enable()
+        cls.addClassCleanup(settings.disable)
+        # Wagtail keeps the finders it has loaded
+        get_finders.cache_clear()
+        cls.addClassCleanup(get_finders.cache_clear)
+
+    def setUp(self):
+        """Reset the stand-in provider's request counts."""
+        self.server.requests = self.server.running = self.server.most_running = 0
+
+    def test_find_block_embeds(self):
+        """Test that embeds are found in nested blocks and rich text."""
+        block = blocks.StreamBlock(
+            [
+                ("video", EmbedBlock(max_width=800)),
+                ("text", blocks.RichTextBlock()),
+                (
+                    "gallery",
+                    blocks.StructBlock(
+                        [("videos", blocks.ListBlock(EmbedBlock()))],
+                    ),
+                ),
+            ]
+        )
+        value = block.to_python(
+            [
+                {"type": "video", "value": "https://video.example.com/1"},
+                {
+                    "type": "text",
+                    "value": '<p>Intro</p><embed embedtype="media" '
+                    'url="https://video.example.com/2"/>',
+                },
+                {
+                    "type": "gallery",
+                    "value": {"videos": ["https://video.example.com/3", ""]},
+                },
+            ]
+        )
+        self.assertEqual(
+            set(find_block_embeds(block, value)),
+            {
+                EmbedRequest("https://video.example.com/1", 800),
+                EmbedRequest("https://video.example.com/2"),
+                EmbedRequest("https://video.example.com/3"),
+            },
+        )
+
+    def test_warm_embeds(self):
+        """Test that embeds are fetched concurrently, once, and failures counted."""
+        embeds = [EmbedRequest(f"https://video.example.com/{i}", 640) for i in range(4)]
+        embeds.append(EmbedRequest("https://video.example.com/missing"))
+
+        with self.assertLogs("app.embeds.warm", "WARNING") as logs:
+            self.assertEqual(warm_embeds(embeds, workers=4), (4, 1))
+        self.assertIn(
+            "Couldn't fetch embed https://video.example.com/missing", logs.output[0]
+        )
+        self.assertEqual(self.server.requests, 5)
+        self.assertGreater(self.server.most_running, 1)
+        embed = Embed.objects.get(hash=embeds[0].hash)
+        self.assertEqual(embed.width, 640)
+        self.assertIn("video.example.com/0", embed.html)
+
+        self.assertEqual(warm_embeds(embeds[:4], workers=4), (0, 0))
+        self.assertEqual(self.server.requests, 5)
+
+    def test_publishing_warms_embeds(self):
+        """Test that publishing a page fetches its embeds."""
+        page = HomePage.objects.first()
+        embed = EmbedRequest("https://video.example.com/home")
+        with mock.patch(
+            "app.embeds.tasks.find_page_embeds", return_value={embed}
+        ) as find_page_embeds:
+            with self.captureOnCommitCallbacks(execute=True):
+                page.save_revision().publish()
+
+        find_page_embeds.assert_called_once()
+        self.assertTrue(Embed.objects.filter(hash=embed.hash).exists())
+
+    def test_command(self):
+        """Test that the command fetches the embeds of every live page."""
+        embed = EmbedRequest("https://video.example.com/home")
+        stdout = StringIO()
+        with mock.patch(
+            "app.embeds.management.commands.warm_embeds.find_page_embeds",
+            return_value={embed},
+        ):
+            call_command("warm_embeds", workers=2, stdout=stdout)
+        self.assertIn("1 to fetch", stdout.getvalue())
+        self.assertIn("Fetched 1 embeds", stdout.getvalue())
+        self.assertTrue(Embed.objects.filter(hash=embed.hash).exists())
@@ -0,0 +1,148 @@
+"""
+Fetching embeds before they're first rendered.
+
+Wagtail fetches an embed from its oEmbed provider the first time it's
+rendered, during the visitor's request, and keeps it in the Embed table. Here
+the embeds in a page's content are found and fetched ahead of time instead.
+
+Providers are asked on a pool of EMBED_WARMING_WORKERS threads, so a page
+with several embeds takes as long as the slowest provider. Workers only make
+HTTP requests, the embeds are saved from the calling thread.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils.timezone import now
+from wagtail import blocks
+from wagtail.embeds.blocks import EmbedBlock
+from wagtail.embeds.embeds import get_embed_hash, get_finder_for_embed
+from wagtail.embeds.exceptions import EmbedException
+from wagtail.embeds.models import Embed
+from wagtail.fields import RichTextField, StreamField
+from wagtail.rich_text.rewriters import FIND_EMBED_TAG, extract_attrs
+
+logger = logging.getLogger(__name__)
+
+
+class EmbedRequest(NamedTuple):
+    """An embed as it will be rendered, the sizes are part of Wagtail's cache key."""
+
+    url: str
+    max_width: int | None = None
+    max_height: int | None = None
+
+    @property
+    def hash(self):
+        return get_embed_hash(self.url, self.max_width, self.max_height)
+
+
+def find_rich_text_embeds(html):
+    # Rich text embeds are rendered without a size
+    for match in FIND_EMBED_TAG.finditer(html or ""):
+        attrs = extract_attrs(match.group(1))
+        if attrs.get("embedtype") == "media" and attrs.get("url"):
+            yield EmbedRequest(attrs["url"])
+
+
+def find_block_embeds(block, value):
+    """Yield the embeds in a block's value, looking inside nested blocks."""
+    if value is None:
+        return
+    if isinstance(block, EmbedBlock):
+        if value.url:
+            yield EmbedRequest(value.url, value.max_width, value.max_height)
+    elif isinstance(block, blocks.RichTextBlock):
+        yield from find_rich_text_embeds(value.source)
+    elif isinstance(block, blocks.StreamBlock):
+        for child in value:
+            yield from find_block_embeds(child.block, child.value)
+    elif isinstance(block, blocks.ListBlock):
+        for item in value:
+            yield from find_block_embeds(block.child_block, item)
+    elif isinstance(block, blocks.StructBlock):
+        for name, child_block in block.child_blocks.items():
+            yield from find_block_embeds(child_block, value.get(name))
+
+
+def find_page_embeds(page):
+    """Return the embeds in a specific page's StreamField and rich text fields."""
+    embeds = set()
+    for field in page._meta.concrete_fields:
+        value = getattr(page, field.attname)
+        if isinstance(field, StreamField):
+            embeds.update(find_block_embeds(field.stream_block, value))
+        elif isinstance(field, RichTextField):
+            embeds.update(find_rich_text_embeds(value))
+    return embeds
+
+
+def get_missing(embeds):
+    """Return the embeds which haven't been fetched, or have expired."""
+    embeds = {embed.hash: embed for embed in embeds}
+    fetched = set(
+        Embed.objects.filter(hash__in=embeds)
+        .exclude(cache_until__lte=now())
+        .values_list("hash", flat=True)
+    )
+    return [embed for key, embed in embeds.items() if key not in fetched]
+
+
+def fetch(embed):
+    return get_finder_for_embed(embed.url, embed.max_width, embed.max_height)
+
+
+def save_embed(embed, embed_dict):
+    """Save a fetched embed, tidying its fields as wagtail.embeds' get_embed does."""
+    for name in ("width", "height"):
+        try:
+            embed_dict[name] = int(embed_dict[name])
+        except (KeyError, TypeError, ValueError):
+            embed_dict[name] = None
+    embed_dict["html"] = embed_dict.get("html") or ""
+    embed_dict["thumbnail_url"] = embed_dict.get("thumbnail_url") or ""
+
+    Embed.objects.update_or_create(
+        hash=embed.hash,
+        defaults={
+            "url": embed.url,
+            "max_width": embed.max_width,
+            "last_updated": datetime.now(),
+            **embed_dict,
+        },
+    )
+
+
+def warm_embeds(embeds, workers=None):
+    """
+    Fetch and save the embeds which aren't stored yet, returning the number
+    fetched and the number which failed.
+    """
+    missing = get_missing(embeds)
+    if not missing:
+        return 0, 0
+
+    workers = workers or settings.EMBED_WARMING_WORKERS
+    fetched = failed = 0
+    with ThreadPoolExecutor(
+        max_workers=min(workers, len(missing)), thread_name_prefix="embeds"
+    ) as executor:
+        futures = {executor.submit(fetch, embed): embed for embed in missing}
+        for future in as_completed(futures):
+            embed = futures[future]
+            # A failed embed is tried again when the page is rendered
+            try:
+                save_embed(embed, future.result())
+            except EmbedException as e:
+                # An unsupported URL, or one the provider couldn't find
+                logger.warning("Couldn't fetch embed %s: %r", embed.url, e)
+                failed += 1
+            except Exception:
+                logger.exception("Fetching embed %s failed", embed.url)
+                failed += 1
+            else:
+                fetched += 1
+    return fetched, failed
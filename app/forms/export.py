@@ -0,0 +1,93 @@
+"""
+Form submission export, streamed a chunk of submissions at a time.
+
+Wagtail's own export loads every submission of the form into memory, and
+builds XLSX files in memory before sending them. Here submissions are read
+with ``QuerySet.iterator``, which uses a server-side cursor on PostgreSQL, and
+each chunk is written out before the next is fetched, so memory use doesn't
+grow with the number of submissions.
+
+CSV is written to the response as it's generated. XLSX files are ZIP archives
+which can't be sent until they're finished, so they're written to a temporary
+file first, with openpyxl's write-only mode.
+"""
+
+import csv
+import datetime
+import io
+
+from django.conf import settings
+from django.utils import timezone
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Rows are sent in blocks of about this size, rather than one at a time
+CSV_BLOCK_SIZE = 64 * 1024
+
+
+def get_submissions(page):
+    return (
+        page.get_submission_class()
+        ._default_manager.filter(page=page)
+        .order_by("submit_time", "pk")
+    )
+
+
+def get_headings(page):
+    return [str(label) for _, label in page.get_data_fields()]
+
+
+def get_rows(page, submissions, chunk_size=None):
+    """Yield the values of each submission, in the order of ``get_headings``."""
+    fields = [name for name, _ in page.get_data_fields()]
+    chunk_size = chunk_size or settings.FORM_EXPORT_CHUNK_SIZE
+    for submission in submissions.iterator(chunk_size=chunk_size):
+        data = submission.get_data()
+        yield [data.get(field) for field in fields]
+
+
+def to_csv_value(value):
+    # Checkbox fields submit lists of choices
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return value
+
+
+def to_xlsx_value(value):
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        # Excel has no time zones
+        return timezone.make_naive(value, datetime.timezone.utc)
+    if value is None or isinstance(
+        value, (str, int, float, bool, datetime.date, datetime.time)
+    ):
+        return value
+    return str(value)
+
+
+def stream_csv(page, submissions, chunk_size=None):
+    """Yield a CSV file of the submissions, as UTF-8 encoded blocks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(get_headings(page))
+    for row in get_rows(page, submissions, chunk_size):
+        writer.writerow([to_csv_value(value) for value in row])
+        if buffer.tell() >= CSV_BLOCK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def write_xlsx(page, submissions, fh, chunk_size=None):
+    """Write an XLSX file of the submissions to ``fh``."""
+    from openpyxl import Workbook
+
+    # Write-only worksheets are kept in a temporary file until saved
+    workbook = Workbook(write_only=True, iso_dates=True)
+    worksheet = workbook.create_sheet(title="Submissions")
+    worksheet.append(get_headings(page))
+    for row in get_rows(page, submissions, chunk_size):
+        worksheet.append([to_xlsx_value(value) for value in row])
+    workbook.save(fh)
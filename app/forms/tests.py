@@ -0,0 +1,99 @@
+import csv
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from openpyxl import load_workbook
+from wagtail.contrib.forms.models import FormSubmission
+
+from app.forms.models import FormField, FormPage
+from app.home.models import HomePage
+
+
+@override_settings(FORM_EXPORT_CHUNK_SIZE=2)
+class FormExportTestCase(TestCase):
+    """Tests for streaming form submission exports."""
+
+    def setUp(self):
+        """Create a form page with a few submissions, read two at a time."""
+        self.form_page = HomePage.objects.first().add_child(
+            instance=FormPage(
+                title="Contact",
+                slug="contact",
+                form_fields=[
+                    FormField(label="Name", field_type="singleline"),
+                    FormField(
+                        label="Topics", field_type="checkboxes", choices="News,Events"
+                    ),
+                ],
+            )
+        )
+        FormSubmission.objects.bulk_create(
+            FormSubmission(
+                page=self.form_page,
+                form_data={"name": f"Visitor {i}", "topics": ["News", "Events"]},
+            )
+            for i in range(5)
+        )
+        user = User.objects.create_superuser(username="editor", password="pass")
+        self.client.force_login(user)
+
+    def download(self, export):
+        """Download the form's submissions from the admin."""
+        response = self.client.get(
+            f"/admin/forms/submissions/{self.form_page.pk}/", {"export": export}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def assert_rows(self, rows):
+        """Check the heading and submission rows of an export."""
+        self.assertEqual(rows[0], ["Submission date", "Name", "Topics"])
+        self.assertEqual(
+            [row[1:] for row in rows[1:]],
+            [[f"Visitor {i}", "News, Events"] for i in range(5)],
+        )
+
+    def test_csv_download(self):
+        """Test that the CSV download includes every submission."""
+        response, content = self.download("csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("contact-export-", response["Content-Disposition"])
+        self.assert_rows(list(csv.reader(StringIO(content.decode()))))
+
+    def test_xlsx_download(self):
+        """Test that the XLSX download includes every submission."""
+        response, content = self.download("xlsx")
+        self.assertIn(".xlsx", response["Content-Disposition"])
+        worksheet = load_workbook(BytesIO(content)).active
+        rows = [list(row) for row in worksheet.iter_rows(values_only=True)]
+        self.assert_rows(rows)
+
+    def test_command(self):
+        """Test exporting CSV to stdout and XLSX to a file."""
+        stdout = StringIO()
+        call_command("export_form_submissions", self.form_page.pk, stdout=stdout)
+        self.assert_rows(list(csv.reader(StringIO(stdout.getvalue()))))
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "submissions.xlsx")
+        call_command(
+            "export_form_submissions",
+            self.form_page.pk,
+            format="xlsx",
+            output=path,
+            stdout=StringIO(),
+        )
+        rows = [
+            list(row) for row in load_workbook(path).active.iter_rows(values_only=True)
+        ]
+        self.assert_rows(rows)
+
+        with self.assertRaisesMessage(CommandError, "No form page"):
+            call_command("export_form_submissions", self.form_page.get_parent().pk)
@@ -0,0 +1,41 @@
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from wagtail.contrib.forms.views import SubmissionsListView
+
+from app.forms.export import XLSX_CONTENT_TYPE, stream_csv, write_xlsx
+
+
+class StreamingSubmissionsListView(SubmissionsListView):
+    """
+    Wagtail's submissions listing, with downloads which don't load every
+    submission into memory. Set it as a form page's
+    ``submissions_list_view_class``.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if self.is_export:
+            # Skip building the listing's context, which counts the submissions
+            # by loading them all
+            return self.as_spreadsheet(self.get_queryset(), request.GET.get("export"))
+        return super().get(request, *args, **kwargs)
+
+    def as_spreadsheet(self, queryset, spreadsheet_format):
+        filename = self.get_filename()
+        if spreadsheet_format == self.FORMAT_CSV:
+            response = StreamingHttpResponse(
+                stream_csv(self.form_page, queryset), content_type="text/csv"
+            )
+            response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+            return response
+
+        # Deleted when the response closes it
+        fh = tempfile.TemporaryFile()
+        write_xlsx(self.form_page, queryset, fh)
+        fh.seek(0)
+        return FileResponse(
+            fh,
+            as_attachment=True,
+            content_type=XLSX_CONTENT_TYPE,
+            filename=f"{filename}.xlsx",
+        )
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class HomeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app.home"
+
+    def ready(self):
+        from app.home.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
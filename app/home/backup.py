@@ -0,0 +1,361 @@
+"""
+Streaming, compressed database backups.
+
+A backup is a one line JSON manifest followed by a dump made with the
+database's own tools, compressed with zstd or gzip:
+
+- SQLite: a copy of the database file made with SQLite's online backup API
+- PostgreSQL: a custom format ``pg_dump``, or with more than one job a
+  directory format dump, which exports tables in parallel from one consistent
+  snapshot, in a tar stream. ``pg_restore --jobs`` loads the tables in
+  parallel, adding indexes and foreign keys after the data
+- MySQL: ``mysqldump --single-transaction --quick``, restored with foreign key
+  and unique checks turned off
+
+PostgreSQL and MySQL dumps are piped from the dump tool straight into the
+compressor, and restores from the decompressor into the restore tool, so
+neither the backup nor the database is held in memory or written to disk
+uncompressed. SQLite's backup API needs a file to copy into, a parallel
+``pg_dump`` writes to a directory and a parallel ``pg_restore`` needs a file it
+can seek in, so those use a temporary file or directory.
+"""
+
+import gzip
+import io
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tarfile
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.utils import timezone
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+EXTENSIONS = {"zstd": "zst", "gzip": "gz"}
+# Read and write in large blocks, as dumps can be many GB
+BLOCK_SIZE = 1024 * 1024
+
+
+class BackupError(Exception):
+    pass
+
+
+def get_default_compression():
+    """Use zstd, which is much faster, when its command line tool is installed."""
+    return "zstd" if shutil.which("zstd") else "gzip"
+
+
+def run(args, env=None, stdin=None, stdout=None):
+    """
+    Run a command. ``stdin`` is a file object copied to the command's input
+    and ``stdout`` one its output is copied to, so the command can be fed from
+    or into a compressor.
+    """
+    # A file rather than a pipe, which could fill up and block the command
+    # while its output is being copied
+    errors = tempfile.TemporaryFile()
+    try:
+        process = subprocess.Popen(
+            args,
+            env={**os.environ, **(env or {})},
+            stdin=subprocess.DEVNULL if stdin is None else subprocess.PIPE,
+            stdout=None if stdout is None else subprocess.PIPE,
+            stderr=errors,
+        )
+    except FileNotFoundError:
+        errors.close()
+        raise BackupError(f"{args[0]} isn't installed")
+
+    try:
+        if stdin is not None:
+            try:
+                shutil.copyfileobj(stdin, process.stdin, BLOCK_SIZE)
+            except BrokenPipeError:
+                # The command exited early, and its error is reported below
+                pass
+            finally:
+                process.stdin.close()
+        if stdout is not None:
+            shutil.copyfileobj(process.stdout, stdout, BLOCK_SIZE)
+            process.stdout.close()
+    finally:
+        returncode = process.wait()
+
+    with errors:
+        if returncode:
+            errors.seek(0)
+            error = errors.read().decode(errors="replace")
+            raise BackupError(f"{args[0]} failed:\n{error}")
+
+
+@contextmanager
+def compress(output, compression):
+    """Yield a file object which writes compressed data to ``output``."""
+    if compression == "gzip":
+        with gzip.GzipFile(fileobj=output, mode="wb", compresslevel=6) as fh:
+            yield fh
+        return
+
+    output.flush()
+    process = subprocess.Popen(
+        # A compression thread per CPU core
+        ["zstd", "-q", "-c", "-T0"],
+        stdin=subprocess.PIPE,
+        stdout=output,
+    )
+    try:
+        yield process.stdin
+    finally:
+        process.stdin.close()
+        if process.wait():
+            raise BackupError("zstd failed")
+
+
+@contextmanager
+def decompress(input):
+    """Yield a file object which reads the decompressed ``input``."""
+    magic = input.peek(4)[:4]
+    if magic.startswith(GZIP_MAGIC):
+        with gzip.GzipFile(fileobj=input, mode="rb") as fh:
+            yield fh
+        return
+    if magic != ZSTD_MAGIC:
+        raise BackupError("Not a gzip or zstd compressed backup")
+
+    process = subprocess.Popen(
+        ["zstd", "-q", "-d", "-c"], stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+
+    def feed():
+        # Copy from Python's buffer, which holds the bytes peeked at above
+        try:
+            shutil.copyfileobj(input, process.stdin)
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        yield process.stdout
+    finally:
+        process.stdout.close()
+        feeder.join()
+        if process.wait():
+            raise BackupError("zstd failed")
+
+
+def backup(connection, output, compression, jobs, temp_dir=None):
+    """Write a compressed backup of the database to ``output``."""
+    try:
+        backend = BACKUP_CLASSES[connection.vendor](connection, jobs, temp_dir)
+    except KeyError:
+        raise BackupError(f"Can't back up {connection.vendor} databases")
+
+    manifest = json.dumps(
+        {
+            "vendor": connection.vendor,
+            "created": timezone.now().isoformat(),
+            **backend.get_manifest(),
+        }
+    )
+    with compress(output, compression) as fh:
+        fh.write(manifest.encode() + b"\n")
+        backend.dump(fh)
+
+
+def restore(connection, input, jobs, temp_dir=None):
+    """Replace the database's contents with the backup read from ``input``."""
+    with decompress(input) as fh:
+        try:
+            manifest = json.loads(fh.readline(4096))
+        except ValueError:
+            raise BackupError("Not a backup made by backup_db")
+        if manifest["vendor"] != connection.vendor:
+            raise BackupError(
+                f"Can't restore a {manifest['vendor']} backup into a "
+                f"{connection.vendor} database"
+            )
+
+        backend = BACKUP_CLASSES[connection.vendor](connection, jobs, temp_dir)
+        backend.load(fh, manifest)
+    return manifest
+
+
+class ConcatenatedReader:
+    """A file object which reads each of ``parts``, bytes or files, in turn."""
+
+    def __init__(self, *parts):
+        self.parts = [
+            io.BytesIO(part) if isinstance(part, bytes) else part for part in parts
+        ]
+
+    def read(self, size=-1):
+        while self.parts:
+            data = self.parts[0].read(size)
+            if data:
+                return data
+            self.parts.pop(0)
+        return b""
+
+
+@contextmanager
+def temporary_copy(input, temp_dir):
+    """Yield the path of a temporary file holding the rest of ``input``."""
+    with tempfile.NamedTemporaryFile(dir=temp_dir) as fh:
+        shutil.copyfileobj(input, fh, BLOCK_SIZE)
+        fh.flush()
+        yield fh.name
+
+
+class Backup:
+    def __init__(self, connection, jobs, temp_dir=None):
+        self.connection = connection
+        self.settings_dict = connection.settings_dict
+        self.jobs = jobs
+        self.temp_dir = temp_dir
+
+    def get_client_env(self):
+        """Return the password and SSL environment variables for the client tools."""
+        _, env = self.connection.client.settings_to_cmd_args_env(self.settings_dict, [])
+        return env
+
+    def get_manifest(self):
+        """Return anything else ``load`` needs to know about the dump."""
+        return {}
+
+
+class SQLiteBackup(Backup):
+    def dump(self, output):
+        with tempfile.NamedTemporaryFile(dir=self.temp_dir) as fh:
+            target = sqlite3.connect(fh.name)
+            try:
+                self.connection.ensure_connection()
+                self.connection.connection.backup(target)
+            finally:
+                target.close()
+            shutil.copyfileobj(fh, output, BLOCK_SIZE)
+
+    def load(self, input, manifest):
+        with temporary_copy(input, self.temp_dir) as path:
+            source = sqlite3.connect(path)
+            try:
+                self.connection.ensure_connection()
+                source.backup(self.connection.connection)
+            finally:
+                source.close()
+
+
+class PostgreSQLBackup(Backup):
+    def get_connection_args(self):
+        args = []
+        if self.settings_dict["USER"]:
+            args += ["--username", self.settings_dict["USER"]]
+        if self.settings_dict["HOST"]:
+            args += ["--host", self.settings_dict["HOST"]]
+        if self.settings_dict["PORT"]:
+            args += ["--port", str(self.settings_dict["PORT"])]
+        return args + ["--dbname", self.settings_dict["NAME"]]
+
+    def get_manifest(self):
+        # Only the directory format can be dumped in parallel, and it can't be
+        # written to a pipe
+        return {"format": "directory" if self.jobs > 1 else "custom"}
+
+    def dump(self, output):
+        args = [
+            "pg_dump",
+            # The whole backup is compressed as it's written
+            "--compress=0",
+            *self.get_connection_args(),
+        ]
+        if self.jobs == 1:
+            run([*args, "--format=custom"], env=self.get_client_env(), stdout=output)
+            return
+
+        with tempfile.TemporaryDirectory(dir=self.temp_dir) as directory:
+            path = os.path.join(directory, "dump")
+            run(
+                [*args, "--format=directory", f"--jobs={self.jobs}", f"--file={path}"],
+                env=self.get_client_env(),
+            )
+            # Stream mode, so tar never seeks in the output
+            with tarfile.open(fileobj=output, mode="w|") as tar:
+                tar.add(path, arcname="dump")
+
+    def load(self, input, manifest):
+        self.connection.close()
+        args = [
+            "pg_restore",
+            "--clean",
+            "--if-exists",
+            "--no-owner",
+            "--no-acl",
+            "--exit-on-error",
+            *self.get_connection_args(),
+        ]
+        if manifest.get("format") == "directory":
+            with tempfile.TemporaryDirectory(dir=self.temp_dir) as directory:
+                with tarfile.open(fileobj=input, mode="r|") as tar:
+                    if hasattr(tarfile, "data_filter"):
+                        tar.extractall(directory, filter="data")
+                    else:
+                        tar.extractall(directory)
+                run(
+                    [*args, f"--jobs={self.jobs}", os.path.join(directory, "dump")],
+                    env=self.get_client_env(),
+                )
+        elif self.jobs == 1:
+            run(args, env=self.get_client_env(), stdin=input)
+        else:
+            # pg_restore can only load tables in parallel from a file
+            with temporary_copy(input, self.temp_dir) as path:
+                run([*args, f"--jobs={self.jobs}", path], env=self.get_client_env())
+
+
+class MySQLBackup(Backup):
+    def get_client_args(self):
+        """Return the mysql client's connection options, ending in the database."""
+        args, _ = self.connection.client.settings_to_cmd_args_env(
+            self.settings_dict, []
+        )
+        return args[1:]
+
+    def dump(self, output):
+        # mysqldump can't export tables in parallel from one consistent snapshot
+        run(
+            [
+                "mysqldump",
+                "--single-transaction",
+                "--quick",
+                "--no-tablespaces",
+                *self.get_client_args(),
+            ],
+            env=self.get_client_env(),
+            stdout=output,
+        )
+
+    def load(self, input, manifest):
+        self.connection.close()
+        run(
+            ["mysql", *self.get_client_args()],
+            env=self.get_client_env(),
+            stdin=ConcatenatedReader(
+                b"SET FOREIGN_KEY_CHECKS=0; SET UNIQUE_CHECKS=0; SET autocommit=0;\n",
+                input,
+                b"\nCOMMIT; SET FOREIGN_KEY_CHECKS=1; SET UNIQUE_CHECKS=1;\n",
+            ),
+        )
+
+
+BACKUP_CLASSES = {
+    "sqlite": SQLiteBackup,
+    "postgresql": PostgreSQLBackup,
+    "mysql": MySQLBackup,
+}
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from app.home.backup import (
+    EXTENSIONS,
+    BackupError,
+    backup,
+    get_default_compression,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a compressed backup of the database, streamed through zstd or "
+        "gzip, which restore_db can load"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "output",
+            nargs="?",
+            help="File to write, or - for stdout "
+            "(default: <database vendor>-<date>.zst in the current directory)",
+        )
+        parser.add_argument(
+            "--compression",
+            choices=["zstd", "gzip"],
+            default=get_default_compression(),
+            help="zstd needs the zstd command line tool (default: zstd if installed)",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help="Tables to export at once on PostgreSQL. Above 1, pg_dump writes "
+            "a directory format dump to --temp-dir, which is then streamed to the "
+            "output (default: 1, streamed straight from pg_dump)",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help=f"Database to back up (default: {DEFAULT_DB_ALIAS})",
+        )
+        parser.add_argument(
+            "--temp-dir",
+            help="Directory for the copy of an SQLite database, or a parallel "
+            "PostgreSQL dump, while it's being written (default: the system "
+            "temporary directory)",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        output = options["output"] or (
+            f"{connection.vendor}-{timezone.now():%Y%m%d-%H%M%S}."
+            f"{EXTENSIONS[options['compression']]}"
+        )
+        # Keep stdout for the backup itself
+        log = self.stderr if output == "-" else self.stdout
+
+        start = time.perf_counter()
+        try:
+            if output == "-":
+                backup(
+                    connection,
+                    sys.stdout.buffer,
+                    options["compression"],
+                    options["jobs"],
+                    options["temp_dir"],
+                )
+                sys.stdout.buffer.flush()
+            else:
+                with open(output, "wb") as fh:
+                    backup(
+                        connection,
+                        fh,
+                        options["compression"],
+                        options["jobs"],
+                        options["temp_dir"],
+                    )
+        except BackupError as e:
+            if output != "-" and os.path.exists(output):
+                os.remove(output)
+            raise CommandError(str(e))
+
+        size = "" if output == "-" else f", {os.path.getsize(output) / 1024**2:.1f}MB"
+        log.write(
+            self.style.SUCCESS(
+                f"Backed up the {connection.vendor} database to {output} in "
+                f"{time.perf_counter() - start:.1f}s{size}"
+            )
+        )
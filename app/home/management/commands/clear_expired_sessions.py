@@ -0,0 +1,63 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired sessions from the database in chunks, so the sessions "
+        "table isn't locked by one large delete"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of sessions to delete per query (default: 1000)",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to pause between chunks (default: 0)",
+        )
+
+    def handle(self, *args, **options):
+        engine = import_module(settings.SESSION_ENGINE)
+        if not hasattr(engine.SessionStore, "get_model_class"):
+            # Cache sessions expire by themselves and signed cookie sessions
+            # aren't stored on the server
+            self.stdout.write(
+                f"{settings.SESSION_ENGINE} doesn't store sessions in the database, "
+                "nothing to do."
+            )
+            return
+
+        model = engine.SessionStore.get_model_class()
+        now = timezone.now()
+        deleted = 0
+        start = time.perf_counter()
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=now).values_list("pk", flat=True)[
+                    : options["chunk_size"]
+                ]
+            )
+            if not keys:
+                break
+            model.objects.filter(pk__in=keys).delete()
+            deleted += len(keys)
+            self.stdout.write(f"Deleted {deleted} expired sessions...")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} expired sessions in "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+        )
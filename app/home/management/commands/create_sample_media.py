@@ -3,14 +3,39 @@ import io
 import random
 import string
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
+from django.db.models.signals import post_delete
 from django.utils.text import slugify
 from PIL import Image as PILImage
 from PIL import ImageDraw
+from wagtail.documents import signal_handlers as document_signal_handlers
 from wagtail.documents.models import Document
-from wagtail.images.models import Image
+from wagtail.images import signal_handlers as image_signal_handlers
+from wagtail.images.models import Image, Rendition
+
+
+@contextmanager
+def file_cleanup_disabled():
+    """
+    Stop Wagtail deleting each image, rendition and document file one at a time
+    when its row is deleted, so the files can be deleted in parallel instead.
+    """
+    handlers = [
+        (image_signal_handlers.post_delete_file_cleanup, Image),
+        (image_signal_handlers.post_delete_file_cleanup, Rendition),
+        (document_signal_handlers.post_delete_file_cleanup, Document),
+    ]
+    for handler, sender in handlers:
+        post_delete.disconnect(handler, sender=sender)
+    try:
+        yield
+    finally:
+        for handler, sender in handlers:
+            post_delete.connect(handler, sender=sender)
 
 
 class Command(BaseCommand):
@@ -44,6 +69,12 @@ class Command(BaseCommand):
             action="store_true",
             help="Delete all existing images and documents without creating new ones",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of files to upload or delete in parallel (default: 8)",
+        )
 
     def handle(self, *args, **options):
         if options["reset"]:
@@ -53,8 +84,7 @@ class Command(BaseCommand):
             image_count = Image.objects.count()
             document_count = Document.objects.count()
 
-            Image.objects.all().delete()
-            Document.objects.all().delete()
+            self.delete_all(options["workers"])
 
             self.stdout.write(
                 self.style.SUCCESS(
@@ -65,17 +95,24 @@ class Command(BaseCommand):
 
         if options["clear"]:
             self.stdout.write("Clearing existing images and documents...")
-            Image.objects.all().delete()
-            Document.objects.all().delete()
+            self.delete_all(options["workers"])
             self.stdout.write(self.style.SUCCESS("Cleared existing content."))
 
-        # Create sample images
-        self.create_sample_images(options["images"])
+        # Files are uploaded to storage in parallel, and the database rows
+        # saved in this thread as the uploads finish
+        self.workers = options["workers"]
+        with ThreadPoolExecutor(max_workers=self.workers) as self.executor:
+            self.pending = []
 
-        # Create sample documents
-        self.create_sample_documents(
-            options["documents"], create_zip=not options["no_zip"]
-        )
+            # Create sample images
+            self.create_sample_images(options["images"])
+
+            # Create sample documents
+            self.create_sample_documents(
+                options["documents"], create_zip=not options["no_zip"]
+            )
+
+            self.save_pending()
 
         zip_msg = " and ZIP archives" if not options["no_zip"] else ""
         self.stdout.write(
@@ -84,6 +121,48 @@ class Command(BaseCommand):
             )
         )
 
+    def delete_all(self, workers):
+        """Delete every image and document, then their files in parallel."""
+        files = []
+        for model in (Rendition, Image, Document):
+            storage = model._meta.get_field("file").storage
+            files.extend(
+                (storage, name)
+                for name in model.objects.values_list("file", flat=True).iterator()
+                if name
+            )
+
+        with file_cleanup_disabled():
+            Image.objects.all().delete()
+            Document.objects.all().delete()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda file: file[0].delete(file[1]), files))
+        self.stdout.write(f"  Deleted {len(files)} files")
+
+    def upload(self, instance, filename, content):
+        """
+        Upload a file for an unsaved image or document in the thread pool, then
+        save the instance once it's uploaded.
+        """
+        field = instance._meta.get_field("file")
+        name = field.generate_filename(instance, filename)
+        future = self.executor.submit(field.storage.save, name, ContentFile(content))
+        self.pending.append((instance, future))
+        # Limit how many generated files are held in memory
+        if len(self.pending) >= self.workers * 2:
+            self.save_pending()
+
+    def save_pending(self):
+        for instance, future in self.pending:
+            # Assigning the stored name doesn't upload the file again
+            instance.file = future.result()
+            instance.save()
+            self.stdout.write(
+                f"  Created {instance._meta.verbose_name}: {instance.title}"
+            )
+        self.pending = []
+
     def create_sample_images(self, count):
         """Create sample images with different sizes and colors"""
         self.stdout.write(f"Creating {count} sample images...")
@@ -260,14 +339,11 @@ class Command(BaseCommand):
             img.save(img_io, format="JPEG", quality=85)
             img_io.seek(0)
 
-            # Create Wagtail Image with unique title
+            # Create Wagtail Image with unique title. Setting the size means
+            # the uploaded file isn't read back to find it
             filename = f"sample_image_{i+1}_{slugify(unique_title)}.jpg"
-            image = Image(
-                title=unique_title, file=ContentFile(img_io.getvalue(), name=filename)
-            )
-            image.save()
-
-            self.stdout.write(f"  Created image: {image.title}")
+            image = Image(title=unique_title, width=width, height=height)
+            self.upload(image, filename, img_io.getvalue())
 
     def create_sample_documents(self, count, create_zip=True):
         """Create sample documents (text files) and optionally ZIP archives"""
@@ -509,12 +585,7 @@ Classification: Public
             )
 
             # Create Wagtail Document with unique title
-            document = Document(
-                title=unique_title, file=ContentFile(content_bytes, name=filename)
-            )
-            document.save()
-
-            self.stdout.write(f"  Created document: {document.title}")
+            self.upload(Document(title=unique_title), filename, content_bytes)
 
         # Create ZIP archives if requested
         if create_zip and created_docs:
@@ -571,15 +642,11 @@ document management systems, search functionality, and user interfaces.
         all_docs_zip.seek(0)
 
         # Create the comprehensive ZIP document
-        zip_document = Document(
-            title=f"Complete Document Archive ({len(documents)} files)",
-            file=ContentFile(
-                all_docs_zip.getvalue(),
-                name=f"document_archive_{len(documents)}_files.zip",
-            ),
+        self.upload(
+            Document(title=f"Complete Document Archive ({len(documents)} files)"),
+            f"document_archive_{len(documents)}_files.zip",
+            all_docs_zip.getvalue(),
         )
-        zip_document.save()
-        self.stdout.write(f"  Created ZIP archive: {zip_document.title}")
 
         # Create smaller themed ZIP files
         docs_per_zip = max(1, len(documents) // len(zip_groups))
@@ -625,12 +692,11 @@ Files: {len(zip_docs)}
             themed_zip.seek(0)
 
             # Create themed ZIP document
-            themed_zip_document = Document(
-                title=f"{zip_info['description']} ({len(zip_docs)} files)",
-                file=ContentFile(themed_zip.getvalue(), name=f"{zip_info['name']}.zip"),
+            self.upload(
+                Document(title=f"{zip_info['description']} ({len(zip_docs)} files)"),
+                f"{zip_info['name']}.zip",
+                themed_zip.getvalue(),
             )
-            themed_zip_document.save()
-            self.stdout.write(f"  Created themed ZIP: {themed_zip_document.title}")
 
     def get_random_date(self):
         """Generate a random date string"""
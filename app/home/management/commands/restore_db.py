@@ -0,0 +1,71 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from app.home.backup import BackupError, restore
+
+
+class Command(BaseCommand):
+    help = "Replaces the database's contents with a backup made by backup_db"
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Backup file to restore, or - for stdin")
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Don't ask for confirmation",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=4,
+            help="Tables to load at once on PostgreSQL (default: 4)",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help=f"Database to restore into (default: {DEFAULT_DB_ALIAS})",
+        )
+        parser.add_argument(
+            "--temp-dir",
+            help="Directory for the uncompressed SQLite or PostgreSQL dump while "
+            "it's being loaded (default: the system temporary directory)",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if options["interactive"]:
+            if options["input"] == "-":
+                raise CommandError("Use --noinput when reading the backup from stdin")
+            confirm = input(
+                f"This will replace everything in the "
+                f"{connection.settings_dict['NAME']} database. Type 'yes' to "
+                "continue: "
+            )
+            if confirm != "yes":
+                raise CommandError("Restore cancelled.")
+
+        start = time.perf_counter()
+        try:
+            if options["input"] == "-":
+                manifest = restore(
+                    connection, sys.stdin.buffer, options["jobs"], options["temp_dir"]
+                )
+            else:
+                with open(options["input"], "rb") as fh:
+                    manifest = restore(
+                        connection, fh, options["jobs"], options["temp_dir"]
+                    )
+        except (BackupError, OSError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Restored the backup from {manifest['created']} in "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+        )
@@ -0,0 +1,274 @@
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand, CommandError
+from wagtail.documents import get_document_model
+from wagtail.images import get_image_model
+
+MANIFEST_NAME = ".media-manifest.json"
+# Seconds between saving the manifest, so an interrupted sync can resume
+SAVE_INTERVAL = 5
+
+
+class HashingFile(File):
+    """A file which calculates the SHA-1 and size of the content read from it."""
+
+    def __init__(self, file, name):
+        super().__init__(file, name)
+        self.reset()
+
+    def reset(self):
+        self.sha1 = hashlib.sha1()
+        self.bytes_read = 0
+
+    def read(self, *args):
+        data = self.file.read(*args)
+        self.sha1.update(data)
+        self.bytes_read += len(data)
+        return data
+
+    def seek(self, offset, *args):
+        if offset == 0:
+            self.reset()
+        return self.file.seek(offset, *args)
+
+
+class Manifest:
+    """
+    The name, SHA-1 and size of each file copied to a storage, saved in the
+    storage itself.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.files = {}
+        if storage.exists(MANIFEST_NAME):
+            with storage.open(MANIFEST_NAME, "rb") as fh:
+                self.files = json.load(fh)["files"]
+
+    def is_current(self, name, file_hash, source, hash_source=False):
+        """
+        Return whether the file has been copied and hasn't changed since.
+
+        Wagtail records the SHA-1 of original images and documents. Files
+        without one are compared by size, or by hashing the source file if
+        ``hash_source`` is set.
+        """
+        entry = self.files.get(name)
+        if entry is None:
+            return False
+        if hash_source:
+            return entry["sha1"] == hash_file(source, name)
+        if file_hash:
+            return entry["sha1"] == file_hash
+        return entry["size"] == source.size(name)
+
+    def add(self, name, sha1, size):
+        self.files[name] = {"sha1": sha1, "size": size}
+
+    def save(self):
+        content = json.dumps({"version": 1, "files": self.files}).encode()
+        if self.storage.exists(MANIFEST_NAME):
+            self.storage.delete(MANIFEST_NAME)
+        self.storage.save(MANIFEST_NAME, ContentFile(content))
+
+
+def get_media_files(renditions=True):
+    """
+    Yield the storage, name and recorded SHA-1 (if any) of every original
+    image, document and, optionally, rendition file.
+    """
+    image_model = get_image_model()
+    for model in (image_model, get_document_model()):
+        storage = model._meta.get_field("file").storage
+        for name, file_hash in model.objects.values_list(
+            "file", "file_hash"
+        ).iterator():
+            if name:
+                yield storage, name, file_hash
+
+    if renditions:
+        # Rendition files are never changed once written
+        rendition_model = image_model.get_rendition_model()
+        storage = rendition_model._meta.get_field("file").storage
+        for name in rendition_model.objects.values_list("file", flat=True).iterator():
+            if name:
+                yield storage, name, ""
+
+
+def hash_file(storage, name):
+    """Return the SHA-1 of a file in a storage."""
+    with storage.open(name, "rb") as fh:
+        content = HashingFile(fh, name)
+        for _ in content.chunks():
+            pass
+    return content.sha1.hexdigest()
+
+
+def copy_file(source, destination, name):
+    """Copy a file between storages, returning its SHA-1 and size."""
+    with source.open(name, "rb") as fh:
+        content = HashingFile(fh, name)
+        # Replace the file, rather than saving alongside it with a new name
+        if destination.exists(name):
+            destination.delete(name)
+        saved_name = destination.save(name, content)
+    if saved_name != name:
+        raise OSError(f"Saved {name} as {saved_name}")
+    return content.sha1.hexdigest(), content.bytes_read
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies original images, documents and renditions which have changed "
+        "since the last sync to or from a directory, in parallel"
+    )
+
+    def add_arguments(self, parser):
+        direction = parser.add_mutually_exclusive_group(required=True)
+        direction.add_argument(
+            "--to",
+            metavar="DIRECTORY",
+            help="Copy the site's media to this directory",
+        )
+        direction.add_argument(
+            "--from",
+            dest="from_",
+            metavar="DIRECTORY",
+            help="Copy media from this directory to the site's media storage",
+        )
+        parser.add_argument(
+            "--skip-renditions",
+            action="store_true",
+            help="Don't copy renditions, which Wagtail creates again when needed",
+        )
+        parser.add_argument(
+            "--delete",
+            action="store_true",
+            help="Delete previously synced files which no longer exist on the site",
+        )
+        parser.add_argument(
+            "--hash",
+            action="store_true",
+            help=(
+                "Hash every source file to find changes, rather than trusting "
+                "Wagtail's recorded hash or the file size"
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of files to copy in parallel (default: 8)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the files which would be copied without copying them",
+        )
+
+    def handle(self, *args, **options):
+        directory = FileSystemStorage(location=options["to"] or options["from_"])
+        if options["from_"] and not directory.exists(""):
+            raise CommandError(f"{options['from_']} doesn't exist")
+
+        files = []
+        skipped = 0
+        # The manifest records what's in the destination storage
+        manifests = {}
+        for storage, name, file_hash in get_media_files(
+            renditions=not options["skip_renditions"]
+        ):
+            source, destination = (
+                (storage, directory) if options["to"] else (directory, storage)
+            )
+            if destination not in manifests:
+                manifests[destination] = Manifest(destination)
+            if manifests[destination].is_current(
+                name, file_hash, source, hash_source=options["hash"]
+            ):
+                skipped += 1
+            else:
+                files.append((source, destination, name))
+
+        self.stdout.write(f"{len(files)} files to copy, {skipped} unchanged")
+        if options["dry_run"]:
+            for _, _, name in files:
+                self.stdout.write(name)
+            return
+
+        start = time.perf_counter()
+        try:
+            copied, size, failed = self.copy_files(files, manifests, options["workers"])
+            deleted = self.delete_removed(manifests) if options["delete"] else 0
+        finally:
+            # Record what was copied, even if the sync was interrupted
+            for manifest in manifests.values():
+                manifest.save()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Copied {copied} files ({size / 1024**2:.1f}MB) and deleted "
+                f"{deleted} in {time.perf_counter() - start:.1f}s"
+            )
+        )
+        if failed:
+            raise CommandError(f"{failed} files couldn't be copied")
+
+    def copy_files(self, files, manifests, workers):
+        copied = size = failed = 0
+        last_save = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            files = iter(files)
+            try:
+                while True:
+                    # Keep a few copies queued for each worker, rather than
+                    # queueing every file up front
+                    for source, destination, name in files:
+                        future = executor.submit(copy_file, source, destination, name)
+                        pending[future] = (destination, name)
+                        if len(pending) >= workers * 2:
+                            break
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        destination, name = pending.pop(future)
+                        try:
+                            sha1, file_size = future.result()
+                        except Exception as e:
+                            self.stderr.write(f"Couldn't copy {name}: {e}")
+                            failed += 1
+                            continue
+                        manifests[destination].add(name, sha1, file_size)
+                        copied += 1
+                        size += file_size
+
+                    if time.monotonic() - last_save > SAVE_INTERVAL:
+                        for manifest in manifests.values():
+                            manifest.save()
+                        last_save = time.monotonic()
+                        self.stdout.write(f"Copied {copied} files...")
+            except KeyboardInterrupt:
+                for future in pending:
+                    future.cancel()
+                raise
+        return copied, size, failed
+
+    def delete_removed(self, manifests):
+        """Delete synced files which are no longer used by the site."""
+        current = {name for _, name, _ in get_media_files(renditions=True)}
+        deleted = 0
+        for storage, manifest in manifests.items():
+            for name in set(manifest.files) - current:
+                storage.delete(name)
+                del manifest.files[name]
+                deleted += 1
+        return deleted
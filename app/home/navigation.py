@@ -0,0 +1,66 @@
+"""
+The site's navigation menu, built from one query and cached.
+
+Every live page below the site's root page with "Show in menus" ticked is
+loaded in one query, ordered by its treebeard path, which puts each page
+straight after its parent and siblings in menu order. Each page is attached to
+its parent by cutting the last step off its path, so a page whose parent isn't
+in the menu is left out along with everything below it.
+
+The menu is cached per site, language and depth. Publishing, unpublishing,
+moving or deleting any page starts a new cache generation.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from wagtail.models import Page, Site
+
+GENERATION_KEY = "navigation:generation"
+
+
+def invalidate():
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def build_menu(request, root, max_depth):
+    """Return nested menu items for the pages below ``root``."""
+    pages = (
+        Page.objects.descendant_of(root)
+        .live()
+        .in_menu()
+        .filter(depth__lte=root.depth + max_depth)
+        .only("id", "path", "depth", "title", "url_path")
+        .order_by("path")
+    )
+    menu = []
+    children_by_path = {root.path: menu}
+    for page in pages:
+        siblings = children_by_path.get(page.path[: -Page.steplen])
+        if siblings is None:
+            continue
+        item = {"title": page.title, "url": page.get_url(request), "children": []}
+        siblings.append(item)
+        children_by_path[page.path] = item["children"]
+    return menu
+
+
+def get_menu(request, max_depth=2):
+    """Return the cached menu for the request's site and language."""
+    site = Site.find_for_request(request)
+    if site is None:
+        return []
+
+    # A missing generation, such as after the cache is cleared, starts a new one
+    cache.add(GENERATION_KEY, time.time_ns(), None)
+    key = (
+        f"navigation:{cache.get(GENERATION_KEY)}:{site.pk}:"
+        f"{translation.get_language()}:{max_depth}"
+    )
+    menu = cache.get(key)
+    if menu is None:
+        menu = build_menu(request, site.root_page.localized, max_depth)
+        cache.set(key, menu, settings.NAVIGATION_CACHE_TIMEOUT)
+    return menu
@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+from wagtail.models import Page
+from wagtail.signals import page_published, page_unpublished, post_page_move
+
+from app.home.navigation import invalidate
+
+
+def invalidate_navigation(**kwargs):
+    # Wait for the commit, otherwise the menu could be built again from the
+    # database before the change is visible
+    transaction.on_commit(invalidate)
+
+
+def invalidate_navigation_on_delete(instance, **kwargs):
+    # Sent for every model, and for each specific page type
+    if isinstance(instance, Page):
+        invalidate_navigation()
+
+
+def register_signal_handlers():
+    page_published.connect(invalidate_navigation)
+    page_unpublished.connect(invalidate_navigation)
+    post_page_move.connect(invalidate_navigation)
+    post_delete.connect(invalidate_navigation_on_delete)
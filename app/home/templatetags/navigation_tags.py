@@ -0,0 +1,15 @@
+from django import template
+
+from app.home.navigation import get_menu
+
+register = template.Library()
+
+
+@register.inclusion_tag("home/includes/navigation.html", takes_context=True)
+def site_navigation(context, max_depth=2):
+    """Render the site's menu, up to ``max_depth`` levels below the root page."""
+    request = context.get("request")
+    return {
+        "items": get_menu(request, max_depth) if request else [],
+        "request": request,
+    }
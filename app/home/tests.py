@@ -1,7 +1,34 @@
+import os
+import shutil
+import sys
+import tempfile
+from io import BufferedReader, BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from wagtail.documents.models import Document
+from wagtail.images.models import Image
 
+from app.home.backup import BackupError, ConcatenatedReader, backup, restore, run
 from app.home.models import HomePage
+from app.home.navigation import get_menu
+from app.tests_utils import TemporaryMediaMixin
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
 
 
 class HomeTestCase(TestCase):
@@ -64,3 +91,363 @@ class HomeTestCase(TestCase):
         self._login_as_admin()
         response = self.client.get(f"/admin/pages/{self.home_page.pk}/history/")
         self.assertEqual(response.status_code, 200)
+
+
+class SessionTestCase(TestCase):
+    """Tests for the configurable session engines."""
+
+    # SessionMiddleware picks the engine when it's loaded, so each engine needs
+    # a new test client
+    engines = [
+        "django.contrib.sessions.backends.db",
+        "django.contrib.sessions.backends.cached_db",
+        "django.contrib.sessions.backends.cache",
+        "django.contrib.sessions.backends.signed_cookies",
+    ]
+
+    def test_anonymous_page_view_does_not_touch_sessions(self):
+        """Test that anonymous page views don't read or write session storage."""
+        for engine in self.engines:
+            with self.subTest(engine), self.settings(SESSION_ENGINE=engine):
+                with CaptureQueriesContext(connection) as queries:
+                    response = Client().get("/")
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+                self.assertFalse(
+                    [q for q in queries if "django_session" in q["sql"]],
+                )
+
+    def test_admin_login_with_each_engine(self):
+        """Test that editors can log in with every session engine."""
+        user = User.objects.create_superuser(username="editor", password="pass")
+        for engine in self.engines:
+            with self.subTest(engine), self.settings(SESSION_ENGINE=engine):
+                client = Client()
+                client.force_login(user)
+                self.assertEqual(client.get("/admin/").status_code, 200)
+
+    def test_clear_expired_sessions(self):
+        """Test that expired sessions are deleted in chunks and others kept."""
+        for expiry in [-60] * 5 + [60]:
+            session = SessionStore()
+            session.set_expiry(expiry)
+            session.create()
+
+        out = StringIO()
+        call_command("clear_expired_sessions", chunk_size=2, stdout=out)
+        self.assertEqual(Session.objects.count(), 1)
+        self.assertIn("Deleted 5 expired sessions", out.getvalue())
+
+
+class CreateSampleMediaTestCase(TemporaryMediaMixin, TestCase):
+    """Tests for the create_sample_media command."""
+
+    def create_and_reset(self):
+        """Create sample media, then reset it, returning the stored files."""
+        call_command(
+            "create_sample_media",
+            images=3,
+            documents=3,
+            workers=4,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Image.objects.count(), 3)
+        # 3 documents and 4 ZIP archives
+        self.assertEqual(Document.objects.count(), 7)
+        image = Image.objects.first()
+        self.assertTrue(image.file.storage.exists(image.file.name))
+        self.assertGreater(image.width, 0)
+        image.get_rendition("fill-10x10")
+
+        stored = [
+            (model.file.storage, model.file.name)
+            for model in [*Image.objects.all(), *Document.objects.all()]
+        ]
+        stored.append((image.file.storage, image.renditions.get().file.name))
+
+        call_command("create_sample_media", reset=True, stdout=StringIO())
+        self.assertFalse(Image.objects.exists())
+        self.assertFalse(Document.objects.exists())
+        return stored
+
+    def test_create_and_reset(self):
+        """Test that files are uploaded, and deleted with their rows on reset."""
+        for storage, name in self.create_and_reset():
+            self.assertFalse(storage.exists(name), name)
+
+    @skipUnless(mock_aws, "moto isn't installed")
+    def test_create_and_reset_with_s3(self):
+        """Test creating and resetting media in a mocked S3 bucket."""
+        with mock_aws():
+            s3 = boto3.client("s3", region_name="us-east-1")
+            s3.create_bucket(Bucket="media")
+            storages = {
+                **settings.STORAGES,
+                "default": {
+                    "BACKEND": "storages.backends.s3.S3Storage",
+                    "OPTIONS": {"bucket_name": "media", "file_overwrite": False},
+                },
+            }
+            with self.settings(STORAGES=storages):
+                stored = self.create_and_reset()
+
+            self.assertEqual(len(stored), 11)
+            self.assertEqual(s3.list_objects_v2(Bucket="media")["KeyCount"], 0)
+
+
+class BackupTestCase(SimpleTestCase):
+    """Tests for the backup_db and restore_db commands."""
+
+    def setUp(self):
+        """Use a temporary SQLite database, so the test database isn't replaced."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.connection = DatabaseWrapper(
+            {
+                **connections.settings[DEFAULT_DB_ALIAS],
+                "NAME": os.path.join(self.directory, "db.sqlite3"),
+            },
+            alias="backup",
+        )
+        self.addCleanup(self.connection.close)
+
+    def get_names(self):
+        """Return the names in the test table."""
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM item ORDER BY name")
+            return [name for (name,) in cursor.fetchall()]
+
+    def backup_and_restore(self, compression):
+        """Back up the database, change it, then restore the backup."""
+        with self.connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (name TEXT)")
+            cursor.execute("INSERT INTO item VALUES ('before backup')")
+
+        path = os.path.join(self.directory, "backup")
+        with open(path, "wb") as fh:
+            backup(self.connection, fh, compression, jobs=2)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM item")
+            cursor.execute("INSERT INTO item VALUES ('after backup')")
+
+        with open(path, "rb") as fh:
+            manifest = restore(self.connection, fh, jobs=2)
+        self.assertEqual(manifest["vendor"], "sqlite")
+        self.assertEqual(self.get_names(), ["before backup"])
+
+    def test_gzip(self):
+        """Test a gzip compressed backup and restore."""
+        self.backup_and_restore("gzip")
+
+    @skipUnless(shutil.which("zstd"), "zstd isn't installed")
+    def test_zstd(self):
+        """Test a zstd compressed backup and restore."""
+        self.backup_and_restore("zstd")
+
+    def test_dump_is_piped(self):
+        """Test that a dump tool's output is streamed rather than saved first."""
+        output = BytesIO()
+        run(
+            [
+                sys.executable,
+                "-c",
+                "import shutil, sys; shutil.copyfileobj(sys.stdin, sys.stdout)",
+            ],
+            stdin=ConcatenatedReader(b"SET x;\n", BytesIO(b"dump"), b"\nCOMMIT;"),
+            stdout=output,
+        )
+        self.assertEqual(output.getvalue(), b"SET x;\ndump\nCOMMIT;")
+
+        with self.assertRaisesMessage(BackupError, "Access denied"):
+            run([sys.executable, "-c", "import sys; sys.exit('Access denied')"])
+
+    def test_parallel_postgresql_dump(self):
+        """Test that a parallel pg_dump's directory is streamed and restored."""
+        connection = mock.Mock(vendor="postgresql")
+        connection.settings_dict = {"USER": "", "HOST": "", "PORT": "", "NAME": "db"}
+        connection.client.settings_to_cmd_args_env.return_value = ([], {})
+        commands = []
+
+        def run(args, env=None, stdin=None, stdout=None):
+            commands.append(args)
+            if args[0] == "pg_dump":
+                path = args[-1].removeprefix("--file=")
+                os.makedirs(path)
+                with open(os.path.join(path, "toc.dat"), "w") as fh:
+                    fh.write("tables")
+            else:
+                with open(os.path.join(args[-1], "toc.dat")) as fh:
+                    self.assertEqual(fh.read(), "tables")
+
+        output = BytesIO()
+        with mock.patch("app.home.backup.run", run):
+            backup(connection, output, "gzip", jobs=4)
+            output.seek(0)
+            manifest = restore(connection, BufferedReader(output), jobs=2)
+
+        self.assertEqual(manifest["format"], "directory")
+        self.assertIn("--format=directory", commands[0])
+        self.assertIn("--jobs=4", commands[0])
+        self.assertIn("--jobs=2", commands[1])
+
+    def test_restore_rejects_other_files(self):
+        """Test that restoring a file which isn't a backup fails."""
+        path = os.path.join(self.directory, "backup")
+        with open(path, "wb") as fh:
+            fh.write(b"not a backup")
+        with self.assertRaisesMessage(CommandError, "Not a gzip or zstd"):
+            call_command("restore_db", path, interactive=False)
+
+
+class SyncMediaTestCase(TemporaryMediaMixin, TestCase):
+    """Tests for the sync_media command."""
+
+    def setUp(self):
+        """Create sample media in a temporary media root."""
+        super().setUp()
+        self.backup_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.backup_dir)
+
+        call_command(
+            "create_sample_media", images=2, documents=2, no_zip=True, stdout=StringIO()
+        )
+        # Wagtail caches renditions, which may be left from another test
+        cache.clear()
+        self.rendition = Image.objects.first().get_rendition("fill-10x10")
+
+    def sync(self, *args):
+        """Run sync_media and return its output."""
+        stdout = StringIO()
+        call_command("sync_media", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_sync_to_directory(self):
+        """Test that files are copied once, and copied again when they change."""
+        self.assertIn(
+            "5 files to copy, 0 unchanged", self.sync("--to", self.backup_dir)
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.backup_dir, self.rendition.file.name))
+        )
+        self.assertIn(
+            "0 files to copy, 5 unchanged", self.sync("--to", self.backup_dir)
+        )
+
+        Document.objects.update(file_hash="changed")
+        self.assertIn(
+            "2 files to copy, 3 unchanged", self.sync("--to", self.backup_dir)
+        )
+
+    def test_sync_without_recorded_hash(self):
+        """Test that files without a recorded hash are compared by size or hash."""
+        Image.objects.update(file_hash="")
+        Document.objects.update(file_hash="")
+        self.sync("--to", self.backup_dir)
+        self.assertIn(
+            "0 files to copy, 5 unchanged", self.sync("--to", self.backup_dir)
+        )
+
+        # A rendition written again with a different size
+        storage = self.rendition.file.storage
+        storage.delete(self.rendition.file.name)
+        storage.save(self.rendition.file.name, ContentFile(b"resized"))
+        self.assertIn(
+            "1 files to copy, 4 unchanged", self.sync("--to", self.backup_dir)
+        )
+
+        # The same size, but different content
+        storage.delete(self.rendition.file.name)
+        storage.save(self.rendition.file.name, ContentFile(b"changed"))
+        self.assertIn(
+            "0 files to copy, 5 unchanged", self.sync("--to", self.backup_dir)
+        )
+        self.assertIn(
+            "1 files to copy, 4 unchanged",
+            self.sync("--to", self.backup_dir, "--hash"),
+        )
+
+    def test_sync_from_directory_without_renditions(self):
+        """Test restoring the original files from a directory."""
+        self.sync("--to", self.backup_dir, "--skip-renditions")
+        self.assertFalse(
+            os.path.exists(os.path.join(self.backup_dir, self.rendition.file.name))
+        )
+
+        shutil.rmtree(self.media_root)
+        self.assertIn(
+            "4 files to copy, 0 unchanged",
+            self.sync("--from", self.backup_dir, "--skip-renditions"),
+        )
+        for document in Document.objects.all():
+            self.assertTrue(document.file.storage.exists(document.file.name))
+
+
+class NavigationTestCase(TestCase):
+    """Tests for the site navigation menu."""
+
+    def setUp(self):
+        """Create a small tree of pages, some of them hidden from menus."""
+        cache.clear()
+        self.home_page = HomePage.objects.first()
+        self.about = self.add_page(self.home_page, "About")
+        self.team = self.add_page(self.about, "Team")
+        self.add_page(self.team, "Too deep")
+        hidden = self.add_page(self.home_page, "Hidden", show_in_menus=False)
+        self.add_page(hidden, "Under hidden")
+        self.contact = self.add_page(self.home_page, "Contact")
+
+    def add_page(self, parent, title, show_in_menus=True):
+        """Add a page below ``parent``."""
+        return parent.add_child(
+            instance=HomePage(
+                title=title,
+                slug=title.lower().replace(" ", "-"),
+                show_in_menus=show_in_menus,
+            )
+        )
+
+    def get_menu(self):
+        """Return the menu, with only the titles of each item."""
+
+        def titles(items):
+            return [(item["title"], titles(item["children"])) for item in items]
+
+        return titles(get_menu(RequestFactory().get("/")))
+
+    def test_menu_is_nested_and_cached(self):
+        """Test that the menu tree is built in one query, then cached."""
+        # Finding the site, the root page and its translation, then the menu
+        with self.assertNumQueries(3):
+            menu = self.get_menu()
+        self.assertEqual(menu, [("About", [("Team", [])]), ("Contact", [])])
+
+        with self.assertNumQueries(1):
+            # Only finding the site
+            self.assertEqual(self.get_menu(), menu)
+
+        response = self.client.get("/about/")
+        self.assertContains(
+            response, '<a href="/about/" aria-current="page">About</a>', html=True
+        )
+
+    def test_menu_is_invalidated(self):
+        """Test that publishing, unpublishing and moving pages rebuild the menu."""
+        self.get_menu()
+
+        self.contact.title = "Get in touch"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.contact.save_revision().publish()
+        self.assertEqual(
+            self.get_menu(), [("About", [("Team", [])]), ("Get in touch", [])]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.move(self.contact, pos="last-child")
+        self.assertEqual(
+            self.get_menu(), [("About", []), ("Get in touch", [("Team", [])])]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.about.unpublish()
+        self.assertEqual(self.get_menu(), [("Get in touch", [("Team", [])])])
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class ImagesConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "app.images"
+
+    def ready(self):
+        from app.images.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
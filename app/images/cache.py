@@ -0,0 +1,118 @@
+"""
+An on-disk cache of the images served by the dynamic image serve view.
+
+Each rendered image is saved as ``<IMAGE_SERVE_CACHE_DIR>/<image id>/<key>.<ext>``
+so a cached image is served without touching the media storage. The key is
+made from the filter spec and the image's version: its file, file hash and
+focal point. Replacing the file or moving the focal point gives new keys on
+every server, so an out of date image can't be served even from a cache
+directory that wasn't cleared. The directory for an image is removed when it's
+saved or deleted, which only frees the space.
+
+Rendering is single-flight: when several requests ask for the same uncached
+image at once, one renders it while the others wait and then serve the result.
+Locks are striped, so a fixed number of locks (and lock files, which also
+cover other worker processes on the same server) are shared by every key.
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where only threads in one process are locked
+    fcntl = None
+
+LOCK_STRIPES = 64
+_thread_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+def get_image_dir(image_id):
+    return os.path.join(settings.IMAGE_SERVE_CACHE_DIR, str(image_id))
+
+
+def get_version(image):
+    """Return a token which changes when the image's rendered output would."""
+    return "|".join(
+        str(value)
+        for value in (
+            image.file.name,
+            image.file_hash,
+            image.focal_point_x,
+            image.focal_point_y,
+            image.focal_point_width,
+            image.focal_point_height,
+        )
+    )
+
+
+def get_key(name):
+    return hashlib.sha1(name.encode()).hexdigest()
+
+
+def find(image_id, version, filter_spec):
+    """Return the path of a cached image, or None."""
+    pattern = os.path.join(
+        glob.escape(get_image_dir(image_id)), f"{get_key(version + filter_spec)}.*"
+    )
+    for path in glob.glob(pattern):
+        if not path.endswith(".tmp"):
+            return path
+    return None
+
+
+@contextmanager
+def single_flight(name):
+    """Hold the lock for ``name`` across threads and processes."""
+    stripe = int(get_key(name), 16) % LOCK_STRIPES
+    with _thread_locks[stripe]:
+        if fcntl is None:
+            yield
+            return
+
+        lock_dir = os.path.join(settings.IMAGE_SERVE_CACHE_DIR, ".locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, str(stripe)), "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def get_or_create(image_id, version, filter_spec, create):
+    """
+    Return the path of a cached image, calling ``create()`` to render it if it
+    isn't cached. ``create`` returns the file extension and the file content.
+    """
+    path = find(image_id, version, filter_spec)
+    if path:
+        return path
+
+    with single_flight(f"{image_id}/{version}/{filter_spec}"):
+        # Another request may have rendered it while this one waited
+        path = find(image_id, version, filter_spec)
+        if path:
+            return path
+
+        extension, content = create()
+        image_dir = get_image_dir(image_id)
+        os.makedirs(image_dir, exist_ok=True)
+        path = os.path.join(image_dir, f"{get_key(version + filter_spec)}{extension}")
+        partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial_path, "wb") as fh:
+            fh.write(content)
+        os.replace(partial_path, path)
+        return path
+
+
+def clear(image_id):
+    """Remove an image's cached sizes, which are out of date once it changes."""
+    shutil.rmtree(get_image_dir(image_id), ignore_errors=True)
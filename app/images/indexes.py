@@ -0,0 +1,140 @@
+"""
+Database indexes for large image and document libraries.
+
+Wagtail's admin listings and choosers filter images and documents by collection
+and sort them by date, title or file size, and annotate each row with a usage
+count from the reference index. Wagtail only indexes a few of those columns, so
+with tens of thousands of items each listing page sorts the whole table.
+
+The indexes are added by this app's migrations, because the tables belong to
+Wagtail's apps. Migrations can only change the state of their own app's
+models, so rather than ``AddIndexConcurrently`` the migration calls the schema
+editor directly, outside a transaction. On PostgreSQL the indexes are built
+concurrently, so the tables aren't locked against writes while they're built.
+``manage.py benchmark_media_library`` measures their effect.
+
+The trigram indexes need the ``pg_trgm`` extension. Creating it needs the
+CREATE privilege on the database, which the database owner has. If it can't be
+created, the trigram indexes are left out and a warning is logged. Once a
+superuser has run ``CREATE EXTENSION pg_trgm``, run
+``manage.py migrate images zero`` then ``manage.py migrate images`` to add them.
+"""
+
+import logging
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import DatabaseError, models
+from django.db.models.functions import Upper
+
+logger = logging.getLogger(__name__)
+
+
+def has_pg_trgm(connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_pg_trgm(connection):
+    """Create the pg_trgm extension if it's missing, returning whether it exists."""
+    if has_pg_trgm(connection):
+        return True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as e:
+        logger.warning(
+            "The trigram title indexes weren't added, as the pg_trgm extension "
+            "couldn't be created: %s",
+            e,
+        )
+        return False
+    return True
+
+
+def get_indexes(apps, connection):
+    """Return (model, index) pairs for the database."""
+    image_model = apps.get_model("wagtailimages", "Image")
+    document_model = apps.get_model("wagtaildocs", "Document")
+    reference_index_model = apps.get_model("wagtailcore", "ReferenceIndex")
+
+    indexes = [
+        (
+            image_model,
+            models.Index(
+                fields=["collection", "-created_at"], name="app_image_coll_created_idx"
+            ),
+        ),
+        (
+            image_model,
+            models.Index(
+                fields=["collection", "title"], name="app_image_coll_title_idx"
+            ),
+        ),
+        (image_model, models.Index(fields=["title"], name="app_image_title_idx")),
+        (image_model, models.Index(fields=["file_size"], name="app_image_size_idx")),
+        (
+            document_model,
+            models.Index(fields=["-created_at"], name="app_doc_created_idx"),
+        ),
+        (
+            document_model,
+            models.Index(
+                fields=["collection", "-created_at"], name="app_doc_coll_created_idx"
+            ),
+        ),
+        (
+            document_model,
+            models.Index(fields=["collection", "title"], name="app_doc_coll_title_idx"),
+        ),
+        (document_model, models.Index(fields=["title"], name="app_doc_title_idx")),
+        (document_model, models.Index(fields=["file_size"], name="app_doc_size_idx")),
+        # The usage count of each image or document in a listing
+        (
+            reference_index_model,
+            models.Index(
+                fields=["to_content_type", "to_object_id"], name="app_refindex_to_idx"
+            ),
+        ),
+    ]
+
+    if has_pg_trgm(connection):
+        # Case insensitive "contains" lookups, as used by the fallback search
+        # backend and the site search, compare UPPER(title)
+        for model, prefix in [(image_model, "image"), (document_model, "doc")]:
+            indexes.append(
+                (
+                    model,
+                    GinIndex(
+                        OpClass(Upper("title"), name="gin_trgm_ops"),
+                        name=f"app_{prefix}_title_trgm_idx",
+                    ),
+                )
+            )
+    return indexes
+
+
+def add_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        create_pg_trgm(connection)
+        for model, index in get_indexes(apps, connection):
+            schema_editor.add_index(model, index, concurrently=True)
+    else:
+        for model, index in get_indexes(apps, connection):
+            schema_editor.add_index(model, index)
+
+
+def remove_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    for model, index in get_indexes(apps, connection):
+        if connection.vendor == "postgresql":
+            # The trigram indexes are missing if pg_trgm was installed later
+            schema_editor.execute(
+                "DROP INDEX CONCURRENTLY IF EXISTS "
+                f"{schema_editor.quote_name(index.name)}"
+            )
+        else:
+            schema_editor.remove_index(model, index)
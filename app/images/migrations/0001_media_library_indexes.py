@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from app.images.indexes import add_indexes, remove_indexes
+
+
+class Migration(migrations.Migration):
+    # Indexes can only be built concurrently outside a transaction
+    atomic = False
+
+    dependencies = [
+        (
+            "taggit",
+            "0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx",
+        ),
+        ("wagtailcore", "0095_groupsitepermission"),
+        ("wagtaildocs", "0014_alter_document_file_size"),
+        ("wagtailimages", "0027_image_description"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes, elidable=False),
+    ]
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from wagtail.images import get_image_model
+
+from app.images.cache import clear
+
+
+def clear_image_cache(instance, **kwargs):
+    # Cached sizes are keyed on the file and focal point, so they can't be
+    # served once these change. This only frees the space on this server.
+    clear(instance.pk)
+
+
+def register_signal_handlers():
+    Image = get_image_model()
+    post_save.connect(clear_image_cache, sender=Image)
+    post_delete.connect(clear_image_cache, sender=Image)
@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.cache import cache as django_cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.images.views.serve import generate_image_url
+
+from app.images import cache
+from app.tests_utils import TemporaryMediaMixin
+
+
+class ImageServeTestCase(TemporaryMediaMixin, TestCase):
+    """Tests for the dynamic image serve view."""
+
+    def setUp(self):
+        """Use temporary media and cache directories."""
+        super().setUp()
+        self.temporary_directory("IMAGE_SERVE_CACHE_DIR")
+        # Wagtail caches renditions, which may point at another test's files
+        django_cache.clear()
+
+        self.image = Image.objects.create(
+            title="Test image", file=get_test_image_file()
+        )
+
+    def test_invalid_signature_is_forbidden(self):
+        """Test that URLs with a bad signature are rejected."""
+        url = generate_image_url(self.image, "fill-100x100")
+        response = self.client.get(url.replace("/fill-", "/fill-200x200|fill-"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_serve_and_cache(self):
+        """Test that the image is rendered once, then served from the cache."""
+        url = generate_image_url(self.image, "fill-100x100")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("max-age=86400", response["Cache-Control"])
+        self.assertIn("public", response["Cache-Control"])
+        self.assertTrue(self.image.renditions.filter(filter_spec="fill-100x100"))
+
+        with self.assertNumQueries(1):
+            # Only looking up the image's version
+            cached = self.client.get(url)
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(b"".join(cached.streaming_content), b"".join(response))
+
+        not_modified = self.client.get(url, headers={"if-none-match": response["ETag"]})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_saving_image_clears_cache(self):
+        """Test that saving an image removes its cached sizes."""
+        version = cache.get_version(self.image)
+        self.client.get(generate_image_url(self.image, "fill-100x100"))
+        self.assertIsNotNone(cache.find(self.image.pk, version, "fill-100x100"))
+        self.image.save()
+        self.assertIsNone(cache.find(self.image.pk, version, "fill-100x100"))
+
+    def test_changed_image_is_not_served_from_stale_cache(self):
+        """Test that another server's uncleared cache can't serve a changed image."""
+        url = generate_image_url(self.image, "fill-100x100")
+        self.client.get(url)
+        old_path = cache.find(
+            self.image.pk, cache.get_version(self.image), "fill-100x100"
+        )
+
+        # Saved on another server, so this server's cache isn't cleared
+        Image.objects.filter(pk=self.image.pk).update(
+            focal_point_x=10,
+            focal_point_y=10,
+            focal_point_width=5,
+            focal_point_height=5,
+        )
+        self.image.refresh_from_db()
+        self.client.get(url)
+        new_path = cache.find(
+            self.image.pk, cache.get_version(self.image), "fill-100x100"
+        )
+        self.assertIsNotNone(new_path)
+        self.assertNotEqual(new_path, old_path)
+
+    def test_invalid_filter_spec(self):
+        """Test that an unknown filter spec is a bad request."""
+        response = self.client.get(generate_image_url(self.image, "nonsense-10"))
+        self.assertEqual(response.status_code, 400)
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    """Tests for the image cache locking."""
+
+    def test_concurrent_requests_render_once(self):
+        """Test that concurrent misses for the same image render it once."""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        renders = []
+
+        def render():
+            renders.append(1)
+            time.sleep(0.05)
+            return ".png", b"image"
+
+        paths = []
+        with override_settings(IMAGE_SERVE_CACHE_DIR=cache_dir):
+            threads = [
+                threading.Thread(
+                    target=lambda: paths.append(
+                        cache.get_or_create(1, "v1", "fill-10x10", render)
+                    )
+                )
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(len(set(paths)), 1)
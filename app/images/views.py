@@ -0,0 +1,71 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from wagtail.images import get_image_model
+from wagtail.images.exceptions import InvalidFilterSpecError
+from wagtail.images.models import SourceImageIOError
+from wagtail.images.utils import verify_signature
+
+from app.images import cache
+
+
+def serve(request, signature, image_id, filter_spec, filename=None):
+    """
+    Serve an image resized with a filter spec, from a URL made with Wagtail's
+    ``{% image_url %}`` tag. The rendered image is cached on disk, so only the
+    first request for each size of each version of the image renders it.
+    """
+    if not verify_signature(signature.encode(), image_id, filter_spec):
+        raise PermissionDenied
+
+    # Looked up on every request, so a replaced image is never served from
+    # another server's cache
+    image = get_object_or_404(get_image_model(), id=image_id)
+    try:
+        path = cache.get_or_create(
+            image_id,
+            cache.get_version(image),
+            filter_spec,
+            lambda: render(image, filter_spec),
+        )
+    except SourceImageIOError:
+        return HttpResponse(
+            "Source image file not found", content_type="text/plain", status=410
+        )
+    except InvalidFilterSpecError:
+        return HttpResponse(
+            f"Invalid filter spec: {filter_spec}", content_type="text/plain", status=400
+        )
+
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        # As Wagtail's serve view, stop scripts in SVGs running and browsers
+        # guessing a different content type
+        response["Content-Security-Policy"] = "default-src 'none'"
+        response["X-Content-Type-Options"] = "nosniff"
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    patch_cache_control(response, public=True, max_age=settings.IMAGE_SERVE_MAX_AGE)
+    return response
+
+
+def render(image, filter_spec):
+    # Also saves the rendition, so {% image %} tags with the same filter spec
+    # don't render it again
+    rendition = image.get_rendition(filter_spec)
+    with rendition.file.open("rb") as fh:
+        content = fh.read()
+    return os.path.splitext(rendition.file.name)[1], content
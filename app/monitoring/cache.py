@@ -0,0 +1,89 @@
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from app.monitoring.metrics import current_metrics
+
+_MISSING = object()
+
+
+class InstrumentedCache(BaseCache):
+    """
+    A cache backend which wraps another backend, counting cache hits and misses
+    for RequestTimingMiddleware. The wrapped backend is set in OPTIONS:
+
+        CACHES = {
+            "default": {
+                "BACKEND": "app.monitoring.cache.InstrumentedCache",
+                "LOCATION": "...",
+                "OPTIONS": {
+                    "WRAPPED_BACKEND": "django.core.cache.backends.redis.RedisCache",
+                },
+            }
+        }
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        params = params.copy()
+        options = params.pop("OPTIONS", {}).copy()
+        backend = options.pop("WRAPPED_BACKEND")
+        self._cache = import_string(backend)(location, {**params, "OPTIONS": options})
+
+    def _record(self, hits, misses):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.cache_hits += hits
+            metrics.cache_misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._record(0, 1)
+            return default
+        self._record(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._cache.get_many(keys, version=version)
+        self._record(len(values), len(keys) - len(values))
+        return values
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._cache.add(key, value, timeout=timeout, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._cache.set(key, value, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._cache.set_many(data, timeout=timeout, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._cache.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        return self._cache.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        return self._cache.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self._cache.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        return self._cache.incr(key, delta=delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self._cache.decr(key, delta=delta, version=version)
+
+    def incr_version(self, key, delta=1, version=None):
+        return self._cache.incr_version(key, delta=delta, version=version)
+
+    def decr_version(self, key, delta=1, version=None):
+        return self._cache.decr_version(key, delta=delta, version=version)
+
+    def clear(self):
+        return self._cache.clear()
+
+    def close(self, **kwargs):
+        return self._cache.close(**kwargs)
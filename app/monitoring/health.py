@@ -0,0 +1,159 @@
+"""
+Dependency checks for the readiness endpoint.
+
+Each check raises if its dependency can't be reached. The results are kept in
+memory for HEALTH_CHECK_CACHE_SECONDS, so however often load balancers probe,
+each worker process checks at most once in that time. The Django cache can't
+be used to keep them, as it's one of the things being checked. Each check
+times out after HEALTH_CHECK_TIMEOUT seconds, and passing results older than
+twice HEALTH_CHECK_CACHE_SECONDS are never served.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "health:check"
+
+
+def check_database():
+    for connection in connections.all(initialized_only=False):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+
+def check_cache():
+    value = str(time.time_ns())
+    cache.set(CACHE_KEY, value, 10)
+    if cache.get(CACHE_KEY) != value:
+        raise RuntimeError("The cache didn't return the value just set")
+
+
+def check_storage():
+    if isinstance(default_storage, FileSystemStorage):
+        # exists() is False for a missing or unmounted directory, rather than
+        # an error
+        if not os.path.isdir(default_storage.location):
+            raise RuntimeError(f"{default_storage.location} isn't a directory")
+    else:
+        # A HEAD request for a file which needn't exist, for cloud storage
+        default_storage.exists("healthz")
+
+
+CHECKS = {
+    "database": check_database,
+    "cache": check_cache,
+    "storage": check_storage,
+}
+
+
+def run_check(name, check, result):
+    start = time.perf_counter()
+    try:
+        check()
+    except Exception:
+        logger.exception("Health check %s failed", name)
+        result["ok"] = False
+    else:
+        result["ok"] = True
+    finally:
+        result["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        # Each check runs in its own thread, with its own connections
+        connections.close_all()
+
+
+# Threads of checks which timed out, which are still running
+_running = {}
+
+
+def run_checks():
+    """
+    Run every check at once, returning whether each passed and how long it
+    took. A check which takes longer than HEALTH_CHECK_TIMEOUT seconds fails,
+    and isn't run again until its last run finishes.
+    """
+    started = {}
+    results = {}
+    for name, check in CHECKS.items():
+        if name in _running and _running[name].is_alive():
+            logger.error("Health check %s is still running", name)
+            results[name] = {"ok": False, "ms": None}
+            continue
+        result = {"ok": False, "ms": None}
+        thread = threading.Thread(
+            target=run_check, args=(name, check, result), daemon=True
+        )
+        thread.start()
+        started[name] = (thread, result)
+
+    deadline = time.monotonic() + settings.HEALTH_CHECK_TIMEOUT
+    for name, (thread, result) in started.items():
+        thread.join(max(deadline - time.monotonic(), 0))
+        if thread.is_alive():
+            logger.error(
+                "Health check %s timed out after %ss",
+                name,
+                settings.HEALTH_CHECK_TIMEOUT,
+            )
+            _running[name] = thread
+            result = {"ok": False, "ms": None}
+        results[name] = dict(result)
+    return {name: results[name] for name in CHECKS}
+
+
+_lock = threading.Lock()
+_results = None
+_checked_at = None
+
+
+def get_failures():
+    return {name: {"ok": False, "ms": None} for name in CHECKS}
+
+
+def get_results():
+    """Return the cached check results, running the checks if they're stale."""
+    global _results, _checked_at
+    age = None if _checked_at is None else time.monotonic() - _checked_at
+    if age is not None and age < settings.HEALTH_CHECK_CACHE_SECONDS:
+        return _results
+
+    # While another thread checks, answer with the previous results rather
+    # than checking again, unless they passed too long ago to be trusted
+    use_previous = age is not None and (
+        age < settings.HEALTH_CHECK_CACHE_SECONDS * 2
+        or not all(check["ok"] for check in _results.values())
+    )
+    if use_previous:
+        acquired = _lock.acquire(blocking=False)
+    else:
+        # The checks time out, so this only waits that long unless the
+        # thread running them is stuck
+        acquired = _lock.acquire(timeout=settings.HEALTH_CHECK_TIMEOUT * 2)
+    if not acquired:
+        return _results if use_previous else get_failures()
+    try:
+        # Another thread may have run the checks while this one waited
+        if (
+            _checked_at is not None
+            and time.monotonic() - _checked_at < settings.HEALTH_CHECK_CACHE_SECONDS
+        ):
+            return _results
+        _results = run_checks()
+        _checked_at = time.monotonic()
+        return _results
+    finally:
+        _lock.release()
+
+
+def clear_results():
+    global _results, _checked_at
+    _results = _checked_at = None
+    _running.clear()
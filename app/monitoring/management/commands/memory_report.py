@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.monitoring.memory import read_samples, summarise_views, summarise_workers
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports how worker memory (RSS) has grown over time, and which views "
+        "grow it steadily, from the samples written by MemoryProfilingMiddleware"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            default=settings.MEMORY_PROFILING_DIR,
+            help="Directory of samples (default: MEMORY_PROFILING_DIR)",
+        )
+        parser.add_argument(
+            "--min-growth",
+            type=float,
+            default=1,
+            help="Only flag views which grew RSS by at least this many MB in "
+            "total (default: 1)",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="Number of views to list (default: 20)",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["dir"]
+        workers = read_samples(directory)
+        if not workers:
+            raise CommandError(
+                f"No samples in {directory}. Set MEMORY_PROFILING_ENABLED=true "
+                "and let the site handle some requests."
+            )
+
+        self.stdout.write(
+            f"{'Worker':<20} {'Samples':>8} {'Hours':>7} {'First MB':>9} "
+            f"{'Last MB':>9} {'MB/hour':>8}"
+        )
+        for worker in summarise_workers(workers):
+            self.stdout.write(
+                f"{worker['worker']:<20} {worker['samples']:>8} "
+                f"{worker['hours']:>7.1f} "
+                f"{worker['first_rss'] / MB:>9.1f} {worker['last_rss'] / MB:>9.1f} "
+                f"{worker['growth_per_hour'] / MB:>8.2f}"
+            )
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'View':<50} {'Requests':>9} {'Grew':>7} {'Growth MB':>10} "
+            f"{'Rising':>9}"
+        )
+        flagged = []
+        views = summarise_views(workers)
+        for view in views[: options["top"]]:
+            steady = view["steady"] and view["growth"] >= options["min_growth"] * MB
+            if steady:
+                flagged.append(view["view"])
+            self.stdout.write(
+                f"{view['view'][:50]:<50} {view['requests']:>9} "
+                f"{view['grew'] / view['requests']:>7.0%} "
+                f"{view['growth'] / MB:>10.1f} "
+                f"{str(view['rising']) + '/' + str(view['intervals']):>9}"
+                f"{' *' if steady else ''}"
+            )
+
+        self.stdout.write("")
+        if flagged:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"* RSS grew in most intervals these views were requested in: "
+                    f"{', '.join(flagged)}. Trace them by sending their requests "
+                    "with an X-Memory-Profile header, or raise "
+                    "MEMORY_PROFILING_SAMPLE_RATE."
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("No views grow RSS steadily"))
@@ -0,0 +1,161 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter, so nothing is imported before timing starts
+PROBE = """
+import json
+import resource
+import time
+
+from django.apps import AppConfig
+
+# Time each app's import, models import and ready() as Django loads them
+app_times = {}
+original_create = AppConfig.create.__func__
+
+
+def timed(entry, function):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            app_times[entry] = app_times.get(entry, 0) + time.perf_counter() - started
+
+    return wrapper
+
+
+def create(cls, entry):
+    app_config = timed(entry, original_create)(cls, entry)
+    app_config.import_models = timed(entry, app_config.import_models)
+    app_config.ready = timed(entry, app_config.ready)
+    return app_config
+
+
+AppConfig.create = classmethod(create)
+
+start = time.perf_counter()
+from django.conf import settings
+
+settings.INSTALLED_APPS
+settings_loaded = time.perf_counter()
+
+import django
+
+django.setup()
+apps_ready = time.perf_counter()
+
+from django.core.wsgi import get_wsgi_application
+
+get_wsgi_application()
+wsgi_ready = time.perf_counter()
+
+from django.urls import get_resolver
+
+get_resolver().url_patterns
+urls_loaded = time.perf_counter()
+
+print(
+    json.dumps(
+        {
+            "settings": settings_loaded - start,
+            "app_loading": apps_ready - settings_loaded,
+            "middleware": wsgi_ready - apps_ready,
+            "urls": urls_loaded - wsgi_ready,
+            "total": urls_loaded - start,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "apps": app_times,
+        }
+    )
+)
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports how long a worker process takes to start: settings, app "
+        "loading, middleware and URLs, with the slowest imports"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=25,
+            help="Number of slowest modules to list (default: 25)",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=3,
+            help="Number of cold starts to take the fastest of (default: 3)",
+        )
+
+    def handle(self, *args, **options):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE
+            ),
+        }
+
+        # The fastest run is the least affected by other work on the machine
+        runs = [self.probe(env) for _ in range(options["runs"])]
+        phases, imports = min(runs, key=lambda run: run[0]["total"])
+
+        self.stdout.write(f"Settings module: {env['DJANGO_SETTINGS_MODULE']}")
+        self.stdout.write("")
+        self.stdout.write(f"{'Phase':<30} {'ms':>10}")
+        for name in ("settings", "app_loading", "middleware", "urls", "total"):
+            self.stdout.write(f"{name:<30} {phases[name] * 1000:>10.1f}")
+        self.stdout.write(f"{'max RSS (MB)':<30} {phases['max_rss_kb'] / 1024:>10.1f}")
+
+        self.stdout.write("")
+        self.stdout.write(f"{'Installed app':<40} {'load ms':>10}")
+        for app in settings.INSTALLED_APPS:
+            # Includes modules the app is the first to import
+            self.stdout.write(f"{app:<40} {phases['apps'].get(app, 0) * 1000:>10.1f}")
+
+        self.stdout.write("")
+        self.stdout.write(f"{'Module':<50} {'self ms':>10} {'cumulative ms':>14}")
+        slowest = sorted(imports.items(), key=lambda item: item[1][1], reverse=True)
+        for module, (own, cumulative) in slowest[: options["limit"]]:
+            self.stdout.write(
+                f"{module:<50} {own / 1000:>10.1f} {cumulative / 1000:>14.1f}"
+            )
+
+    def probe(self, env):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE],
+            env=env,
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Starting Django failed:\n{result.stderr}")
+        return json.loads(result.stdout.splitlines()[-1]), parse_importtime(
+            result.stderr
+        )
+
+
+def parse_importtime(output):
+    """
+    Parse ``python -X importtime`` output into a dict of module name to
+    ``(self, cumulative)`` import time in microseconds.
+    """
+    imports = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, cumulative, module = line.removeprefix("import time:").split("|")
+        if not own.strip().isdigit():
+            # The header line
+            continue
+        imports[module.strip()] = (int(own), int(cumulative))
+    return imports
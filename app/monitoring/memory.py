@@ -0,0 +1,235 @@
+"""
+Memory profiling for finding what makes worker processes grow.
+
+Two kinds of data are collected by MemoryProfilingMiddleware:
+
+- Each worker's resident set size (RSS) is read before and after every
+  request, and the growth is added up per view. Every MEMORY_PROFILING_INTERVAL
+  seconds the worker appends its RSS and the per view totals to a file in
+  MEMORY_PROFILING_DIR, one file per process, for ``manage.py memory_report``.
+  Processes are told apart by their pid and the time they started sampling, as
+  pids are reused. Each new process deletes files which haven't been written
+  to for MEMORY_PROFILING_RETENTION_DAYS.
+- Sampled requests are traced with tracemalloc, and the allocations made
+  during the request which are still alive at the end of it are logged, by the
+  line of code that made them.
+
+Reading RSS costs a few microseconds. Tracing slows a request down several
+times, which is why it's only done for a sample of requests.
+"""
+
+import json
+import linecache
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Allocations made by the profiling itself
+IGNORED_FILES = [
+    tracemalloc.__file__,
+    linecache.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+]
+
+
+def get_rss():
+    """Return the current process's resident set size in bytes, if known."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # Not Linux
+        return None
+
+
+# Only one request per process is traced at a time, as tracemalloc sees every
+# thread's allocations
+_tracing = threading.Lock()
+
+
+class AllocationProfile:
+    """Traces the allocations made between ``start`` and ``finish``."""
+
+    def __init__(self, top=10):
+        self.top = top
+        self.started_tracing = False
+        self.before = None
+
+    def start(self):
+        if not _tracing.acquire(blocking=False):
+            return False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        tracemalloc.reset_peak()
+        self.before = tracemalloc.take_snapshot()
+        return True
+
+    def finish(self):
+        """Stop tracing, returning the retained and peak bytes and top sites."""
+        try:
+            after = tracemalloc.take_snapshot()
+            traced, peak = tracemalloc.get_traced_memory()
+        finally:
+            if self.started_tracing:
+                tracemalloc.stop()
+            _tracing.release()
+
+        filters = [tracemalloc.Filter(False, name) for name in IGNORED_FILES]
+        after = after.filter_traces(filters)
+        before = self.before.filter_traces(filters)
+        stats = after.compare_to(before, "lineno")
+        return {
+            "retained_kb": round(sum(stat.size_diff for stat in stats) / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": [
+                {
+                    "site": str(stat.traceback[0]),
+                    "size_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count_diff,
+                }
+                for stat in stats[: self.top]
+                if stat.size_diff > 0
+            ],
+        }
+
+
+class WorkerMemory:
+    """Adds up RSS growth per view, and regularly writes it to a file."""
+
+    def __init__(self, directory, interval, retention_days=7):
+        self.directory = directory
+        self.interval = interval
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self.pid = None
+        self.worker = None
+        self.views = None
+        self.last_write = None
+
+    def record(self, view, rss_before, rss_after):
+        with self.lock:
+            if self.pid != os.getpid():
+                # A new worker, forked after the middleware was loaded
+                self.pid = os.getpid()
+                self.worker = f"{self.pid}-{int(time.time())}"
+                self.views = defaultdict(lambda: [0, 0, 0])
+                self.last_write = None
+                self.delete_old_files()
+
+            growth = rss_after - rss_before
+            stats = self.views[view]
+            stats[0] += 1
+            stats[1] += growth > 0
+            stats[2] += growth
+
+            now = time.monotonic()
+            if self.last_write is None or now - self.last_write >= self.interval:
+                self.write(rss_after)
+                self.last_write = now
+
+    def delete_old_files(self):
+        cutoff = time.time() - self.retention_days * 24 * 3600
+        for path in get_sample_paths(self.directory):
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                # Deleted by another worker
+                continue
+
+    def write(self, rss):
+        line = {
+            "time": time.time(),
+            "worker": self.worker,
+            "pid": self.pid,
+            "rss": rss,
+            # Requests, requests which grew RSS and total growth in bytes
+            "views": dict(self.views),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"rss-{self.worker}.jsonl")
+        with open(path, "a") as fh:
+            fh.write(json.dumps(line) + "\n")
+        self.views.clear()
+
+
+def get_sample_paths(directory):
+    if not os.path.isdir(directory):
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.startswith("rss-") and name.endswith(".jsonl")
+    ]
+
+
+def read_samples(directory):
+    """Return each worker's samples in time order, by worker id."""
+    workers = defaultdict(list)
+    for path in get_sample_paths(directory):
+        with open(path) as fh:
+            for line in fh:
+                if line.strip():
+                    sample = json.loads(line)
+                    workers[sample["worker"]].append(sample)
+    return {
+        worker: sorted(samples, key=lambda s: s["time"])
+        for worker, samples in workers.items()
+    }
+
+
+def summarise_workers(workers):
+    """Return the first and last RSS of each worker, and its growth per hour."""
+    summaries = []
+    for worker, samples in workers.items():
+        first, last = samples[0], samples[-1]
+        hours = (last["time"] - first["time"]) / 3600
+        growth = last["rss"] - first["rss"]
+        summaries.append(
+            {
+                "worker": worker,
+                "samples": len(samples),
+                "hours": hours,
+                "first_rss": first["rss"],
+                "last_rss": last["rss"],
+                "growth_per_hour": growth / hours if hours else 0,
+            }
+        )
+    return sorted(summaries, key=lambda s: s["growth_per_hour"], reverse=True)
+
+
+def summarise_views(workers, min_intervals=3, steady=0.75):
+    """
+    Add up each view's RSS growth across every worker. A view is flagged as
+    growing steadily when RSS grew during its requests in at least ``steady``
+    of the intervals it was requested in, over at least ``min_intervals``.
+    """
+    views = defaultdict(
+        lambda: {"requests": 0, "grew": 0, "growth": 0, "intervals": 0, "rising": 0}
+    )
+    for samples in workers.values():
+        for sample in samples:
+            for view, (requests, grew, growth) in sample["views"].items():
+                stats = views[view]
+                stats["requests"] += requests
+                stats["grew"] += grew
+                stats["growth"] += growth
+                stats["intervals"] += 1
+                stats["rising"] += growth > 0
+
+    summaries = []
+    for view, stats in views.items():
+        stats["view"] = view
+        stats["steady"] = (
+            stats["intervals"] >= min_intervals
+            and stats["rising"] >= stats["intervals"] * steady
+        )
+        summaries.append(stats)
+    return sorted(summaries, key=lambda s: s["growth"], reverse=True)
@@ -0,0 +1,154 @@
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from app.monitoring.registry import Counter, Gauge, Histogram
+
+# The metrics for the request being handled, set by RequestTimingMiddleware
+current_metrics = ContextVar("current_metrics", default=None)
+
+
+class RequestMetrics:
+    """Timings and counters collected while handling a single request."""
+
+    __slots__ = (
+        "start",
+        "total_time",
+        "db_time",
+        "db_queries",
+        "cache_hits",
+        "cache_misses",
+        "template_time",
+        "page_type",
+    )
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total_time = 0.0
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        self.page_type = None
+
+    def record_query(self, execute, sql, params, many, context):
+        """A database execute wrapper which times every query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.db_queries += 1
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.start
+
+    def server_timing(self):
+        """Format the metrics as a Server-Timing header value, in milliseconds."""
+        return ", ".join(
+            [
+                f"total;dur={self.total_time * 1000:.1f}",
+                f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+                f"template;dur={self.template_time * 1000:.1f}",
+                f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            ]
+        )
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total_time * 1000, 1),
+            "db_ms": round(self.db_time * 1000, 1),
+            "db_queries": self.db_queries,
+            "template_ms": round(self.template_time * 1000, 1),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "page_type": self.page_type,
+        }
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time taken to handle requests, by view and route.",
+    ["method", "view", "route", "status"],
+)
+PAGE_SERVE_DURATION = Histogram(
+    "page_serve_duration_seconds",
+    "Time taken to serve Wagtail pages, by page type.",
+    ["page_type"],
+)
+SEARCH_DURATION = Histogram(
+    "search_duration_seconds",
+    "Time taken to run search queries.",
+)
+TEMPLATE_RENDER_SECONDS = Counter(
+    "template_render_seconds",
+    "Time spent rendering template responses.",
+)
+DB_QUERIES = Counter("db_queries", "Database queries run.")
+DB_QUERY_SECONDS = Counter("db_query_seconds", "Time spent running database queries.")
+CACHE_HITS = Counter("cache_hits", "Default cache hits.")
+CACHE_MISSES = Counter("cache_misses", "Default cache misses.")
+DB_CONNECTIONS_OPEN = Gauge(
+    "db_connections_open",
+    "Open database connections held by worker processes.",
+    ["alias"],
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Connections in the database connection pool.", ["alias"]
+)
+DB_POOL_AVAILABLE = Gauge(
+    "db_pool_available", "Idle connections in the database connection pool.", ["alias"]
+)
+DB_POOL_REQUESTS_WAITING = Gauge(
+    "db_pool_requests_waiting",
+    "Requests waiting for a connection from the database connection pool.",
+    ["alias"],
+)
+
+
+def metrics_enabled():
+    return getattr(settings, "METRICS_ENABLED", False)
+
+
+def record_request(request, response, metrics):
+    """Add a finished request's metrics to the Prometheus registry."""
+    match = request.resolver_match
+    REQUEST_DURATION.observe(
+        metrics.total_time,
+        method=request.method,
+        view=match.view_name if match else "",
+        route=match.route if match else "",
+        status=response.status_code,
+    )
+    if metrics.page_type:
+        PAGE_SERVE_DURATION.observe(metrics.total_time, page_type=metrics.page_type)
+
+    TEMPLATE_RENDER_SECONDS.inc(metrics.template_time)
+    DB_QUERIES.inc(metrics.db_queries)
+    DB_QUERY_SECONDS.inc(metrics.db_time)
+    CACHE_HITS.inc(metrics.cache_hits)
+    CACHE_MISSES.inc(metrics.cache_misses)
+
+    for connection in connections.all(initialized_only=True):
+        DB_CONNECTIONS_OPEN.set(
+            int(connection.connection is not None), alias=connection.alias
+        )
+        # Only PostgreSQL connections have a pool, when enabled in OPTIONS
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            stats = pool.get_stats()
+            DB_POOL_SIZE.set(stats.get("pool_size", 0), alias=connection.alias)
+            DB_POOL_AVAILABLE.set(
+                stats.get("pool_available", 0), alias=connection.alias
+            )
+            DB_POOL_REQUESTS_WAITING.set(
+                stats.get("requests_waiting", 0), alias=connection.alias
+            )
+
+
+def observe_search(seconds):
+    if metrics_enabled():
+        SEARCH_DURATION.observe(seconds)
@@ -0,0 +1,203 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+
+from app.monitoring.health import get_results
+from app.monitoring.memory import AllocationProfile, WorkerMemory, get_rss
+from app.monitoring.metrics import (
+    RequestMetrics,
+    current_metrics,
+    metrics_enabled,
+    record_request,
+)
+
+logger = logging.getLogger("app.monitoring.requests")
+memory_logger = logging.getLogger("app.monitoring.memory")
+
+
+class RequestTimingMiddleware:
+    """
+    Records wall time, database time and query count, cache hits and misses and
+    template render time for each request.
+
+    With the REQUEST_TIMING_ENABLED setting the results are added to the
+    response in a Server-Timing header and logged as JSON. With METRICS_ENABLED
+    they're added to the Prometheus metrics served at /metrics. With neither,
+    Django drops the middleware when it starts and it costs nothing per request.
+    """
+
+    def __init__(self, get_response):
+        self.timing_enabled = getattr(settings, "REQUEST_TIMING_ENABLED", False)
+        self.metrics_enabled = metrics_enabled()
+        if not self.timing_enabled and not self.metrics_enabled:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        metrics.finish()
+        if self.timing_enabled:
+            response["Server-Timing"] = metrics.server_timing()
+            self.log(request, response, metrics)
+        if self.metrics_enabled:
+            record_request(request, response, metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called just before the response is rendered, the post render callback
+        # runs straight after rendering
+        metrics = current_metrics.get()
+        if metrics is None:
+            return response
+
+        page = (response.context_data or {}).get("page")
+        if hasattr(page, "_meta"):
+            metrics.page_type = page._meta.label
+
+        render_start = time.perf_counter()
+
+        def record_render_time(response):
+            metrics.template_time += time.perf_counter() - render_start
+
+        response.add_post_render_callback(record_render_time)
+        return response
+
+    def log(self, request, response, metrics):
+        match = request.resolver_match
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.get_full_path(),
+                    "view": match.view_name if match else None,
+                    "status": response.status_code,
+                    **metrics.as_dict(),
+                }
+            )
+        )
+
+
+def get_view_name(request, response):
+    match = request.resolver_match
+    view = match.view_name if match else "unresolved"
+    # Every Wagtail page is served by the same view, so add the page type
+    page = (getattr(response, "context_data", None) or {}).get("page")
+    if hasattr(page, "_meta"):
+        view = f"{view}:{page._meta.label}"
+    return view
+
+
+class MemoryProfilingMiddleware:
+    """
+    Records how much each view grows the worker's memory, and traces the
+    allocations of sampled requests with tracemalloc (see app.monitoring.memory).
+
+    A MEMORY_PROFILING_SAMPLE_RATE fraction of requests are traced, as are
+    requests with an "X-Memory-Profile" header matching MEMORY_PROFILING_TOKEN.
+    Unless MEMORY_PROFILING_ENABLED is set, Django drops the middleware when it
+    starts.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "MEMORY_PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.MEMORY_PROFILING_SAMPLE_RATE
+        self.token = settings.MEMORY_PROFILING_TOKEN
+        self.top = settings.MEMORY_PROFILING_TOP
+        self.worker_memory = WorkerMemory(
+            settings.MEMORY_PROFILING_DIR,
+            settings.MEMORY_PROFILING_INTERVAL,
+            settings.MEMORY_PROFILING_RETENTION_DAYS,
+        )
+
+    def should_trace(self, request):
+        header = request.headers.get("X-Memory-Profile")
+        if header and self.token:
+            return constant_time_compare(header, self.token)
+        return random.random() < self.sample_rate
+
+    def __call__(self, request):
+        profile = None
+        if self.should_trace(request):
+            profile = AllocationProfile(self.top)
+            if not profile.start():
+                # Another thread's request is being traced
+                profile = None
+
+        rss_before = get_rss()
+        try:
+            response = self.get_response(request)
+        finally:
+            report = profile.finish() if profile else None
+        rss_after = get_rss()
+
+        view = get_view_name(request, response)
+        if rss_before is not None:
+            self.worker_memory.record(view, rss_before, rss_after)
+        if report is not None:
+            memory_logger.info(
+                json.dumps(
+                    {
+                        "method": request.method,
+                        "path": request.get_full_path(),
+                        "view": view,
+                        "status": response.status_code,
+                        "rss_growth_kb": (
+                            round((rss_after - rss_before) / 1024, 1)
+                            if rss_before is not None
+                            else None
+                        ),
+                        **report,
+                    }
+                )
+            )
+        return response
+
+
+class HealthCheckMiddleware:
+    """
+    Answers load balancer probes at /healthz (liveness) and /readyz
+    (readiness) before any other middleware runs, so probes don't touch
+    sessions or authentication, or need an allowed Host header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return self.get_response(request)
+        if request.path_info == "/healthz":
+            # The process is up and handling requests
+            response = HttpResponse("ok", content_type="text/plain")
+        elif request.path_info == "/readyz":
+            checks = get_results()
+            ok = all(check["ok"] for check in checks.values())
+            response = JsonResponse(
+                {"status": "ok" if ok else "unavailable", "checks": checks},
+                status=200 if ok else 503,
+            )
+        else:
+            return self.get_response(request)
+        response["Cache-Control"] = "no-store"
+        return response
@@ -0,0 +1,286 @@
+"""
+A small Prometheus metrics registry which aggregates across worker processes.
+
+Each process keeps its samples in its own memory mapped file inside
+``METRICS_MULTIPROC_DIR``. Updating a metric is a write into shared memory,
+and the ``/metrics`` view adds up the files from every process so any worker
+can answer a scrape. Counters and histograms include processes which have
+exited, gauges only include processes which are still running.
+
+Without ``METRICS_MULTIPROC_DIR`` samples are kept in memory, which is only
+correct for a single process such as ``runserver``.
+"""
+
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    math.inf,
+)
+
+# Each file starts with the number of bytes used, padded to 8 bytes
+HEADER_SIZE = 8
+INITIAL_FILE_SIZE = 64 * 1024
+
+
+def _entry_layout(offset, key_length):
+    """Return the offsets of an entry's value and of the next entry."""
+    value_offset = offset + 4 + key_length
+    value_offset += -value_offset % 8
+    return value_offset, value_offset + 8
+
+
+def read_samples(path):
+    """Yield the ``(key, value)`` samples stored in a metrics file."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if len(data) < HEADER_SIZE:
+        return
+
+    used = struct.unpack_from("i", data, 0)[0]
+    offset = HEADER_SIZE
+    while offset < used:
+        key_length = struct.unpack_from("i", data, offset)[0]
+        key_start, key_end = offset + 4, offset + 4 + key_length
+        key = data[key_start:key_end].decode("utf-8")
+        value_offset, offset = _entry_layout(offset, key_length)
+        yield key, struct.unpack_from("d", data, value_offset)[0]
+
+
+class MmapValues:
+    """Float values keyed by string, stored in a memory mapped file."""
+
+    def __init__(self, path):
+        self._file = open(path, "a+b")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_SIZE:
+            size = INITIAL_FILE_SIZE
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = struct.unpack_from("i", self._map, 0)[0] or HEADER_SIZE
+
+        # Carry on from values written by an earlier process with the same pid
+        self._positions = {}
+        offset = HEADER_SIZE
+        while offset < self._used:
+            key_length = struct.unpack_from("i", self._map, offset)[0]
+            key_start, key_end = offset + 4, offset + 4 + key_length
+            key = self._map[key_start:key_end].decode("utf-8")
+            self._positions[key], offset = _entry_layout(offset, key_length)
+
+    def inc(self, key, amount):
+        offset = self._position(key)
+        value = struct.unpack_from("d", self._map, offset)[0]
+        struct.pack_into("d", self._map, offset, value + amount)
+
+    def set(self, key, value):
+        struct.pack_into("d", self._map, self._position(key), value)
+
+    def _position(self, key):
+        offset = self._positions.get(key)
+        if offset is None:
+            offset = self._add(key)
+        return offset
+
+    def _add(self, key):
+        encoded = key.encode("utf-8")
+        value_offset, end = _entry_layout(self._used, len(encoded))
+        if end > len(self._map):
+            size = len(self._map)
+            while end > size:
+                size *= 2
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+
+        struct.pack_into(
+            f"i{len(encoded)}s", self._map, self._used, len(encoded), encoded
+        )
+        struct.pack_into("d", self._map, value_offset, 0.0)
+        # Readers only look at entries below the used mark, so update it last
+        self._used = end
+        struct.pack_into("i", self._map, 0, self._used)
+        self._positions[key] = value_offset
+        return value_offset
+
+
+class MemoryValues:
+    """Float values keyed by string, for a single process."""
+
+    def __init__(self):
+        self.values = {}
+
+    def inc(self, key, amount):
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._values = None
+        self._pid = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def inc(self, key, amount):
+        with self._lock:
+            self._get_values().inc(key, amount)
+
+    def set(self, key, value):
+        with self._lock:
+            self._get_values().set(key, value)
+
+    def _get_values(self):
+        # Worker processes forked from a parent need their own file
+        pid = os.getpid()
+        if self._pid != pid:
+            directory = getattr(settings, "METRICS_MULTIPROC_DIR", None)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+                self._values = MmapValues(os.path.join(directory, f"{pid}.db"))
+            else:
+                self._values = MemoryValues()
+            self._pid = pid
+        return self._values
+
+    def collect(self):
+        """Return every sample added up across processes, keyed by sample key."""
+        directory = getattr(settings, "METRICS_MULTIPROC_DIR", None)
+        if not directory:
+            with self._lock:
+                return dict(self._get_values().values)
+
+        totals = {}
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            pid = int(os.path.splitext(os.path.basename(path))[0])
+            alive = pid_exists(pid)
+            for key, value in read_samples(path):
+                if not alive and json.loads(key)[0] == "gauge":
+                    continue
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        samples = {}
+        for key, value in self.collect().items():
+            kind, name, sample_name, labels = json.loads(key)
+            samples.setdefault(name, []).append((sample_name, labels, value))
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample_name, labels, value in sorted(
+                samples.get(name, []), key=sort_key
+            ):
+                lines.append(f"{sample_name}{format_labels(labels)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sort_key(sample):
+    sample_name, labels, value = sample
+    return (
+        [(k, v) for k, v in labels if k != "le"],
+        sample_name,
+        float(dict(labels).get("le", 0)),
+    )
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def _key(self, sample_name, labels, extra=()):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        pairs = [(name, str(labels[name])) for name in self.labelnames]
+        return json.dumps([self.kind, self.name, sample_name, pairs + list(extra)])
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        self.registry.inc(self._key(f"{self.name}_total", labels), amount)
+
+
+class Gauge(Metric):
+    """A gauge set per process, added up across the running processes."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self.registry.set(self._key(self.name, labels), value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets=DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        # Buckets are cumulative, so a value counts towards every bucket it fits
+        for bound in self.buckets:
+            if value <= bound:
+                le = "+Inf" if bound == math.inf else repr(bound)
+                self.registry.inc(
+                    self._key(f"{self.name}_bucket", labels, [("le", le)]), 1
+                )
+        self.registry.inc(self._key(f"{self.name}_sum", labels), value)
+        self.registry.inc(self._key(f"{self.name}_count", labels), 1)
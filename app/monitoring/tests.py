@@ -0,0 +1,342 @@
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from app.monitoring import health
+from app.monitoring.cache import InstrumentedCache
+from app.monitoring.health import CHECKS, clear_results
+from app.monitoring.management.commands.profile_startup import parse_importtime
+from app.monitoring.memory import AllocationProfile, WorkerMemory, get_rss
+from app.monitoring.metrics import RequestMetrics, current_metrics
+from app.monitoring.registry import Counter, Gauge, MmapValues, Registry
+from app.tests_utils import TemporaryDirectoryMixin
+
+# Above the default Linux pid_max, so never a running process
+DEAD_PID = 4_194_305
+
+
+class RequestTimingTestCase(TestCase):
+    """Tests for the request timing middleware."""
+
+    @override_settings(REQUEST_TIMING_ENABLED=False)
+    def test_disabled(self):
+        """Test that no Server-Timing header is added when disabled."""
+        response = self.client.get("/")
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(REQUEST_TIMING_ENABLED=True)
+    def test_server_timing_header(self):
+        """Test that timings are added to the response when enabled."""
+        with self.assertLogs("app.monitoring.requests", "INFO") as logs:
+            response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertIn("queries", response["Server-Timing"])
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["path"], "/")
+        self.assertEqual(record["page_type"], "home.HomePage")
+        self.assertGreater(record["db_queries"], 0)
+        self.assertGreater(record["template_ms"], 0)
+
+    def test_instrumented_cache_counts_hits_and_misses(self):
+        """Test that the cache wrapper counts hits and misses for the request."""
+        cache = InstrumentedCache(
+            "instrumented-test",
+            {
+                "OPTIONS": {
+                    "WRAPPED_BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+                }
+            },
+        )
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            cache.set("present", 1)
+            self.assertEqual(cache.get("present"), 1)
+            self.assertIsNone(cache.get("absent"))
+            self.assertEqual(cache.get_many(["present", "absent"]), {"present": 1})
+        finally:
+            current_metrics.reset(token)
+
+        self.assertEqual(metrics.cache_hits, 2)
+        self.assertEqual(metrics.cache_misses, 2)
+
+
+class MetricsTestCase(TestCase):
+    """Tests for the Prometheus metrics endpoint and registry."""
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_metrics_disabled_returns_404(self):
+        """Test that /metrics doesn't exist unless metrics are enabled."""
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_ENABLED=True, METRICS_TOKEN="")
+    def test_metrics_include_requests(self):
+        """Test that handled requests show up in the request histogram."""
+        self.client.get("/")
+        self.client.get("/search/?query=test")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8"
+        )
+        content = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", content)
+        self.assertIn('view="wagtail_serve"', content)
+        self.assertIn(
+            'page_serve_duration_seconds_count{page_type="home.HomePage"}', content
+        )
+        self.assertIn("search_duration_seconds_count", content)
+
+    @override_settings(METRICS_ENABLED=True, METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        """Test that a configured token is required to scrape."""
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get(
+            "/metrics", headers={"authorization": "Bearer secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_registry_adds_up_process_files(self):
+        """Test that samples from every process file are added together."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        registry = Registry()
+        counter = Counter("jobs", "Jobs done.", registry=registry)
+        gauge = Gauge("workers", "Busy workers.", registry=registry)
+
+        with override_settings(METRICS_MULTIPROC_DIR=directory):
+            counter.inc(2)
+            gauge.set(1)
+
+            # Samples left behind by a worker which has exited
+            dead_worker = MmapValues(os.path.join(directory, f"{DEAD_PID}.db"))
+            dead_worker.inc(counter._key("jobs_total", {}), 3)
+            dead_worker.set(gauge._key("workers", {}), 1)
+
+            content = registry.render()
+
+        self.assertIn("jobs_total 5.0", content)
+        self.assertIn("workers 1.0", content)
+
+
+class ProfileStartupTestCase(SimpleTestCase):
+    """Tests for the profile_startup command."""
+
+    def test_parse_importtime(self):
+        """Test that -X importtime output is parsed into self and cumulative times."""
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     django.utils\n"
+            "import time:       300 |        420 |   django\n"
+        )
+        self.assertEqual(
+            parse_importtime(output),
+            {"django.utils": (120, 120), "django": (300, 420)},
+        )
+
+
+@override_settings(
+    MEMORY_PROFILING_ENABLED=True,
+    MEMORY_PROFILING_SAMPLE_RATE=0,
+    MEMORY_PROFILING_TOKEN="secret",
+)
+class MemoryProfilingTestCase(TemporaryDirectoryMixin, TestCase):
+    """Tests for the memory profiling middleware and memory_report command."""
+
+    def setUp(self):
+        """Write samples to a temporary directory."""
+        self.directory = self.temporary_directory("MEMORY_PROFILING_DIR")
+
+    def test_allocation_profile(self):
+        """Test that allocations which outlive the profile are reported."""
+        profile = AllocationProfile(top=3)
+        self.assertTrue(profile.start())
+        retained = [bytearray(100_000) for _ in range(10)]
+        report = profile.finish()
+
+        self.assertGreaterEqual(report["retained_kb"], len(retained) * 97)
+        self.assertIn(__file__, report["top"][0]["site"])
+        self.assertLessEqual(len(report["top"]), 3)
+
+    def test_header_traces_request(self):
+        """Test that only requests with the token are traced."""
+        with self.assertNoLogs("app.monitoring.memory"):
+            self.client.get("/")
+            self.client.get("/", headers={"X-Memory-Profile": "wrong"})
+
+        with self.assertLogs("app.monitoring.memory", "INFO") as logs:
+            self.client.get("/", headers={"X-Memory-Profile": "secret"})
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "wagtail_serve:home.HomePage")
+        self.assertGreater(record["peak_kb"], 0)
+        self.assertIsInstance(record["top"], list)
+
+    @skipUnless(get_rss(), "RSS can only be read on Linux")
+    def test_rss_samples(self):
+        """Test that each worker writes its RSS and the growth per view."""
+        self.client.get("/")
+        (path,) = glob.glob(os.path.join(self.directory, f"rss-{os.getpid()}-*.jsonl"))
+        with open(path) as fh:
+            sample = json.loads(fh.readline())
+        self.assertIn(sample["worker"], path)
+        self.assertGreater(sample["rss"], 0)
+        self.assertEqual(sample["views"]["wagtail_serve:home.HomePage"][0], 1)
+
+    def test_old_samples_are_deleted(self):
+        """Test that a new worker deletes files older than the retention period."""
+        old_path = os.path.join(self.directory, "rss-100-0.jsonl")
+        recent_path = os.path.join(self.directory, "rss-101-0.jsonl")
+        for path in (old_path, recent_path):
+            open(path, "w").close()
+        os.utime(old_path, (0, 0))
+
+        WorkerMemory(self.directory, 60, retention_days=7).record("view", 0, 0)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(recent_path))
+
+    def test_report_flags_steadily_growing_views(self):
+        """Test that a view growing RSS in most intervals is flagged."""
+        mb = 1024 * 1024
+        with open(os.path.join(self.directory, "rss-100-0.jsonl"), "w") as fh:
+            for i in range(4):
+                sample = {
+                    "time": i * 900,
+                    "worker": "100-0",
+                    "pid": 100,
+                    "rss": (100 + i * 2) * mb,
+                    "views": {
+                        "leaky": [10, 8, 2 * mb],
+                        "search": [10, 1, mb if i == 0 else -mb],
+                    },
+                }
+                fh.write(json.dumps(sample) + "\n")
+
+        stdout = StringIO()
+        call_command("memory_report", stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn("8.00", output)  # MB per hour
+        self.assertIn("4/4 *", output)
+        self.assertIn("requested in: leaky.", output)
+
+    def test_report_separates_reused_pids(self):
+        """Test that processes which had the same pid are reported apart."""
+        for worker, rss in [("100-0", 100), ("100-3600", 200)]:
+            with open(os.path.join(self.directory, f"rss-{worker}.jsonl"), "w") as fh:
+                sample = {"time": 0, "worker": worker, "pid": 100, "views": {}}
+                fh.write(json.dumps({**sample, "rss": rss}) + "\n")
+
+        stdout = StringIO()
+        call_command("memory_report", stdout=stdout)
+        self.assertIn("100-0 ", stdout.getvalue())
+        self.assertIn("100-3600 ", stdout.getvalue())
+
+    def test_report_without_samples(self):
+        """Test that the report explains how to collect samples."""
+        with self.assertRaisesMessage(CommandError, "MEMORY_PROFILING_ENABLED"):
+            call_command("memory_report", dir=os.path.join(self.directory, "none"))
+
+
+class HealthCheckTestCase(TestCase):
+    """Tests for the /healthz and /readyz probes."""
+
+    def setUp(self):
+        """Start without cached check results."""
+        clear_results()
+        self.addCleanup(clear_results)
+
+    def test_healthz(self):
+        """Test that liveness needs no database, session or allowed host."""
+        with self.assertNumQueries(0):
+            response = self.client.get("/healthz", headers={"host": "10.0.0.1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"ok")
+        self.assertEqual(response["Cache-Control"], "no-store")
+        self.assertFalse(response.cookies)
+
+    def test_readyz_results_are_cached(self):
+        """Test that the checks run once, then the results are reused."""
+        response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ok")
+        self.assertEqual(set(response.json()["checks"]), set(CHECKS))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/readyz").status_code, 200)
+
+    def test_readyz_failing_check(self):
+        """Test that a failing dependency makes the site unavailable."""
+
+        def check_cache():
+            raise ConnectionError("Connection refused")
+
+        with mock.patch.dict(CHECKS, {"cache": check_cache}):
+            with self.assertLogs("app.monitoring.health", "ERROR"):
+                response = self.client.get("/readyz")
+
+        self.assertEqual(response.status_code, 503)
+        checks = response.json()["checks"]
+        self.assertFalse(checks["cache"]["ok"])
+        self.assertTrue(checks["database"]["ok"])
+        self.assertNotIn("Connection refused", response.content.decode())
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.1)
+    def test_readyz_hung_check(self):
+        """Test that a hung check fails, and isn't run again until it returns."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+        calls = []
+
+        def check_storage():
+            calls.append(True)
+            release.wait(5)
+
+        with mock.patch.dict(CHECKS, {"storage": check_storage}):
+            with self.assertLogs("app.monitoring.health", "ERROR") as logs:
+                response = self.client.get("/readyz")
+                self.assertEqual(response.status_code, 503)
+                self.assertIsNone(response.json()["checks"]["storage"]["ms"])
+                self.assertTrue(response.json()["checks"]["database"]["ok"])
+
+                health._checked_at = None
+                self.assertEqual(self.client.get("/readyz").status_code, 503)
+            self.assertIn("timed out", logs.output[0])
+            self.assertIn("still running", logs.output[1])
+            self.assertEqual(len(calls), 1)
+
+    @override_settings(HEALTH_CHECK_CACHE_SECONDS=5, HEALTH_CHECK_TIMEOUT=0.1)
+    def test_readyz_waits_for_running_checks(self):
+        """Test that a probe waiting on the lock reuses the results it waited for."""
+        results = {name: {"ok": True, "ms": 0.1} for name in CHECKS}
+        with mock.patch.object(health, "run_checks") as run_checks:
+            with health._lock:
+                waiting = threading.Thread(target=self.client.get, args=["/readyz"])
+                waiting.start()
+                # The waiting probe finds results stored by the lock's holder
+                time.sleep(0.1)
+                health._results = results
+                health._checked_at = time.monotonic()
+            waiting.join()
+        run_checks.assert_not_called()
+
+    def test_readyz_stale_results(self):
+        """Test that old passing results aren't served while checks are stuck."""
+        health._results = {name: {"ok": True, "ms": 0.1} for name in CHECKS}
+        with health._lock:
+            health._checked_at = time.monotonic() - 6
+            self.assertEqual(self.client.get("/readyz").status_code, 200)
+
+            health._checked_at = time.monotonic() - 11
+            self.assertEqual(self.client.get("/readyz").status_code, 503)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+from app.monitoring.metrics import metrics_enabled
+from app.monitoring.registry import REGISTRY
+
+
+@never_cache
+def metrics(request):
+    """Serve the Prometheus metrics from every worker process."""
+    if not metrics_enabled():
+        raise Http404
+
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and not constant_time_compare(
+        request.headers.get("authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class RedirectsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "app.redirects"
+
+    def ready(self):
+        from app.redirects.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
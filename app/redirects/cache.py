@@ -0,0 +1,172 @@
+"""
+In-memory cache of redirects, keyed by site and old path.
+
+The whole redirect table is loaded in a single query the first time a 404 needs
+a redirect lookup, so crawlers requesting missing URLs no longer cost a database
+query per request. Saving or deleting a Redirect bumps a version number in the
+default cache, which makes every process rebuild its copy on the next lookup.
+
+If there are more redirects than ``REDIRECTS_CACHE_MAX_ENTRIES`` the table isn't
+loaded. Paths are then looked up in the database one at a time and the results,
+including misses, are kept in a bounded LRU cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Site
+
+VERSION_CACHE_KEY = "app.redirects:version"
+
+# Columns needed to build a cache entry, in the order make_entry expects them
+REDIRECT_FIELDS = (
+    "site_id",
+    "old_path",
+    "id",
+    "redirect_link",
+    "redirect_page_id",
+    "is_permanent",
+)
+
+_UNCACHED = object()
+
+
+def make_entry(site_id, old_path, pk, redirect_link, redirect_page_id, is_permanent):
+    """
+    Build a ``(redirect_id, link, is_permanent)`` entry.
+
+    ``link`` is None for redirects to a page, as page URLs can change without the
+    redirect being saved. These are resolved from the database when they are hit.
+    """
+    link = redirect_link if redirect_page_id is None else None
+    return (pk, link, is_permanent)
+
+
+class RedirectCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._redirects = None
+        self._lookups = OrderedDict()
+        self._version = None
+        self._expires = 0
+
+    def get(self, request, path):
+        """
+        Return the cache entry for ``path`` on the request's site, or None.
+
+        The site is only looked up when it's needed to choose between redirects,
+        so most misses don't touch the database at all.
+        """
+        self._refresh()
+
+        redirects = self._redirects
+        if redirects is None:
+            site = Site.find_for_request(request)
+            return self._lookup(site.pk if site else None, path)
+
+        matches = {
+            site_id: paths[path]
+            for site_id, paths in redirects.items()
+            if path in paths
+        }
+        if not matches:
+            return None
+        if list(matches) == [None]:
+            return matches[None]
+
+        site = Site.find_for_request(request)
+        if site is None:
+            # Matches Wagtail, which considers all redirects when there is no site
+            return matches.get(None) or next(iter(matches.values()))
+        return matches.get(site.pk) or matches.get(None)
+
+    def clear(self):
+        """Drop this process's copy, it's rebuilt on the next lookup."""
+        with self._lock:
+            self._redirects = None
+            self._lookups = OrderedDict()
+            self._expires = 0
+
+    def _refresh(self):
+        version = cache.get(VERSION_CACHE_KEY)
+        if version == self._version and time.monotonic() < self._expires:
+            return
+
+        with self._lock:
+            # Another thread may have rebuilt the cache while we waited
+            if version == self._version and time.monotonic() < self._expires:
+                return
+
+            max_entries = getattr(settings, "REDIRECTS_CACHE_MAX_ENTRIES", 200_000)
+            if Redirect.objects.count() > max_entries:
+                self._redirects = None
+            else:
+                self._redirects = self._load()
+
+            self._lookups = OrderedDict()
+            self._version = version
+            self._expires = time.monotonic() + getattr(
+                settings, "REDIRECTS_CACHE_TIMEOUT", 300
+            )
+
+    def _load(self):
+        redirects = {}
+        rows = Redirect.objects.values_list(*REDIRECT_FIELDS).iterator(chunk_size=5000)
+        for row in rows:
+            redirects.setdefault(row[0], {})[row[1]] = make_entry(*row)
+        return redirects
+
+    def _lookup(self, site_id, path):
+        key = (site_id, path)
+        with self._lock:
+            entry = self._lookups.get(key, _UNCACHED)
+            if entry is not _UNCACHED:
+                self._lookups.move_to_end(key)
+                return entry
+
+        queryset = Redirect.objects.filter(old_path=path)
+        if site_id is not None:
+            queryset = queryset.filter(Q(site_id=site_id) | Q(site=None))
+
+        entry = None
+        for row in queryset.values_list(*REDIRECT_FIELDS):
+            # Prefer a site specific redirect over one for all sites
+            if entry is None or row[0] is not None:
+                entry = make_entry(*row)
+
+        with self._lock:
+            self._lookups[key] = entry
+            max_lookups = getattr(settings, "REDIRECTS_CACHE_MAX_LOOKUPS", 10_000)
+            while len(self._lookups) > max_lookups:
+                self._lookups.popitem(last=False)
+
+        return entry
+
+
+redirect_cache = RedirectCache()
+
+
+def invalidate():
+    """Make every process rebuild its redirect cache on the next lookup."""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+    redirect_cache.clear()
+
+
+def get_link(entry):
+    """Resolve the URL a cache entry redirects to."""
+    redirect_id, link, is_permanent = entry
+    if link is not None:
+        return link or None
+
+    redirect = (
+        Redirect.objects.select_related("redirect_page").filter(pk=redirect_id).first()
+    )
+    return redirect.link if redirect else None
@@ -0,0 +1,88 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from wagtail.contrib.redirects.middleware import get_redirect as wagtail_get_redirect
+from wagtail.contrib.redirects.models import Redirect
+
+from app.redirects.cache import redirect_cache
+from app.redirects.middleware import get_redirect
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmarks cached redirect lookups against Wagtail's database lookups"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=100_000,
+            help="Number of redirects to create (default: 100000)",
+        )
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=5_000,
+            help="Number of lookups to time for hits and misses (default: 5000)",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the generated redirects instead of rolling them back",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run_benchmark(options["count"], options["lookups"])
+                if not options["keep"]:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write("Rolled back the generated redirects.")
+
+    def run_benchmark(self, count, lookups):
+        self.stdout.write(f"Creating {count} redirects...")
+        start = time.perf_counter()
+        Redirect.objects.bulk_create(
+            (
+                Redirect(
+                    old_path=f"/benchmark/old-{i}",
+                    redirect_link=f"https://example.com/new-{i}",
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+        self.stdout.write(f"  Created in {time.perf_counter() - start:.2f}s")
+
+        # Time building this process's cache from scratch
+        redirect_cache.clear()
+        start = time.perf_counter()
+        redirect_cache.get(RequestFactory().get("/"), "/")
+        self.stdout.write(f"Built redirect cache in {time.perf_counter() - start:.2f}s")
+
+        factory = RequestFactory()
+        hits = [f"/benchmark/old-{random.randrange(count)}" for _ in range(lookups)]
+        misses = [f"/benchmark/missing-{i}" for i in range(lookups)]
+
+        for label, paths in (("hits", hits), ("misses", misses)):
+            requests = [(factory.get(path), path) for path in paths]
+            for name, lookup in (
+                ("wagtail", wagtail_get_redirect),
+                ("cached", get_redirect),
+            ):
+                start = time.perf_counter()
+                for request, path in requests:
+                    lookup(request, path)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"  {name:<8} {label:<7} {len(requests) / elapsed:>12,.0f} lookups/s"
+                )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
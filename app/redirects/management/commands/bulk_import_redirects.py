@@ -0,0 +1,206 @@
+import csv
+import itertools
+import os
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import URLValidator
+from django.db import transaction
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Site
+
+from app.redirects.cache import invalidate
+
+MAX_PATH_LENGTH = Redirect._meta.get_field("old_path").max_length
+MAX_LINK_LENGTH = Redirect._meta.get_field("redirect_link").max_length
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports redirects in bulk from a .csv or .tsv file, streaming the file "
+        "and creating or updating redirects in chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--src",
+            required=True,
+            help="Path to the file, or - to read from stdin",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["csv", "tsv"],
+            help="Source file format (default: taken from the file extension)",
+        )
+        parser.add_argument(
+            "--site",
+            type=int,
+            help="ID of the site the redirects apply to (default: all sites)",
+        )
+        parser.add_argument(
+            "--temporary",
+            action="store_true",
+            help="Save redirects as temporary (302) rather than permanent (301)",
+        )
+        parser.add_argument(
+            "--from",
+            type=int,
+            default=0,
+            help="The column to read the old path from (default: 0)",
+        )
+        parser.add_argument(
+            "--to",
+            type=int,
+            default=1,
+            help="The column to read the redirect link from (default: 1)",
+        )
+        parser.add_argument(
+            "--no-header",
+            action="store_true",
+            help="The file has no header row",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Number of rows validated and saved per transaction (default: 5000)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate the file without saving any redirects",
+        )
+
+    def handle(self, *args, **options):
+        src = options["src"]
+        format_ = options["format"] or os.path.splitext(src)[1].lstrip(".").lower()
+        if format_ not in ("csv", "tsv"):
+            raise CommandError(
+                f"Can't tell the format of '{src}', use --format csv or --format tsv"
+            )
+
+        self.site = None
+        if options["site"]:
+            try:
+                self.site = Site.objects.get(pk=options["site"])
+            except Site.DoesNotExist:
+                raise CommandError(f"Site {options['site']} does not exist")
+
+        self.from_index = options["from"]
+        self.to_index = options["to"]
+        self.is_permanent = not options["temporary"]
+        self.dry_run = options["dry_run"]
+        self.validate_url = URLValidator()
+        self.created = self.updated = self.errors = 0
+
+        if src == "-":
+            self.import_file(sys.stdin, format_, options)
+        else:
+            if not os.path.exists(src):
+                raise CommandError(f"Missing file '{src}'")
+            with open(src, newline="", encoding="utf-8-sig") as fh:
+                self.import_file(fh, format_, options)
+
+    def import_file(self, fh, format_, options):
+        reader = csv.reader(fh, delimiter="\t" if format_ == "tsv" else ",")
+        # Line numbers are 1-based and include the header
+        rows = enumerate(reader, start=1)
+        if not options["no_header"]:
+            next(rows, None)
+
+        site_name = self.site.hostname if self.site else "all sites"
+        self.stdout.write(f"Importing redirects for {site_name}...")
+
+        total = 0
+        start = time.perf_counter()
+        while chunk := list(itertools.islice(rows, options["chunk_size"])):
+            redirects = self.validate_chunk(chunk)
+            if not self.dry_run:
+                self.save_chunk(redirects)
+
+            total += len(chunk)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"  {total:,} rows processed ({total / max(elapsed, 1e-9):,.0f} rows/s)"
+            )
+
+        if not self.dry_run:
+            invalidate()
+
+        elapsed = time.perf_counter() - start
+        summary = (
+            f"{total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s): "
+            f"{self.created:,} created, {self.updated:,} updated, {self.errors:,} errors"
+        )
+        if self.dry_run:
+            summary = f"Dry run, nothing saved. {summary}"
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def validate_chunk(self, chunk):
+        """Return a dict of normalised old path to redirect link for valid rows."""
+        redirects = {}
+        for line_number, row in chunk:
+            try:
+                old_path, redirect_link = self.validate_row(row)
+            except ValidationError as e:
+                self.errors += 1
+                self.stderr.write(f"  Line {line_number}: {'; '.join(e.messages)}")
+                continue
+            # A later row for the same path replaces an earlier one
+            redirects[old_path] = redirect_link
+        return redirects
+
+    def validate_row(self, row):
+        try:
+            old_path = row[self.from_index].strip()
+            redirect_link = row[self.to_index].strip()
+        except IndexError:
+            raise ValidationError("Missing column")
+
+        if not old_path or not redirect_link:
+            raise ValidationError("Empty old path or redirect link")
+
+        old_path = Redirect.normalise_path(old_path)
+        if len(old_path) > MAX_PATH_LENGTH:
+            raise ValidationError(f"Old path is longer than {MAX_PATH_LENGTH}")
+        if len(redirect_link) > MAX_LINK_LENGTH:
+            raise ValidationError(f"Redirect link is longer than {MAX_LINK_LENGTH}")
+
+        # Paths on the same site are allowed, as in Wagtail's redirect form.
+        # "//example.com/" is a URL on another site, so it's validated.
+        if redirect_link.startswith("//") or not redirect_link.startswith("/"):
+            self.validate_url(redirect_link)
+        return old_path, redirect_link
+
+    @transaction.atomic
+    def save_chunk(self, redirects):
+        existing = dict(
+            Redirect.objects.filter(
+                site=self.site, old_path__in=redirects.keys()
+            ).values_list("old_path", "pk")
+        )
+
+        to_create = []
+        to_update = []
+        for old_path, redirect_link in redirects.items():
+            redirect = Redirect(
+                pk=existing.get(old_path),
+                old_path=old_path,
+                site=self.site,
+                redirect_link=redirect_link,
+                redirect_page=None,
+                is_permanent=self.is_permanent,
+            )
+            if redirect.pk:
+                to_update.append(redirect)
+            else:
+                to_create.append(redirect)
+
+        Redirect.objects.bulk_create(to_create)
+        Redirect.objects.bulk_update(
+            to_update, ["redirect_link", "redirect_page", "is_permanent"]
+        )
+        self.created += len(to_create)
+        self.updated += len(to_update)
@@ -0,0 +1,56 @@
+from urllib.parse import urlparse
+
+from django import http
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.encoding import uri_to_iri
+from wagtail.contrib.redirects.models import Redirect
+
+from app.redirects.cache import get_link, redirect_cache
+
+
+def get_redirect(request, path):
+    # Reject URLs with null characters, as Wagtail's middleware does
+    if "\0" in path:
+        return None
+
+    entry = redirect_cache.get(request, path)
+    if entry is None:
+        # Try unencoding the path
+        entry = redirect_cache.get(request, uri_to_iri(path))
+    return entry
+
+
+class CachedRedirectMiddleware(MiddlewareMixin):
+    """
+    A drop in replacement for Wagtail's RedirectMiddleware which finds redirects
+    in ``app.redirects.cache`` rather than querying the database on every 404.
+    """
+
+    def process_response(self, request, response):
+        # No need to check for a redirect for non-404 responses.
+        if response.status_code != 404:
+            return response
+
+        path = Redirect.normalise_path(request.get_full_path())
+
+        entry = get_redirect(request, path)
+        if entry is None:
+            # Get the path without the query string or params
+            path_without_query = urlparse(path).path
+
+            if path == path_without_query:
+                # don't try again if we know we will get the same response
+                return response
+
+            entry = get_redirect(request, path_without_query)
+            if entry is None:
+                return response
+
+        link = get_link(entry)
+        if link is None:
+            return response
+
+        redirect_id, _, is_permanent = entry
+        if is_permanent:
+            return http.HttpResponsePermanentRedirect(link)
+        return http.HttpResponseRedirect(link)
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from wagtail.contrib.redirects.models import Redirect
+
+from app.redirects.cache import invalidate
+
+
+def invalidate_redirect_cache(**kwargs):
+    # Wait for the commit, otherwise another process could rebuild its cache
+    # from the database before the change is visible
+    transaction.on_commit(invalidate)
+
+
+def register_signal_handlers():
+    post_save.connect(invalidate_redirect_cache, sender=Redirect)
+    post_delete.connect(invalidate_redirect_cache, sender=Redirect)
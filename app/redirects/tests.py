@@ -0,0 +1,142 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Site
+
+from app.home.models import HomePage
+from app.redirects.cache import invalidate
+from app.redirects.middleware import get_redirect
+
+
+class CachedRedirectTestCase(TestCase):
+    """Tests for the cached redirect middleware."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up redirects for the tests."""
+        cls.site = Site.objects.get(is_default_site=True)
+        cls.home_page = HomePage.objects.first()
+        Redirect.objects.create(old_path="/old", redirect_link="https://example.com/")
+        Redirect.objects.create(
+            old_path="/temporary",
+            redirect_link="https://example.com/temporary/",
+            is_permanent=False,
+        )
+        Redirect.objects.create(old_path="/home-page", redirect_page=cls.home_page)
+
+    def setUp(self):
+        """Start each test with an empty redirect cache."""
+        invalidate()
+
+    def test_permanent_redirect(self):
+        """Test that a permanent redirect returns 301."""
+        response = self.client.get("/old/")
+        self.assertRedirects(
+            response, "https://example.com/", 301, fetch_redirect_response=False
+        )
+
+    def test_temporary_redirect(self):
+        """Test that a temporary redirect returns 302."""
+        response = self.client.get("/temporary/")
+        self.assertRedirects(
+            response,
+            "https://example.com/temporary/",
+            302,
+            fetch_redirect_response=False,
+        )
+
+    def test_page_redirect(self):
+        """Test that a redirect to a page uses the page's URL."""
+        response = self.client.get("/home-page/")
+        self.assertRedirects(response, "/", 301, fetch_redirect_response=False)
+
+    def test_misses_are_served_from_memory(self):
+        """Test that once loaded, a missing path doesn't query for redirects."""
+        request = RequestFactory().get("/missing/")
+        get_redirect(request, "/warm-up")
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_redirect(request, "/missing"))
+
+    def test_saving_redirect_invalidates_cache(self):
+        """Test that a new redirect is found once it's committed."""
+        self.assertEqual(self.client.get("/new/").status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            Redirect.objects.create(
+                old_path="/new", redirect_link="https://example.com/new/"
+            )
+        self.assertEqual(self.client.get("/new/").status_code, 301)
+
+    def test_deleting_redirect_invalidates_cache(self):
+        """Test that a deleted redirect stops redirecting."""
+        self.assertEqual(self.client.get("/old/").status_code, 301)
+        with self.captureOnCommitCallbacks(execute=True):
+            Redirect.objects.filter(old_path="/old").delete()
+        self.assertEqual(self.client.get("/old/").status_code, 404)
+
+    @override_settings(REDIRECTS_CACHE_MAX_ENTRIES=1)
+    def test_large_tables_cache_individual_lookups(self):
+        """Test that above the size limit, hits and misses are cached per path."""
+        request = RequestFactory().get("/old/")
+        self.assertIsNotNone(get_redirect(request, "/old"))
+        self.assertIsNone(get_redirect(request, "/missing"))
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(get_redirect(request, "/old"))
+            self.assertIsNone(get_redirect(request, "/missing"))
+
+
+class BulkImportRedirectsTestCase(TestCase):
+    """Tests for the bulk_import_redirects management command."""
+
+    def _import(self, content, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as fh:
+            fh.write(content)
+        self.addCleanup(os.remove, fh.name)
+        call_command(
+            "bulk_import_redirects",
+            "--src",
+            fh.name,
+            *args,
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+
+    def test_import_creates_redirects_in_chunks(self):
+        """Test that every valid row is imported across several chunks."""
+        rows = "".join(f"/old-{i}/,https://example.com/new-{i}/\n" for i in range(25))
+        self._import("from,to\n" + rows, "--chunk-size", "10")
+        self.assertEqual(Redirect.objects.count(), 25)
+        redirect = Redirect.objects.get(old_path="/old-7")
+        self.assertEqual(redirect.redirect_link, "https://example.com/new-7/")
+        self.assertTrue(redirect.is_permanent)
+
+    def test_import_updates_existing_redirects(self):
+        """Test that importing a path again updates the existing redirect."""
+        Redirect.objects.create(old_path="/old", redirect_link="https://example.com/")
+        self._import("from,to\n/old,https://example.com/updated/\n", "--temporary")
+        redirect = Redirect.objects.get(old_path="/old")
+        self.assertEqual(redirect.redirect_link, "https://example.com/updated/")
+        self.assertFalse(redirect.is_permanent)
+
+    def test_invalid_rows_are_skipped(self):
+        """Test that invalid rows are reported and skipped."""
+        self._import("from,to\n/ok,https://example.com/\n/bad,not a url\n/missing\n")
+        self.assertEqual(
+            list(Redirect.objects.values_list("old_path", flat=True)), ["/ok"]
+        )
+
+    def test_paths_on_the_same_site(self):
+        """Test that redirect links can be paths, but not protocol relative URLs."""
+        self._import("from,to\n/old,/new/\n/other,//not a url\n")
+        self.assertEqual(
+            list(Redirect.objects.values_list("old_path", "redirect_link")),
+            [("/old", "/new/")],
+        )
+
+    def test_dry_run_saves_nothing(self):
+        """Test that a dry run only validates the file."""
+        self._import("from,to\n/old,https://example.com/\n", "--dry-run")
+        self.assertFalse(Redirect.objects.exists())
@@ -1,7 +1,19 @@
-from django.test import TestCase
+import threading
+from collections import namedtuple
+from unittest import mock
 
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase
+from wagtail.documents.models import Document
+from wagtail.search.backends import get_search_backend
 
-class SearchTestCase(TestCase):
+from app.search.unified import search_all
+from app.tests_utils import TemporaryMediaMixin
+
+Result = namedtuple("Result", ["pk", "title"])
+
+
+class SearchTestCase(TemporaryMediaMixin, TestCase):
     """Tests for the search app frontend."""
 
     def test_search_frontend_returns_200(self):
@@ -33,3 +45,120 @@ class SearchTestCase(TestCase):
         self.assertNotContains(response, "No results found")
         self.assertContains(response, 'name="query"')
         self.assertTemplateUsed(response, "search/search.html")
+
+    def test_search_documents(self):
+        """Test that documents can be searched on their own."""
+        document = Document.objects.create(
+            title="Quarterly zebra report", file=ContentFile(b"", name="zebra.txt")
+        )
+        get_search_backend().add(document)
+
+        response = self.client.get("/search/?query=zebra&type=documents")
+        self.assertContains(response, "Quarterly zebra report")
+        self.assertContains(response, document.url)
+
+    def test_search_one_type_is_paginated(self):
+        """Test that searching one type isn't limited to the top few results."""
+        for i in range(12):
+            document = Document.objects.create(
+                title=f"Zebra report {i}", file=ContentFile(b"", name="zebra.txt")
+            )
+            get_search_backend().add(document)
+
+        with self.settings(SEARCH_RESULTS_PER_SOURCE=3):
+            response = self.client.get("/search/?query=zebra&type=documents")
+            self.assertEqual(response.context["search_results"].paginator.count, 12)
+            self.assertEqual(len(response.context["search_results"]), 10)
+            response = self.client.get("/search/?query=zebra&type=documents&page=2")
+            self.assertEqual(len(response.context["search_results"]), 2)
+
+            response = self.client.get("/search/?query=zebra")
+            self.assertEqual(response.context["search_results"].paginator.count, 3)
+
+    def test_failed_source_is_named(self):
+        """Test that the page says which results may be missing."""
+        with mock.patch(
+            "app.search.views.search_all", return_value=([], ["documents"])
+        ):
+            response = self.client.get("/search/?query=zebra")
+        self.assertContains(
+            response,
+            "Some results may be missing, because documents couldn't be searched.",
+        )
+
+    def test_search_document_text(self):
+        """Test that documents are found by the text extracted from their files."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Document.objects.create(
+                title="Minutes", file=ContentFile(b"Notes on okapis", name="notes.txt")
+            )
+
+        response = self.client.get("/search/?query=okapis")
+        self.assertContains(response, "Minutes")
+
+    def test_search_all(self):
+        """Test that pages, documents and images are searched together."""
+        document = Document.objects.create(
+            title="Zebra crossings", file=ContentFile(b"", name="zebra.txt")
+        )
+        get_search_backend().add(document)
+
+        response = self.client.get("/search/?query=zebra")
+        self.assertContains(response, "Zebra crossings")
+        self.assertEqual(response.context["failed_sources"], [])
+
+
+class SearchAllTestCase(SimpleTestCase):
+    """Tests for searching several sources at once."""
+
+    def setUp(self):
+        """Replace the sources with lists, which don't need the database."""
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        sources = mock.patch.dict(
+            "app.search.unified.SOURCES",
+            {
+                "pages": lambda query: [Result(pk, f"page {pk}") for pk in range(1, 4)],
+                "documents": lambda query: [Result(11, "document 1")],
+                "images": self.slow_source,
+            },
+            clear=True,
+        )
+        sources.start()
+        self.addCleanup(sources.stop)
+        close = mock.patch("app.search.unified.close_old_connections")
+        close.start()
+        self.addCleanup(close.stop)
+
+    def slow_source(self, query):
+        self.release.wait(5)
+        return [Result(21, "image 1")]
+
+    def test_merges_by_rank(self):
+        """Test that results from each source are interleaved by rank."""
+        results, failed = search_all("query", sources=["pages", "documents"])
+
+        self.assertEqual(
+            [result.object.title for result in results],
+            ["page 1", "document 1", "page 2", "page 3"],
+        )
+        self.assertEqual(failed, [])
+
+    def test_slow_source_is_left_out(self):
+        """Test that a source which takes too long doesn't hold up the rest."""
+        with self.assertLogs("app.search.unified", "WARNING"):
+            results, failed = search_all("query", timeout=0.2)
+
+        self.assertEqual(failed, ["images"])
+        self.assertEqual(len(results), 4)
+
+    def test_failed_source_is_left_out(self):
+        """Test that a source which raises an error is reported as failed."""
+        with mock.patch.dict(
+            "app.search.unified.SOURCES", {"images": lambda query: 1 / 0}
+        ):
+            with self.assertLogs("app.search.unified", "ERROR"):
+                results, failed = search_all("query")
+
+        self.assertEqual(failed, ["images"])
+        self.assertEqual(len(results), 4)
@@ -0,0 +1,197 @@
+"""
+Search across pages, documents and images at once.
+
+Each source is searched on its own thread, so a search takes as long as the
+slowest source rather than the sum of them, and a source that hasn't answered
+within SEARCH_SOURCE_TIMEOUT seconds is left out of the results.
+
+Sources rank their results with different search indexes (and on SQLite can't
+report scores at all), so raw scores can't be compared. Results are merged by
+reciprocal rank instead: each result scores 1 / (RANK_CONSTANT + its position
+in its source's results), and the merged list is sorted by that score.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from wagtail.documents import get_document_model
+from wagtail.images import get_image_model
+from wagtail.models import CollectionViewRestriction, Page
+from wagtail.search.backends import get_search_backend
+
+from app.documents.models import DocumentText
+
+logger = logging.getLogger(__name__)
+
+# Dampens the difference between the top few results of each source
+RANK_CONSTANT = 60
+
+# Threads shared by every request, so their database connections are reused
+WORKERS = 8
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="search")
+    return _executor
+
+
+def search_pages(query):
+    return Page.objects.live().search(query)
+
+
+class DocumentResults:
+    """
+    Documents found by their title and tags, and by the text extracted from
+    their files, merged by rank. Only the ids are searched for until a slice
+    is taken, then just those documents are fetched, so the results can be
+    paginated like a queryset.
+    """
+
+    def __init__(self, query):
+        # Documents in collections restricted to logged in users or groups
+        # aren't listed
+        restricted = CollectionViewRestriction.objects.values("collection")
+        self.documents = get_document_model().objects.exclude(collection__in=restricted)
+        self.query = query
+        self.ids = None
+
+    def get_ids(self, limit=None):
+        """Return the ids in rank order, of the top ``limit`` of each search."""
+        if self.ids is not None:
+            return self.ids
+
+        by_title = list(self.documents.only("pk").search(self.query)[:limit])
+        text_ids = [
+            text.document_id
+            for text in get_search_backend().search(
+                self.query, DocumentText.objects.only("document_id")
+            )[:limit]
+        ]
+        found = self.documents.only("pk").in_bulk(text_ids)
+        by_text = [found[pk] for pk in text_ids if pk in found]
+        ids = [
+            result.object.pk
+            for result in merge([("documents", by_title), ("documents", by_text)])
+        ]
+        if limit is None:
+            self.ids = ids
+        return ids
+
+    def count(self):
+        return len(self.get_ids())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[slice(key, key + 1)][0]
+        # The top results of each search are enough for a slice from the
+        # start, such as the top few for search_all
+        ids = self.get_ids(key.stop)[key]
+        found = self.documents.in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
+
+
+def search_documents(query):
+    return DocumentResults(query)
+
+
+def search_images(query):
+    return get_image_model().objects.search(query)
+
+
+SOURCES = {
+    "pages": search_pages,
+    "documents": search_documents,
+    "images": search_images,
+}
+
+
+@dataclass
+class SearchResult:
+    source: str
+    object: object
+    score: float
+
+
+def merge(ranked):
+    """
+    Merge lists of (source, results in rank order) by reciprocal rank. An
+    object in more than one list adds up its scores.
+    """
+    merged = {}
+    for source, objects in ranked:
+        for rank, obj in enumerate(objects, start=1):
+            score = 1 / (RANK_CONSTANT + rank)
+            key = (type(obj), obj.pk)
+            if key in merged:
+                merged[key].score += score
+            else:
+                merged[key] = SearchResult(source, obj, score)
+    # Sorting is stable, so equal scores keep the order of the lists
+    return sorted(merged.values(), key=lambda result: result.score, reverse=True)
+
+
+def get_results(source, query, limit):
+    return list(SOURCES[source](query)[:limit])
+
+
+def run_source(source, query, limit):
+    """Fetch the top results from one source, on a worker thread."""
+    close_old_connections()
+    try:
+        return get_results(source, query, limit)
+    finally:
+        close_old_connections()
+
+
+def search_all(query, sources=None, limit=None, timeout=None):
+    """
+    Search each source concurrently, returning the merged results and the
+    names of any sources which failed or timed out.
+    """
+    sources = sources or list(SOURCES)
+    limit = limit or settings.SEARCH_RESULTS_PER_SOURCE
+    timeout = settings.SEARCH_SOURCE_TIMEOUT if timeout is None else timeout
+
+    found = {}
+    failed = []
+    if connection.in_atomic_block:
+        # Other threads can't see this transaction's changes, so search here
+        for source in sources:
+            try:
+                found[source] = get_results(source, query, limit)
+            except Exception:
+                logger.exception("Searching %s failed", source)
+                failed.append(source)
+    else:
+        executor = get_executor()
+        futures = {
+            executor.submit(run_source, source, query, limit): source
+            for source in sources
+        }
+        _, not_done = wait(futures, timeout=timeout)
+        for future, source in futures.items():
+            if future in not_done:
+                # A running search can't be stopped, but its results are ignored
+                future.cancel()
+                logger.warning("Searching %s took longer than %ss", source, timeout)
+                failed.append(source)
+                continue
+            try:
+                found[source] = future.result()
+            except Exception:
+                logger.exception("Searching %s failed", source)
+                failed.append(source)
+
+    return (
+        merge((source, found[source]) for source in sources if source in found),
+        failed,
+    )
@@ -1,6 +1,10 @@
+import time
+
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.template.response import TemplateResponse
-from wagtail.models import Page
+
+from app.monitoring.metrics import observe_search
+from app.search.unified import SOURCES, SearchResult, search_all
 
 # To enable logging of search queries for use with the "Promoted search results" module
 # <https://docs.wagtail.org/en/stable/reference/contrib/searchpromotions.html>
@@ -12,11 +16,20 @@ from wagtail.models import Page
 
 def search(request):
     search_query = request.GET.get("query", None)
+    search_type = request.GET.get("type", "all")
+    if search_type not in SOURCES:
+        search_type = "all"
     page = request.GET.get("page", 1)
+    start = time.perf_counter()
+    failed_sources = []
 
     # Search
     if search_query:
-        search_results = Page.objects.live().search(search_query)
+        if search_type == "all":
+            # Pages, documents and images at once, merged into one list
+            search_results, failed_sources = search_all(search_query)
+        else:
+            search_results = SOURCES[search_type](search_query)
 
         # To log this query for use with the "Promoted search results" module:
 
@@ -24,7 +37,7 @@ def search(request):
         # query.add_hit()
 
     else:
-        search_results = Page.objects.none()
+        search_results = []
 
     # Pagination
     paginator = Paginator(search_results, 10)
@@ -35,11 +48,25 @@ def search(request):
     except EmptyPage:
         search_results = paginator.page(paginator.num_pages)
 
+    if search_query:
+        # Fetch the results here, rather than in the template, so the time
+        # recorded includes running the search
+        search_results.object_list = list(search_results.object_list)
+        if search_type != "all":
+            search_results.object_list = [
+                SearchResult(search_type, obj, None)
+                for obj in search_results.object_list
+            ]
+        observe_search(time.perf_counter() - start)
+
     return TemplateResponse(
         request,
         "search/search.html",
         {
             "search_query": search_query,
+            "search_type": search_type,
+            "search_types": ["all", *SOURCES],
             "search_results": search_results,
+            "failed_sources": failed_sources,
         },
     )
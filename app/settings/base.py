@@ -14,6 +14,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 PROJECT_DIR = Path.resolve(Path(__file__).parent.parent)
 BASE_DIR = Path.resolve(PROJECT_DIR.parent)
 
@@ -27,6 +29,15 @@ DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 INSTALLED_APPS = [
     "app.home",
     "app.search",
+    "app.sitemap",
+    "app.documents",
+    "app.images",
+    "app.embeds",
+    "app.forms",
+    "app.redirects",
+    "app.monitoring",
+    "app.benchmarks",
+    "app.tasks",
     "wagtail.contrib.forms",
     "wagtail.contrib.redirects",
     "wagtail.contrib.table_block",
@@ -41,6 +52,7 @@ INSTALLED_APPS = [
     "wagtail",
     "modelcluster",
     "taggit",
+    "django_tasks.backends.database",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -49,7 +61,45 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
 ]
 
+# Optional apps
+# Apps the site works without. Leave them out in production with a comma
+# separated DJANGO_DISABLED_APPS environment variable, e.g.
+# DJANGO_DISABLED_APPS=wagtail.contrib.forms,wagtail.embeds
+# so worker processes start faster and use less memory. Their URLs are only
+# included when the app is installed. Use `manage.py profile_startup` to
+# measure the difference.
+OPTIONAL_APPS = [
+    "wagtail.contrib.forms",
+    "wagtail.contrib.table_block",
+    "wagtail.embeds",
+    "wagtail.snippets",
+    "django.contrib.admin",
+]
+DISABLED_APPS = [
+    app.strip()
+    for app in os.getenv("DJANGO_DISABLED_APPS", "").split(",")
+    if app.strip()
+]
+if set(DISABLED_APPS) - set(OPTIONAL_APPS):
+    raise ImproperlyConfigured(
+        f"DJANGO_DISABLED_APPS can only contain {', '.join(OPTIONAL_APPS)}"
+    )
+# Project apps which are left out along with the optional app they extend
+DEPENDENT_APPS = {
+    "app.embeds": "wagtail.embeds",
+    "app.forms": "wagtail.contrib.forms",
+}
+INSTALLED_APPS = [
+    app
+    for app in INSTALLED_APPS
+    if app not in DISABLED_APPS and DEPENDENT_APPS.get(app) not in DISABLED_APPS
+]
+
 MIDDLEWARE = [
+    # Answers /healthz and /readyz before sessions, authentication and timing
+    "app.monitoring.middleware.HealthCheckMiddleware",
+    "app.monitoring.middleware.RequestTimingMiddleware",
+    "app.monitoring.middleware.MemoryProfilingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -57,7 +107,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "wagtail.contrib.redirects.middleware.RedirectMiddleware",
+    # Replaces wagtail.contrib.redirects.middleware.RedirectMiddleware
+    "app.redirects.middleware.CachedRedirectMiddleware",
 ]
 
 ROOT_URLCONF = "app.urls"
@@ -116,6 +167,143 @@ else:
         }
     }
 
+# Test database snapshots
+# Set TEST_DB_SNAPSHOT=true to save the migrated test database on the first test
+# run and restore it on later runs instead of applying every migration. SQLite
+# snapshots are saved in TEST_DB_SNAPSHOT_DIR, PostgreSQL snapshots are template
+# databases. A new snapshot is made when any migration file changes.
+TEST_RUNNER = "app.test_runner.SnapshotTestRunner"
+TEST_DB_SNAPSHOT = os.getenv("TEST_DB_SNAPSHOT", "False").lower() == "true"
+TEST_DB_SNAPSHOT_DIR = os.getenv(
+    "TEST_DB_SNAPSHOT_DIR", os.path.join(BASE_DIR, ".test-db-snapshots")
+)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Defaults to a per-process in-memory cache. Use a shared cache (e.g. Redis) in
+# production so cache invalidations reach every worker process.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", ""),
+    }
+}
+
+# Sessions
+# https://docs.djangoproject.com/en/5.1/topics/http/sessions/#configuring-the-session-engine
+# DJANGO_SESSION_ENGINE is one of:
+#   "db" (default) - sessions in the django_session table
+#   "cached_db" - read from the cache, falling back to and writing through to
+#       the database
+#   "cache" - only in the cache, lost if the cache is cleared. Use a persistent
+#       shared cache such as Redis
+#   "signed_cookies" - stored in the browser cookie, signed with SECRET_KEY
+# Sessions are loaded lazily, so anonymous visitors without a session cookie
+# never touch the session store. Remove expired db and cached_db sessions with
+# `manage.py clear_expired_sessions`.
+SESSION_ENGINES = ["db", "cached_db", "cache", "signed_cookies"]
+if os.getenv("DJANGO_SESSION_ENGINE", "db") not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f"DJANGO_SESSION_ENGINE must be one of {', '.join(SESSION_ENGINES)}"
+    )
+SESSION_ENGINE = "django.contrib.sessions.backends." + os.getenv(
+    "DJANGO_SESSION_ENGINE", "db"
+)
+
+# Background tasks
+# Wagtail defers some work to tasks, such as updating the reference index,
+# detecting image focal points and deleting replaced files.
+# DJANGO_TASK_BACKEND is one of:
+#   "immediate" (default) - run each task straight away, during the request
+#   "database" - store tasks in the database for `manage.py run_task_worker` to
+#       run in the background, with retries
+TASK_BACKENDS = {
+    "immediate": "django_tasks.backends.immediate.ImmediateBackend",
+    "database": "django_tasks.backends.database.DatabaseBackend",
+}
+if os.getenv("DJANGO_TASK_BACKEND", "immediate") not in TASK_BACKENDS:
+    raise ImproperlyConfigured(
+        f"DJANGO_TASK_BACKEND must be one of {', '.join(TASK_BACKENDS)}"
+    )
+TASKS = {
+    "default": {
+        "BACKEND": TASK_BACKENDS[os.getenv("DJANGO_TASK_BACKEND", "immediate")],
+    }
+}
+
+# Request timing
+# Set REQUEST_TIMING_ENABLED=true to add a Server-Timing header to every response
+# and log request timings and query counts as JSON to the app.monitoring logger.
+REQUEST_TIMING_ENABLED = os.getenv("REQUEST_TIMING_ENABLED", "False").lower() == "true"
+
+# Prometheus metrics
+# Set METRICS_ENABLED=true to collect request, database, cache, search and page
+# serving metrics, served at /metrics. With more than one worker process, set
+# METRICS_MULTIPROC_DIR to a directory shared by the workers (and emptied when
+# the application server starts) so each scrape adds up every worker's metrics.
+# Scrapes must send "Authorization: Bearer <METRICS_TOKEN>" if a token is set.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False").lower() == "true"
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Health checks
+# /healthz answers as long as the process is up. /readyz checks the database,
+# cache and media storage can be reached, at most once every
+# HEALTH_CHECK_CACHE_SECONDS per process, and returns 503 if any can't. A
+# check which takes longer than HEALTH_CHECK_TIMEOUT seconds fails.
+HEALTH_CHECK_CACHE_SECONDS = float(os.getenv("HEALTH_CHECK_CACHE_SECONDS", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+# Memory profiling
+# Set MEMORY_PROFILING_ENABLED=true to record how much each view grows the
+# worker processes' memory (RSS). Each worker writes its RSS and the growth per
+# view to a file in MEMORY_PROFILING_DIR every MEMORY_PROFILING_INTERVAL
+# seconds, for `manage.py memory_report`. Files which haven't been written to
+# for MEMORY_PROFILING_RETENTION_DAYS are deleted. A MEMORY_PROFILING_SAMPLE_RATE
+# fraction of requests (0 to 1), and requests with an
+# "X-Memory-Profile: <MEMORY_PROFILING_TOKEN>" header, are traced with
+# tracemalloc and the top MEMORY_PROFILING_TOP allocation sites which outlive
+# the request are logged as JSON to the app.monitoring logger.
+MEMORY_PROFILING_ENABLED = (
+    os.getenv("MEMORY_PROFILING_ENABLED", "False").lower() == "true"
+)
+MEMORY_PROFILING_DIR = os.getenv(
+    "MEMORY_PROFILING_DIR", os.path.join(BASE_DIR, "memory-profiles")
+)
+MEMORY_PROFILING_INTERVAL = int(os.getenv("MEMORY_PROFILING_INTERVAL", "60"))
+MEMORY_PROFILING_RETENTION_DAYS = int(os.getenv("MEMORY_PROFILING_RETENTION_DAYS", "7"))
+MEMORY_PROFILING_SAMPLE_RATE = float(os.getenv("MEMORY_PROFILING_SAMPLE_RATE", "0"))
+MEMORY_PROFILING_TOKEN = os.getenv("MEMORY_PROFILING_TOKEN", "")
+MEMORY_PROFILING_TOP = 10
+
+if REQUEST_TIMING_ENABLED or METRICS_ENABLED:
+    # Wrap the default cache so cache hits and misses can be counted
+    CACHES["default"]["OPTIONS"] = {
+        **CACHES["default"].get("OPTIONS", {}),
+        "WRAPPED_BACKEND": CACHES["default"]["BACKEND"],
+    }
+    CACHES["default"]["BACKEND"] = "app.monitoring.cache.InstrumentedCache"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "app.monitoring": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -181,6 +369,44 @@ STORAGES = {
     },
 }
 
+# Media storage
+# DJANGO_MEDIA_STORAGE is "filesystem" (default) to keep uploaded media in
+# MEDIA_ROOT, or "s3" to share it between app servers in an S3 compatible object
+# store (AWS S3, MinIO, Cloudflare R2, etc), using django-storages.
+MEDIA_STORAGE = os.getenv("DJANGO_MEDIA_STORAGE", "filesystem")
+if MEDIA_STORAGE not in ("filesystem", "s3"):
+    raise ImproperlyConfigured('DJANGO_MEDIA_STORAGE must be "filesystem" or "s3"')
+
+if MEDIA_STORAGE == "s3":
+    from botocore.config import Config
+
+    STORAGES["default"] = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": os.getenv("AWS_STORAGE_BUCKET_NAME"),
+            # Leave unset for AWS, set to the service URL for other providers
+            "endpoint_url": os.getenv("AWS_S3_ENDPOINT_URL") or None,
+            "region_name": os.getenv("AWS_S3_REGION_NAME") or None,
+            # Unset to use the boto3 credential chain (e.g. an instance role)
+            "access_key": os.getenv("AWS_ACCESS_KEY_ID") or None,
+            "secret_key": os.getenv("AWS_SECRET_ACCESS_KEY") or None,
+            "custom_domain": os.getenv("AWS_S3_CUSTOM_DOMAIN") or None,
+            "location": os.getenv("AWS_LOCATION", ""),
+            # Wagtail expects a new name for a new file rather than replacing
+            # an existing one
+            "file_overwrite": False,
+            "default_acl": None,
+            # Each thread reuses its own client, with up to this many pooled
+            # HTTP connections, so parallel uploads don't reconnect per file
+            "client_config": Config(
+                max_pool_connections=int(
+                    os.getenv("AWS_S3_MAX_POOL_CONNECTIONS", "32")
+                ),
+                retries={"max_attempts": 5, "mode": "standard"},
+            ),
+        },
+    }
+
 # Django sets a maximum of 1000 fields per form by default, but particularly complex page models
 # can exceed this limit within Wagtail's page editor.
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10_000
@@ -198,10 +424,80 @@ WAGTAILSEARCH_BACKENDS = {
     }
 }
 
+# The site search looks through pages, documents and images at once, taking
+# the top SEARCH_RESULTS_PER_SOURCE results from each. Searching just one of
+# them isn't limited. A source which hasn't
+# answered within SEARCH_SOURCE_TIMEOUT seconds is left out of the results.
+SEARCH_RESULTS_PER_SOURCE = 50
+SEARCH_SOURCE_TIMEOUT = float(os.getenv("SEARCH_SOURCE_TIMEOUT", "2"))
+
+# Form submission export
+# Form submissions are downloaded FORM_EXPORT_CHUNK_SIZE at a time, so exports
+# of any size use about the same memory.
+FORM_EXPORT_CHUNK_SIZE = 2000
+
+# Embed warming
+# The embeds in a page are fetched from their providers when it's published,
+# and by `manage.py warm_embeds`, EMBED_WARMING_WORKERS at a time.
+EMBED_WARMING_WORKERS = int(os.getenv("EMBED_WARMING_WORKERS", "8"))
+
+# Navigation
+# The {% site_navigation %} menu is cached for NAVIGATION_CACHE_TIMEOUT seconds,
+# and rebuilt whenever a page is published, unpublished, moved or deleted.
+NAVIGATION_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Sitemap
+# /sitemap.xml lists shards of up to SITEMAP_SHARD_SIZE pages (50,000 is the
+# most a sitemap may hold). Shards are cached for SITEMAP_CACHE_TIMEOUT seconds,
+# and a shard is regenerated when one of its pages is published, unpublished,
+# moved or deleted.
+SITEMAP_SHARD_SIZE = 50_000
+SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24
+
 # Base URL to use when referring to full URLs within the Wagtail admin backend -
 # e.g. in notification emails. Don't include '/admin' or a trailing slash
 WAGTAILADMIN_BASE_URL = os.getenv("WAGTAILADMIN_BASE_URL", "http://localhost:8000")
 
+# Redirects
+# Each process keeps the redirect table in memory, rebuilt when a redirect is
+# saved or deleted and at least every REDIRECTS_CACHE_TIMEOUT seconds.
+# Above REDIRECTS_CACHE_MAX_ENTRIES redirects, paths are looked up individually
+# and up to REDIRECTS_CACHE_MAX_LOOKUPS results (including misses) are cached.
+REDIRECTS_CACHE_TIMEOUT = 300
+REDIRECTS_CACHE_MAX_ENTRIES = 200_000
+REDIRECTS_CACHE_MAX_LOOKUPS = 10_000
+
+# The document model, set here so app migrations can depend on it if it's
+# swapped for a custom model
+WAGTAILDOCS_DOCUMENT_MODEL = "wagtaildocs.Document"
+
+# Document serving
+# Local document files are handed to the sendfile backend below. Use "nginx"
+# (X-Accel-Redirect) or "apache" (X-Sendfile) to let the front-end web server
+# deliver the file instead of a Python worker. "streaming" serves the file from
+# Python, with support for Range and conditional requests.
+# Documents in object storage are served by redirecting to a signed URL after
+# Wagtail's privacy checks, so downloads don't pass through a Python worker.
+WAGTAILDOCS_SERVE_METHOD = "redirect" if MEDIA_STORAGE == "s3" else "serve_view"
+SENDFILE_BACKEND = "app.documents.sendfile"
+DOCUMENTS_SENDFILE_MODE = os.getenv("DOCUMENTS_SENDFILE_MODE", "streaming")
+# The internal nginx location which maps to MEDIA_ROOT, used by the "nginx" mode
+DOCUMENTS_SENDFILE_URL = os.getenv("DOCUMENTS_SENDFILE_URL", "/protected-media/")
+
+# Document text extraction
+# The text of txt, csv, zip, docx, odt, pptx and xlsx documents is extracted for
+# the site search when they're saved, up to DOCUMENT_TEXT_MAX_BYTES per file.
+DOCUMENT_TEXT_MAX_BYTES = 512 * 1024
+
+# Dynamic image serving
+# Images at URLs made with the {% image_url %} tag are rendered on the first
+# request and cached in IMAGE_SERVE_CACHE_DIR, then served from there with
+# IMAGE_SERVE_MAX_AGE seconds of browser and CDN caching.
+IMAGE_SERVE_CACHE_DIR = os.getenv(
+    "IMAGE_SERVE_CACHE_DIR", os.path.join(BASE_DIR, "cache", "images")
+)
+IMAGE_SERVE_MAX_AGE = 60 * 60 * 24
+
 # Allowed file extensions for documents in the document library.
 # This can be omitted to allow all files, but note that this may present a security risk
 # if untrusted users are allowed to upload files -
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class SitemapConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "app.sitemap"
+
+    def ready(self):
+        from app.sitemap.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
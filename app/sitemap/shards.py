@@ -0,0 +1,132 @@
+"""
+A sitemap index split into shards, for sites with too many pages to list in
+one sitemap.
+
+Pages are put in shards by id, ``(id - 1) // SITEMAP_SHARD_SIZE``, so a page
+stays in the same shard when other pages are added or removed, and publishing
+a page only changes its own shard. Each shard is streamed from the database
+the first time it's requested, loading only the columns needed for its URLs,
+and cached gzip compressed as it's sent.
+
+Each cached shard is stored under a generation number which is replaced when
+the shard changes. A shard that was being generated while one of its pages was
+published is saved under the old generation, so it's never served.
+"""
+
+import time
+import zlib
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.db.models.functions import Coalesce
+from wagtail.models import Site
+
+# Pages fetched from the database at a time
+CHUNK_SIZE = 2000
+INDEX = "index"
+
+
+def get_shard(page_id):
+    return (page_id - 1) // settings.SITEMAP_SHARD_SIZE
+
+
+def get_pages(site):
+    return site.root_page.get_descendants(inclusive=True).live().public()
+
+
+def get_generation_key(site_id, name):
+    return f"sitemap:{site_id}:{name}:generation"
+
+
+def get_cache_key(site_id, name):
+    """Return the key for the current generation of a shard or the index."""
+    generation_key = get_generation_key(site_id, name)
+    # A missing generation, such as after the cache is cleared, starts a new one
+    cache.add(generation_key, time.time_ns(), None)
+    return f"sitemap:{site_id}:{name}:{cache.get(generation_key)}"
+
+
+def invalidate(page_ids):
+    """Start a new generation of the shards holding these pages, and the index."""
+    names = {get_shard(page_id) for page_id in page_ids} | {INDEX}
+    generation = time.time_ns()
+    cache.set_many(
+        {
+            get_generation_key(site_id, name): generation
+            for site_id in Site.objects.values_list("pk", flat=True)
+            for name in names
+        },
+        None,
+    )
+
+
+def get_index(site):
+    """Return the number and last modified date of every non-empty shard."""
+    key = get_cache_key(site.pk, INDEX)
+    shards = cache.get(key)
+    if shards is None:
+        pages = get_pages(site)
+        last_id = pages.aggregate(last_id=Max("id"))["last_id"] or 0
+        shards = []
+        for shard in range(get_shard(last_id) + 1 if last_id else 0):
+            start = shard * settings.SITEMAP_SHARD_SIZE + 1
+            stats = pages.filter(
+                id__range=(start, start + settings.SITEMAP_SHARD_SIZE - 1)
+            ).aggregate(
+                count=Count("id"),
+                lastmod=Max(
+                    Coalesce("last_published_at", "latest_revision_created_at")
+                ),
+            )
+            if stats["count"]:
+                shards.append((shard, stats["lastmod"]))
+        cache.set(key, shards, settings.SITEMAP_CACHE_TIMEOUT)
+    return shards
+
+
+def format_lastmod(lastmod):
+    return f"<lastmod>{lastmod.date().isoformat()}</lastmod>" if lastmod else ""
+
+
+def generate_shard(request, site, shard):
+    """Yield the XML of a shard, a few thousand URLs at a time."""
+    start = shard * settings.SITEMAP_SHARD_SIZE + 1
+    pages = (
+        get_pages(site)
+        .filter(id__range=(start, start + settings.SITEMAP_SHARD_SIZE - 1))
+        # Everything Page.get_full_url() and the lastmod date need
+        .only("id", "url_path", "last_published_at", "latest_revision_created_at")
+        .order_by("id")
+    )
+
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    )
+    urls = []
+    for page in pages.iterator(chunk_size=CHUNK_SIZE):
+        location = page.get_full_url(request)
+        if location is None:
+            continue
+        lastmod = page.last_published_at or page.latest_revision_created_at
+        urls.append(
+            f"<url><loc>{escape(location)}</loc>{format_lastmod(lastmod)}</url>\n"
+        )
+        if len(urls) >= CHUNK_SIZE:
+            yield "".join(urls)
+            urls = []
+    yield "".join(urls) + "</urlset>\n"
+
+
+def cache_as_sent(chunks, key):
+    """Pass on the encoded chunks, caching them gzip compressed at the end."""
+    compressor = zlib.compressobj(wbits=31)
+    compressed = []
+    for chunk in chunks:
+        data = chunk.encode()
+        compressed.append(compressor.compress(data))
+        yield data
+    compressed.append(compressor.flush())
+    cache.set(key, b"".join(compressed), settings.SITEMAP_CACHE_TIMEOUT)
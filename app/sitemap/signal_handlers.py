@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+from wagtail.models import Page
+from wagtail.signals import (
+    page_published,
+    page_slug_changed,
+    page_unpublished,
+    post_page_move,
+)
+
+from app.sitemap.shards import invalidate
+
+
+def invalidate_page(instance, **kwargs):
+    # Wait for the commit, otherwise the shard could be generated again from
+    # the database before the change is visible
+    transaction.on_commit(lambda: invalidate([instance.pk]))
+
+
+def invalidate_deleted_page(instance, **kwargs):
+    # Sent for every model, and for each specific page type
+    if isinstance(instance, Page):
+        invalidate_page(instance)
+
+
+def invalidate_descendants(instance):
+    page_ids = list(
+        Page.objects.descendant_of(instance, inclusive=True).values_list(
+            "id", flat=True
+        )
+    )
+    transaction.on_commit(lambda: invalidate(page_ids))
+
+
+def invalidate_moved_pages(instance, url_path_before, url_path_after, **kwargs):
+    # A move changes the URL of the page and every page below it
+    if url_path_before != url_path_after:
+        invalidate_descendants(instance)
+
+
+def invalidate_renamed_pages(instance, **kwargs):
+    # So does a new slug, and the pages below it may be in other shards
+    invalidate_descendants(instance)
+
+
+def register_signal_handlers():
+    page_published.connect(invalidate_page)
+    page_unpublished.connect(invalidate_page)
+    post_page_move.connect(invalidate_moved_pages)
+    page_slug_changed.connect(invalidate_renamed_pages)
+    post_delete.connect(invalidate_deleted_page)
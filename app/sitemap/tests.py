@@ -0,0 +1,104 @@
+import gzip
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from app.home.models import HomePage
+from app.sitemap.shards import get_cache_key, get_shard
+
+
+@override_settings(SITEMAP_SHARD_SIZE=2)
+class SitemapTestCase(TestCase):
+    """Tests for the sharded sitemap."""
+
+    def setUp(self):
+        """Create a few pages, two to a shard."""
+        cache.clear()
+        self.home_page = HomePage.objects.first()
+        self.pages = [
+            self.home_page.add_child(
+                instance=HomePage(title=f"Page {i}", slug=f"page-{i}")
+            )
+            for i in range(3)
+        ]
+
+    def get_shard_content(self, page):
+        response = self.client.get(f"/sitemap-{get_shard(page.pk)}.xml")
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return b"".join(response.streaming_content).decode()
+        return response.content.decode()
+
+    def test_index(self):
+        """Test that the index lists each shard with pages in it."""
+        response = self.client.get("/sitemap.xml")
+
+        self.assertEqual(response["Content-Type"], "application/xml")
+        shards = {get_shard(page.pk) for page in [self.home_page, *self.pages]}
+        for shard in shards:
+            self.assertContains(response, f"/sitemap-{shard}.xml</loc>")
+        self.assertContains(response, "<sitemap>", count=len(shards))
+        self.assertEqual(self.client.get("/sitemap-99.xml").status_code, 404)
+
+    def test_shard_is_streamed_then_cached(self):
+        """Test that a shard is streamed on the first request, then cached."""
+        page = self.pages[-1]
+        url = f"/sitemap-{get_shard(page.pk)}.xml"
+
+        first = self.client.get(url)
+        self.assertTrue(first.streaming)
+        content = b"".join(first.streaming_content)
+        self.assertIn(f"<loc>{page.full_url}</loc>".encode(), content)
+
+        with self.assertNumQueries(1):
+            # Only finding the site
+            second = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(second["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(second.content), content)
+        self.assertEqual(self.client.get(url).content, content)
+
+    def test_publishing_regenerates_shard(self):
+        """Test that publishing a page only regenerates its own shard."""
+        page = self.pages[0]
+        other = next(p for p in self.pages if get_shard(p.pk) != get_shard(page.pk))
+        self.get_shard_content(page)
+        self.get_shard_content(other)
+        other_key = get_cache_key(self.home_page.get_site().pk, get_shard(other.pk))
+
+        page.title = "Renamed"
+        page.slug = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            page.save_revision().publish()
+
+        self.assertIn("/renamed/", self.get_shard_content(page))
+        self.assertEqual(
+            get_cache_key(self.home_page.get_site().pk, get_shard(other.pk)), other_key
+        )
+
+    def test_renaming_regenerates_descendant_shards(self):
+        """Test that a new slug regenerates the shards of the pages below it."""
+        parent = self.pages[0]
+        child = parent.add_child(instance=HomePage(title="Child", slug="child"))
+        while get_shard(child.pk) == get_shard(parent.pk):
+            child = parent.add_child(
+                instance=HomePage(title="Child", slug=f"child-{child.pk}")
+            )
+        self.assertIn("/page-0/", self.get_shard_content(child))
+
+        parent.slug = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            parent.save_revision().publish()
+
+        content = self.get_shard_content(child)
+        self.assertIn(f"/renamed/{child.slug}/", content)
+        self.assertNotIn("/page-0/", content)
+
+    def test_unpublished_pages_are_left_out(self):
+        """Test that unpublishing a page removes it from its shard."""
+        page = self.pages[0]
+        self.assertIn(page.full_url, self.get_shard_content(page))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            page.unpublish()
+
+        self.assertNotIn(page.full_url, self.get_shard_content(page))
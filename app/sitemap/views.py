@@ -0,0 +1,59 @@
+import gzip
+from xml.sax.saxutils import escape
+
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from wagtail.models import Site
+
+from app.sitemap import shards
+
+CONTENT_TYPE = "application/xml"
+
+
+def get_site(request):
+    site = Site.find_for_request(request)
+    if site is None:
+        raise Http404
+    return site
+
+
+def index(request):
+    """List the site's sitemap shards."""
+    site = get_site(request)
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n',
+    ]
+    for shard, lastmod in shards.get_index(site):
+        location = request.build_absolute_uri(reverse("sitemap_shard", args=[shard]))
+        lines.append(
+            f"<sitemap><loc>{escape(location)}</loc>"
+            f"{shards.format_lastmod(lastmod)}</sitemap>\n"
+        )
+    lines.append("</sitemapindex>\n")
+    return HttpResponse("".join(lines), content_type=CONTENT_TYPE)
+
+
+def shard(request, shard):
+    """Serve one shard from the cache, or stream it while caching it."""
+    site = get_site(request)
+    key = shards.get_cache_key(site.pk, shard)
+    content = cache.get(key)
+
+    if content is None:
+        if shard not in dict(shards.get_index(site)):
+            raise Http404
+        return StreamingHttpResponse(
+            shards.cache_as_sent(shards.generate_shard(request, site, shard), key),
+            content_type=CONTENT_TYPE,
+        )
+
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = HttpResponse(content, content_type=CONTENT_TYPE)
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(gzip.decompress(content), content_type=CONTENT_TYPE)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
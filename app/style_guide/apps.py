@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class StyleGuideConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app.style_guide"
+
+    def ready(self):
+        from app.style_guide.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
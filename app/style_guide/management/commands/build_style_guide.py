@@ -0,0 +1,18 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.style_guide.prerender import build
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the style guide pages to static HTML files, which are served "
+        "instead of rendering the templates on each request"
+    )
+
+    def handle(self, *args, **options):
+        for path in build():
+            self.stdout.write(f"Wrote {os.path.relpath(path, settings.BASE_DIR)}")
+        self.stdout.write(self.style.SUCCESS("Style guide built"))
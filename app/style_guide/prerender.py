@@ -0,0 +1,101 @@
+"""
+Pre-rendered copies of the style guide pages.
+
+The style guide only changes when its templates or the compiled static files
+change, so ``manage.py build_style_guide`` renders each page to an HTML file
+once and the views serve that file. The pages leave out anything which depends
+on the site, its pages or the visitor, such as the site navigation, so the
+templates and static files are all they're built from.
+
+A file older than any of the templates or the static files manifest is out of
+date, and the page is rendered on each request as before until it is built
+again. This is checked once per process, and again when runserver sees a
+template change.
+"""
+
+import glob
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.template.loader import get_template, render_to_string
+from django.test import RequestFactory
+
+# Template name to the URL path it's served at
+PAGES = {
+    "style_guide/style_guide.html": "/style-guide/",
+}
+
+
+def get_output_dir():
+    return getattr(
+        settings,
+        "STYLE_GUIDE_PRERENDERED_DIR",
+        os.path.join(settings.BASE_DIR, "static_prerendered"),
+    )
+
+
+def get_output_path(template_name):
+    return os.path.join(get_output_dir(), template_name)
+
+
+def get_source_paths():
+    """Return the files the pre-rendered pages are built from."""
+    templates_dir = os.path.join(os.path.dirname(__file__), "templates")
+    paths = glob.glob(os.path.join(templates_dir, "**", "*.html"), recursive=True)
+    paths.append(get_template("base.html").origin.name)
+    # Static URLs change when collectstatic writes a new manifest
+    paths.append(os.path.join(settings.STATIC_ROOT, "staticfiles.json"))
+    return paths
+
+
+def is_up_to_date(path):
+    try:
+        built = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return False
+
+    for source in get_source_paths():
+        try:
+            if os.stat(source).st_mtime > built:
+                return False
+        except FileNotFoundError:
+            continue
+    return True
+
+
+# Template name to the path of its pre-rendered page, or None if it's out of
+# date
+_checked = {}
+
+
+def get_prerendered_path(template_name):
+    """Return the path of an up to date pre-rendered page, or None."""
+    if template_name not in _checked:
+        path = get_output_path(template_name)
+        _checked[template_name] = path if is_up_to_date(path) else None
+    return _checked[template_name]
+
+
+def clear_checked():
+    _checked.clear()
+
+
+def build():
+    """Render every style guide page to a file and return their paths."""
+    paths = []
+    for template_name, url in PAGES.items():
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        html = render_to_string(template_name, request=request)
+
+        path = get_output_path(template_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Replace the file in one step, so it's never served half written
+        partial_path = f"{path}.tmp"
+        with open(partial_path, "w", encoding="utf-8") as fh:
+            fh.write(html)
+        os.replace(partial_path, path)
+        paths.append(path)
+    clear_checked()
+    return paths
@@ -0,0 +1,14 @@
+from django.utils.autoreload import file_changed
+
+from app.style_guide.prerender import clear_checked
+
+
+def check_prerendered_pages(file_path, **kwargs):
+    # runserver reloads changed templates without restarting, so check the
+    # pre-rendered pages are still up to date on the next request
+    if file_path.suffix == ".html":
+        clear_checked()
+
+
+def register_signal_handlers():
+    file_changed.connect(check_prerendered_pages)
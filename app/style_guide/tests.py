@@ -1,12 +1,59 @@
+import os
+from pathlib import Path
+from unittest import mock
+
 from django.test import TestCase
+from django.utils.autoreload import file_changed
+
+from app.style_guide.prerender import build, clear_checked
+from app.tests_utils import TemporaryDirectoryMixin
 
 
-class StyleGuideTestCase(TestCase):
+class StyleGuideTestCase(TemporaryDirectoryMixin, TestCase):
     """Tests for the style_guide app frontend."""
 
+    def setUp(self):
+        """Write pre-rendered pages to a temporary directory."""
+        self.output_dir = self.temporary_directory("STYLE_GUIDE_PRERENDERED_DIR")
+        clear_checked()
+        self.addCleanup(clear_checked)
+
     def test_style_guide_frontend_returns_200(self):
         """Test that the style guide page returns 200 OK."""
         response = self.client.get("/style-guide/")
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "Style Guide")
         self.assertTemplateUsed(response, "style_guide/style_guide.html")
+
+    def test_prerendered_style_guide_is_served(self):
+        """Test that a pre-rendered page is served from disk with validators."""
+        build()
+        response = self.client.get("/style-guide/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateNotUsed(response, "style_guide/style_guide.html")
+        self.assertIn("Style Guide", b"".join(response.streaming_content).decode())
+
+        response = self.client.get(
+            "/style-guide/", headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_outdated_prerendered_page_is_rendered(self):
+        """Test that a page older than its templates is rendered instead."""
+        (path,) = [path for path in build() if path.endswith("style_guide.html")]
+        os.utime(path, (0, 0))
+        response = self.client.get("/style-guide/")
+        self.assertTemplateUsed(response, "style_guide/style_guide.html")
+
+    def test_freshness_is_checked_once(self):
+        """Test that the templates are only checked again after one changes."""
+        build()
+        self.client.get("/style-guide/")
+        with mock.patch("app.style_guide.prerender.get_source_paths") as sources:
+            self.client.get("/style-guide/")
+            sources.assert_not_called()
+
+            sources.return_value = []
+            file_changed.send(sender=None, file_path=Path("style_guide.html"))
+            self.client.get("/style-guide/")
+            sources.assert_called_once()
@@ -1,5 +1,36 @@
+import os
+
+from django.http import FileResponse
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from app.style_guide.prerender import get_prerendered_path
+
+
+def serve_page(request, template_name):
+    """
+    Serve the pre-rendered copy of a page if it's up to date, with ETag and
+    Last-Modified validators, otherwise render the template.
+    """
+    path = get_prerendered_path(template_name)
+    if path is None:
+        return render(request, template_name)
+
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = http_date(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = FileResponse(
+            open(path, "rb"), content_type="text/html; charset=utf-8"
+        )
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    return response
 
 
 def style_guide_view(request):
-    return render(request, "style_guide/style_guide.html")
+    return serve_page(request, "style_guide/style_guide.html")
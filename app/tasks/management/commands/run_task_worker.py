@@ -0,0 +1,187 @@
+import multiprocessing
+import queue
+import signal
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django_tasks import (
+    DEFAULT_TASK_BACKEND_ALIAS,
+    DEFAULT_TASK_QUEUE_NAME,
+    task_backends,
+)
+from django_tasks.backends.database import DatabaseBackend
+from django_tasks.exceptions import InvalidTaskBackendError
+
+from app.tasks.worker import Stats, Worker, get_worker_id, requeue_abandoned
+
+
+def run_worker_process(worker_options, results):
+    """Run a worker in a child process, sending each task's outcome back."""
+    django.setup()
+    worker = Worker(
+        **worker_options,
+        worker_id=get_worker_id(),
+        report=lambda outcome, duration: results.put((outcome, duration)),
+    )
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs tasks from the database task backend in one or more worker "
+        "processes, retrying failed tasks and reporting throughput"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=2,
+            help="Number of tasks to run at once, each in its own process (default: 2)",
+        )
+        parser.add_argument(
+            "--queue-name",
+            default=DEFAULT_TASK_QUEUE_NAME,
+            help="Comma separated queues to run tasks from, or * for all "
+            f"(default: {DEFAULT_TASK_QUEUE_NAME})",
+        )
+        parser.add_argument(
+            "--backend",
+            default=DEFAULT_TASK_BACKEND_ALIAS,
+            help=f"Task backend to run tasks for (default: {DEFAULT_TASK_BACKEND_ALIAS})",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=3,
+            help="Times to run a failing task before marking it failed (default: 3)",
+        )
+        parser.add_argument(
+            "--retry-delay",
+            type=float,
+            default=10,
+            help="Seconds before the first retry, doubled for each later one (default: 10)",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1,
+            help="Seconds to wait before checking for tasks again when there "
+            "are none (default: 1)",
+        )
+        parser.add_argument(
+            "--max-tasks",
+            type=int,
+            default=None,
+            help="Restart each worker process after this many tasks (default: never)",
+        )
+        parser.add_argument(
+            "--batch",
+            action="store_true",
+            help="Exit once there are no ready tasks left",
+        )
+        parser.add_argument(
+            "--stats-interval",
+            type=float,
+            default=60,
+            help="Seconds between throughput reports (default: 60)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            backend = task_backends[options["backend"]]
+        except InvalidTaskBackendError as e:
+            raise CommandError(str(e))
+        if not isinstance(backend, DatabaseBackend):
+            raise CommandError(
+                f"The {options['backend']!r} task backend doesn't store tasks in "
+                "the database. Set DJANGO_TASK_BACKEND=database."
+            )
+        if options["processes"] < 1:
+            raise CommandError("--processes must be at least 1")
+
+        self.options = options
+        self.worker_options = {
+            "backend_name": options["backend"],
+            "queue_names": options["queue_name"].split(","),
+            "max_attempts": options["max_attempts"],
+            "retry_delay": options["retry_delay"],
+            "interval": options["interval"],
+            "batch": options["batch"],
+            "max_tasks": options["max_tasks"],
+        }
+        self.stats = Stats()
+        self.last_report = time.monotonic()
+
+        if options["processes"] == 1:
+            # Run in this process, which is simpler to debug
+            worker = Worker(**self.worker_options, report=self.add_result)
+            signal.signal(signal.SIGTERM, worker.stop)
+            signal.signal(signal.SIGINT, worker.stop)
+            worker.run()
+        else:
+            self.run_processes()
+
+        self.stdout.write(self.style.SUCCESS(self.stats.summary()))
+
+    def add_result(self, outcome, duration):
+        self.stats.add(outcome, duration)
+        if time.monotonic() - self.last_report >= self.options["stats_interval"]:
+            self.stdout.write(self.stats.summary())
+            self.last_report = time.monotonic()
+
+    def run_processes(self):
+        results = multiprocessing.Queue()
+        processes = set()
+        stopping = False
+
+        def stop(*args):
+            nonlocal stopping
+            stopping = True
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        # Forked processes mustn't share the parent's database connections
+        connections.close_all()
+        for _ in range(self.options["processes"]):
+            self.start_process(processes, results)
+
+        while processes:
+            try:
+                self.add_result(*results.get(timeout=1))
+            except queue.Empty:
+                pass
+
+            for process in [p for p in processes if not p.is_alive()]:
+                processes.remove(process)
+                if process.exitcode:
+                    # Killed part way through a task, which can run again
+                    requeued = requeue_abandoned(get_worker_id(process.pid))
+                    self.stderr.write(
+                        f"Worker process {process.pid} exited with code "
+                        f"{process.exitcode}, requeued {requeued} tasks"
+                    )
+                if not stopping and not self.options["batch"]:
+                    self.start_process(processes, results)
+
+        # Collect results sent just before the processes exited
+        while True:
+            try:
+                self.add_result(*results.get(timeout=0.1))
+            except queue.Empty:
+                break
+
+    def start_process(self, processes, results):
+        process = multiprocessing.Process(
+            target=run_worker_process, args=(self.worker_options, results)
+        )
+        process.start()
+        processes.add(process)
@@ -0,0 +1,117 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django_tasks import task
+from django_tasks.backends.database.models import DBTaskResult
+from django_tasks.base import TaskResultStatus
+
+from app.tasks.worker import FAILED, RETRIED, SUCCEEDED, Worker, requeue_abandoned
+
+DATABASE_TASKS = {
+    "default": {
+        "BACKEND": "django_tasks.backends.database.DatabaseBackend",
+        "ENQUEUE_ON_COMMIT": False,
+    }
+}
+
+
+@task()
+def add(a, b):
+    return a + b
+
+
+@task(takes_context=True)
+def fail_first_attempt(context):
+    if context.attempt < 2:
+        raise ValueError("First attempt")
+    return context.attempt
+
+
+@task()
+def always_fail():
+    raise ValueError("Always")
+
+
+@override_settings(TASKS=DATABASE_TASKS)
+class WorkerTestCase(TestCase):
+    """Tests for the database task worker."""
+
+    def run_worker(self, **kwargs):
+        """Run a worker until there are no ready tasks, returning its outcomes."""
+        outcomes = []
+        worker = Worker(
+            backend_name="default",
+            queue_names=["default"],
+            retry_delay=0,
+            batch=True,
+            report=lambda outcome, duration: outcomes.append(outcome),
+            **kwargs,
+        )
+        worker.run()
+        return outcomes
+
+    def test_runs_tasks(self):
+        """Test that ready tasks are run and their return values saved."""
+        results = [add.enqueue(i, 1) for i in range(3)]
+
+        self.assertEqual(self.run_worker(), [SUCCEEDED] * 3)
+        for i, result in enumerate(results):
+            result.refresh()
+            self.assertEqual(result.status, TaskResultStatus.SUCCEEDED)
+            self.assertEqual(result.return_value, i + 1)
+
+    def test_retries_failed_tasks(self):
+        """Test that failed tasks are retried until they run out of attempts."""
+        flaky = fail_first_attempt.enqueue()
+        broken = always_fail.enqueue()
+
+        with self.assertLogs("app.tasks.worker", "WARNING") as logs:
+            with self.assertLogs("django_tasks", "ERROR"):
+                outcomes = self.run_worker(max_attempts=3)
+
+        self.assertEqual(outcomes.count(RETRIED), 3)
+        self.assertEqual(outcomes.count(FAILED), 1)
+        self.assertEqual(len(logs.records), 3)
+        flaky.refresh()
+        self.assertEqual(flaky.status, TaskResultStatus.SUCCEEDED)
+        self.assertEqual(flaky.return_value, 2)
+        broken.refresh()
+        self.assertEqual(broken.status, TaskResultStatus.FAILED)
+        self.assertEqual(broken.attempts, 3)
+
+    def test_claim(self):
+        """Test that a task is only claimed by one worker."""
+        add.enqueue(1, 1)
+        first = Worker(backend_name="default", queue_names=["default"])
+        second = Worker(backend_name="default", queue_names=["default"])
+
+        claimed = first.claim()
+        self.assertEqual(claimed.status, TaskResultStatus.RUNNING)
+        self.assertEqual(claimed.worker_ids, [first.worker_id])
+        self.assertIsNone(second.claim())
+
+    def test_requeue_abandoned(self):
+        """Test that tasks left running by a worker are made ready again."""
+        add.enqueue(1, 1)
+        worker = Worker(backend_name="default", queue_names=["default"])
+        worker.claim()
+
+        self.assertEqual(requeue_abandoned("another-worker"), 0)
+        self.assertEqual(requeue_abandoned(worker.worker_id), 1)
+        self.assertEqual(DBTaskResult.objects.ready().count(), 1)
+
+    def test_command(self):
+        """Test that the command runs tasks and reports throughput."""
+        add.enqueue(1, 1)
+        stdout = StringIO()
+        call_command("run_task_worker", processes=1, batch=True, stdout=stdout)
+
+        self.assertIn("1 tasks: 1 succeeded, 0 retried, 0 failed", stdout.getvalue())
+        self.assertFalse(DBTaskResult.objects.ready().exists())
+
+    @override_settings(TASKS={})
+    def test_command_needs_database_backend(self):
+        """Test that the command refuses to run for other task backends."""
+        with self.assertRaises(CommandError):
+            call_command("run_task_worker", processes=1, batch=True)
@@ -0,0 +1,236 @@
+"""
+A worker for tasks stored by the django_tasks database backend.
+
+Wagtail and the project enqueue tasks with django_tasks. With the database
+backend each task is a row in the django_tasks_database_dbtaskresult table,
+which workers claim and run one at a time.
+
+On databases which support it (PostgreSQL, MySQL 8, MariaDB 10.6) the next task
+is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so workers never wait for
+each other's locks. Elsewhere (SQLite) a worker takes the next ready task with
+an ``UPDATE ... WHERE status = 'READY'``, and moves on to the following one if
+another worker updated it first.
+
+A task which raises is retried after a delay which doubles with each attempt,
+until it has been attempted ``max_attempts`` times.
+"""
+
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import close_old_connections, connections, transaction
+from django.db.utils import OperationalError
+from django.utils import timezone
+from django_tasks.backends.database.models import DBTaskResult
+from django_tasks.base import TaskContext, TaskResultStatus
+from django_tasks.signals import task_finished, task_started
+from django_tasks.utils import get_exception_traceback, get_module_path
+
+logger = logging.getLogger(__name__)
+
+SUCCEEDED = "succeeded"
+RETRIED = "retried"
+FAILED = "failed"
+
+# Number of ready tasks to try to claim before checking for new ones, when
+# claiming without SKIP LOCKED
+CLAIM_CANDIDATES = 10
+
+
+def get_worker_id(pid=None):
+    """Return the worker id for a process on this host, at most 64 characters."""
+    return f"{socket.gethostname()[:50]}-{pid or os.getpid()}"
+
+
+class Worker:
+    def __init__(
+        self,
+        *,
+        backend_name,
+        queue_names,
+        max_attempts=3,
+        retry_delay=10,
+        interval=1,
+        batch=False,
+        max_tasks=None,
+        worker_id=None,
+        report=None,
+    ):
+        self.backend_name = backend_name
+        self.queue_names = queue_names
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.interval = interval
+        self.batch = batch
+        self.max_tasks = max_tasks
+        self.worker_id = worker_id or get_worker_id()
+        # Called with the outcome and duration of each task
+        self.report = report
+        self.running = True
+        self.tasks_run = 0
+
+    def stop(self, *args):
+        """Finish the current task, then stop."""
+        self.running = False
+
+    def get_ready_tasks(self):
+        tasks = DBTaskResult.objects.ready().filter(backend_name=self.backend_name)
+        if "*" not in self.queue_names:
+            tasks = tasks.filter(queue_name__in=self.queue_names)
+        return tasks
+
+    def claim(self):
+        """Mark the next ready task as running and return it, or None."""
+        tasks = self.get_ready_tasks()
+        try:
+            if connections[tasks.db].features.has_select_for_update_skip_locked:
+                with transaction.atomic(using=tasks.db):
+                    db_result = tasks.select_for_update(skip_locked=True).first()
+                    if db_result is not None:
+                        db_result.claim(self.worker_id)
+                    return db_result
+
+            for pk in tasks.values_list("pk", flat=True)[:CLAIM_CANDIDATES]:
+                # Only one worker's update matches while the task is ready
+                claimed = DBTaskResult.objects.filter(
+                    pk=pk, status=TaskResultStatus.READY
+                ).update(status=TaskResultStatus.RUNNING, started_at=timezone.now())
+                if claimed:
+                    db_result = DBTaskResult.objects.get(pk=pk)
+                    db_result.worker_ids = [*db_result.worker_ids, self.worker_id]
+                    db_result.save(update_fields=["worker_ids"])
+                    return db_result
+        except OperationalError as e:
+            # SQLite allows one writer at a time, try again on the next poll
+            if "is locked" not in str(e):
+                raise
+        return None
+
+    def run_task(self, db_result):
+        """Run a claimed task and return its outcome."""
+        try:
+            task = db_result.task
+            task_result = db_result.task_result
+            sender = type(task.get_backend())
+            task_started.send(sender=sender, task_result=task_result)
+            if task.takes_context:
+                return_value = task.call(
+                    TaskContext(task_result=task_result),
+                    *task_result.args,
+                    **task_result.kwargs,
+                )
+            else:
+                return_value = task.call(*task_result.args, **task_result.kwargs)
+            # Inside the try, so a return value which can't be saved fails the task
+            db_result.set_succeeded(return_value)
+        except Exception as e:
+            # Each attempt adds the worker's id to worker_ids
+            attempts = len(db_result.worker_ids)
+            if attempts < self.max_attempts:
+                self.retry(db_result, e, attempts)
+                return RETRIED
+            db_result.set_failed(e)
+            outcome = FAILED
+        else:
+            outcome = SUCCEEDED
+
+        try:
+            task_finished.send(
+                sender=type(db_result.task.get_backend()),
+                task_result=db_result.task_result,
+            )
+        except (ImportError, SuspiciousOperation):
+            # The task's function no longer exists
+            logger.exception("Task id=%s failed", db_result.id)
+        return outcome
+
+    def retry(self, db_result, exc, attempts):
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        logger.warning(
+            "Task id=%s path=%s attempt %d failed, retrying in %ss",
+            db_result.id,
+            db_result.task_path,
+            attempts,
+            delay,
+        )
+        db_result.status = TaskResultStatus.READY
+        db_result.run_after = timezone.now() + timedelta(seconds=delay)
+        # Keep the last error for the admin, cleared if a later attempt succeeds
+        db_result.exception_class_path = get_module_path(type(exc))
+        db_result.traceback = get_exception_traceback(exc)
+        db_result.save(
+            update_fields=["status", "run_after", "exception_class_path", "traceback"]
+        )
+
+    def run(self):
+        logger.info(
+            "Starting task worker id=%s queues=%s",
+            self.worker_id,
+            ",".join(self.queue_names),
+        )
+        while self.running:
+            db_result = self.claim()
+            if db_result is None:
+                if self.batch:
+                    return
+                close_old_connections()
+                time.sleep(self.interval)
+                continue
+
+            start = time.perf_counter()
+            outcome = self.run_task(db_result)
+            if self.report:
+                self.report(outcome, time.perf_counter() - start)
+
+            self.tasks_run += 1
+            if self.max_tasks and self.tasks_run >= self.max_tasks:
+                return
+            # As Django does after each request
+            close_old_connections()
+
+
+def requeue_abandoned(worker_id):
+    """
+    Make the tasks a worker was running when it died ready to run again, and
+    return how many there were.
+    """
+    requeued = 0
+    # Few tasks are running at once, so check them in Python rather than with
+    # a JSON lookup SQLite doesn't support
+    for db_result in DBTaskResult.objects.running():
+        if db_result.worker_ids[-1:] == [worker_id]:
+            db_result.status = TaskResultStatus.READY
+            db_result.save(update_fields=["status"])
+            requeued += 1
+    return requeued
+
+
+class Stats:
+    """Counts task outcomes for the worker's throughput reports."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.counts = {SUCCEEDED: 0, RETRIED: 0, FAILED: 0}
+        self.duration = 0
+
+    def add(self, outcome, duration):
+        self.counts[outcome] += 1
+        self.duration += duration
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def summary(self):
+        elapsed = time.monotonic() - self.start
+        rate = self.total / elapsed if elapsed else 0
+        mean = self.duration / self.total * 1000 if self.total else 0
+        return (
+            f"{self.total} tasks: {self.counts[SUCCEEDED]} succeeded, "
+            f"{self.counts[RETRIED]} retried, {self.counts[FAILED]} failed. "
+            f"{rate:.1f} tasks/s, {mean:.0f}ms mean"
+        )
@@ -0,0 +1,223 @@
+"""
+A test runner which restores the test database from a cached snapshot.
+
+Creating the test database normally applies every migration, which takes most
+of the time of a short test run. With the TEST_DB_SNAPSHOT setting enabled, the
+first run saves the migrated database as a snapshot and later runs restore it
+instead of migrating. Snapshots are keyed on a hash of every installed app's
+migration files, so adding or changing a migration builds a new one.
+
+SQLite snapshots are database files in TEST_DB_SNAPSHOT_DIR. PostgreSQL
+snapshots are template databases on the database server, named after the test
+database. Parallel test workers are cloned from the restored database as usual.
+Other database backends migrate as normal.
+"""
+
+import glob
+import hashlib
+import os
+import sqlite3
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.test.runner import DiscoverRunner
+
+
+def migrations_hash():
+    """Return a hash of the migration files of every installed app."""
+    digest = hashlib.sha256()
+    for app_config in apps.get_app_configs():
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        if module_name is None:
+            continue
+        try:
+            module = import_module(module_name)
+        except ImportError:
+            continue
+        directory = os.path.dirname(module.__file__)
+        for path in sorted(glob.glob(os.path.join(directory, "*.py"))):
+            digest.update(f"{app_config.label}/{os.path.basename(path)}".encode())
+            with open(path, "rb") as fh:
+                digest.update(fh.read())
+    return digest.hexdigest()
+
+
+class SnapshotTestRunner(DiscoverRunner):
+    def build_suite(self, test_labels=None, **kwargs):
+        # Apps left out with DJANGO_DISABLED_APPS have no tables, so by default
+        # only run the tests of the project apps which are installed
+        if not test_labels:
+            test_labels = [
+                app_config.name
+                for app_config in apps.get_app_configs()
+                if app_config.name.startswith("app.")
+            ]
+        return super().build_suite(test_labels, **kwargs)
+
+    def setup_databases(self, **kwargs):
+        if not getattr(settings, "TEST_DB_SNAPSHOT", False) or self.keepdb:
+            return super().setup_databases(**kwargs)
+
+        key = migrations_hash()[:12]
+        snapshots = {}
+        for alias in connections:
+            connection = connections[alias]
+            snapshot_class = SNAPSHOT_CLASSES.get(connection.vendor)
+            if snapshot_class:
+                snapshots[alias] = snapshot_class(connection, key)
+                # Django's setup_databases() calls create_test_db() for each
+                # database, so shadow it for the duration of the setup
+                connection.creation.create_test_db = snapshots[alias].create_test_db
+        try:
+            return super().setup_databases(**kwargs)
+        finally:
+            for alias in snapshots:
+                del connections[alias].creation.create_test_db
+
+
+class Snapshot:
+    def __init__(self, connection, key):
+        self.connection = connection
+        self.creation = connection.creation
+        self.key = key
+
+    def create_test_db(self, verbosity=1, autoclobber=False, serialize=True, **kwargs):
+        test_database_name = self.creation._get_test_db_name()
+        if not self.exists():
+            if verbosity >= 1:
+                self.creation.log(
+                    f"Test database snapshot {self.key} not found, migrating..."
+                )
+            type(self.creation).create_test_db(
+                self.creation, verbosity, autoclobber, serialize
+            )
+            self.save()
+            self.prune()
+            return test_database_name
+
+        if verbosity >= 1:
+            self.creation.log(
+                f"Restoring test database for alias '{self.connection.alias}' "
+                f"from snapshot {self.key}..."
+            )
+        self.restore(autoclobber)
+
+        self.connection.close()
+        settings.DATABASES[self.connection.alias]["NAME"] = test_database_name
+        self.connection.settings_dict["NAME"] = test_database_name
+        self.connection.ensure_connection()
+        self.after_restore()
+
+        if serialize:
+            self.connection._test_serialized_contents = (
+                self.creation.serialize_db_to_string()
+            )
+        return test_database_name
+
+    def after_restore(self):
+        pass
+
+
+class SQLiteSnapshot(Snapshot):
+    def __init__(self, connection, key):
+        super().__init__(connection, key)
+        self.directory = settings.TEST_DB_SNAPSHOT_DIR
+        self.path = os.path.join(self.directory, f"{connection.alias}-{key}.sqlite3")
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first, so an interrupted run never leaves
+        # a half written snapshot behind
+        partial_path = f"{self.path}.{os.getpid()}.tmp"
+        target = sqlite3.connect(partial_path)
+        try:
+            self.connection.ensure_connection()
+            self.connection.connection.backup(target)
+        finally:
+            target.close()
+        os.replace(partial_path, self.path)
+
+    def restore(self, autoclobber):
+        # Deletes an old test database file, or does nothing for in-memory
+        self.creation._create_test_db(0, autoclobber)
+
+    def after_restore(self):
+        source = sqlite3.connect(self.path)
+        try:
+            source.backup(self.connection.connection)
+        finally:
+            source.close()
+
+    def prune(self):
+        pattern = os.path.join(self.directory, f"{self.connection.alias}-*.sqlite3")
+        for path in glob.glob(pattern):
+            if path != self.path:
+                os.remove(path)
+
+
+class PostgreSQLSnapshot(Snapshot):
+    def __init__(self, connection, key):
+        super().__init__(connection, key)
+        self.prefix = f"{self.creation._get_test_db_name()}_snapshot_"
+        self.name = f"{self.prefix}{key}"
+
+    def exists(self):
+        with self.creation._nodb_cursor() as cursor:
+            return self.creation._database_exists(cursor, self.name)
+
+    def save(self):
+        # CREATE DATABASE ... TEMPLATE needs no other connections to the template
+        self.close_connections()
+        with self.creation._nodb_cursor() as cursor:
+            cursor.execute(
+                "CREATE DATABASE %s%s"
+                % (
+                    self.creation._quote_name(self.name),
+                    self.creation._get_database_create_suffix(
+                        template=self.creation._get_test_db_name()
+                    ),
+                )
+            )
+
+    def restore(self, autoclobber):
+        test_database_name = self.creation._get_test_db_name()
+        self.close_connections()
+        with self.creation._nodb_cursor() as cursor:
+            cursor.execute(
+                "DROP DATABASE IF EXISTS %s"
+                % self.creation._quote_name(test_database_name)
+            )
+            cursor.execute(
+                "CREATE DATABASE %s%s"
+                % (
+                    self.creation._quote_name(test_database_name),
+                    self.creation._get_database_create_suffix(template=self.name),
+                )
+            )
+
+    def prune(self):
+        with self.creation._nodb_cursor() as cursor:
+            cursor.execute(
+                "SELECT datname FROM pg_database WHERE datname LIKE %s",
+                [f"{self.prefix}%"],
+            )
+            for (name,) in cursor.fetchall():
+                if name != self.name:
+                    cursor.execute("DROP DATABASE %s" % self.creation._quote_name(name))
+
+    def close_connections(self):
+        self.connection.close()
+        if hasattr(self.connection, "close_pool"):
+            self.connection.close_pool()
+
+
+SNAPSHOT_CLASSES = {
+    "sqlite": SQLiteSnapshot,
+    "postgresql": PostgreSQLSnapshot,
+}
@@ -0,0 +1,29 @@
+"""
+Helpers shared by the apps' tests.
+"""
+
+import shutil
+import tempfile
+
+from django.test import override_settings
+
+
+class TemporaryDirectoryMixin:
+    """Gives a test case temporary directories, removed after each test."""
+
+    def temporary_directory(self, setting):
+        """Point a setting at a new temporary directory for this test."""
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        settings = override_settings(**{setting: path})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        return path
+
+
+class TemporaryMediaMixin(TemporaryDirectoryMixin):
+    """Stores each test's uploaded files in a new temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = self.temporary_directory("MEDIA_ROOT")
@@ -1,21 +1,43 @@
+from django.apps import apps
 from django.conf import settings
-from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from wagtail import urls as wagtail_urls
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail.documents import urls as wagtaildocs_urls
 
+from app.documents import views as document_views
+from app.images import views as image_views
+from app.monitoring import views as monitoring_views
 from app.search import views as search_views
+from app.sitemap import views as sitemap_views
 
 urlpatterns = [
-    path("django-admin/", admin.site.urls),
     path("admin/", include(wagtailadmin_urls)),
+    # Wraps Wagtail's document serve view to add byte-range support
+    re_path(r"^documents/(\d+)/(.*)$", document_views.serve, name="wagtaildocs_serve"),
     path("documents/", include(wagtaildocs_urls)),
+    # Signed, cached image renditions for the {% image_url %} template tag
+    re_path(
+        r"^images/([^/]*)/(\d*)/([^/]*)/[^/]*$",
+        image_views.serve,
+        name="wagtailimages_serve",
+    ),
     path("search/", search_views.search, name="search"),
-    # Remove if not required
-    path("style-guide/", include("app.style_guide.urls")),
+    path("sitemap.xml", sitemap_views.index, name="sitemap"),
+    path("sitemap-<int:shard>.xml", sitemap_views.shard, name="sitemap_shard"),
+    path("metrics", monitoring_views.metrics, name="metrics"),
 ]
 
+# Optional apps, see OPTIONAL_APPS in settings
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns += [path("django-admin/", admin.site.urls)]
+
+# Remove if not required
+if apps.is_installed("app.style_guide"):
+    urlpatterns += [path("style-guide/", include("app.style_guide.urls"))]
+
 
 if settings.DEBUG:
     from django.conf.urls.static import static